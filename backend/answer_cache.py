@@ -0,0 +1,197 @@
+import re
+import time
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from hybrid import extract_section_refs
+
+logger = logging.getLogger(__name__)
+
+# Questions that lean on the previous turns ("what about bail for it?") mean
+# something different in every conversation, so they are never cached.
+FOLLOW_UP = re.compile(
+    r"\b(?:it|this|that|these|those|he|she|they|him|her|them|his|their|above|previous|"
+    r"same|earlier|also|then|what\s+about|how\s+about|and\s+if|continue|more)\b",
+    re.IGNORECASE,
+)
+MIN_STANDALONE_WORDS = 3
+NUMBER = re.compile(r"\d+[a-z]?(?:\(\w{1,4}\))*", re.IGNORECASE)
+
+
+def normalize_query(query: str) -> str:
+    text = re.sub(r"[^\w\s()]", " ", query.lower())
+    return " ".join(text.split())
+
+
+def section_signature(query: str) -> Tuple:
+    """The provisions ``query`` names: its section references and every number in it.
+
+    "section 302 IPC" and "section 304 IPC" embed almost identically, so a
+    similar cached query only counts as a match when these agree.
+    """
+    refs = sorted(extract_section_refs(query), key=lambda ref: (ref[0] or "", ref[1]))
+    return tuple(refs), tuple(sorted(set(NUMBER.findall(query))))
+
+
+@dataclass
+class CachedAnswer:
+    answer: str
+    vector: Optional[np.ndarray]
+    created_at: float
+    sources: List[Dict] = field(default_factory=list)
+
+
+class SimilarityCache:
+    """LRU + TTL store of entries that may carry a unit query vector.
+
+    ``get`` looks up the exact key. ``get_similar`` compares the query vector
+    with the cached vectors in the same bucket (``_bucket_key``), and a match
+    above ``similarity_threshold`` is a hit, provided both queries name the
+    same sections (``section_signature``). Entries need ``vector`` and
+    ``created_at`` attributes.
+    """
+
+    name = "Similarity"
+
+    def __init__(self, max_entries: int, ttl_seconds: float, similarity_threshold: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._entries: "OrderedDict[Tuple, Any]" = OrderedDict()
+        # bucket -> (keys, stacked unit vectors, section signatures), rebuilt lazily
+        self._matrices: Dict[Hashable, Tuple[List[Tuple], np.ndarray, List[Tuple]]] = {}
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _bucket_key(key: Tuple) -> Hashable:
+        """Keys that may answer for one another; vectors are only compared within a bucket."""
+        return key[1:]
+
+    def get(self, key: Tuple):
+        entry = self._entries.get(key)
+        if entry is None or self._stale(entry):
+            if entry is not None:
+                self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def get_similar(self, key: Tuple, vector: Sequence[float]):
+        bucket = self._bucket(self._bucket_key(key))
+        if bucket is None:
+            self.misses += 1
+            return None
+        keys, matrix, signatures = bucket
+        scores = matrix @ self._unit(vector)
+        # Never answer for a different statute, however close the embeddings are
+        signature = section_signature(key[0])
+        scores = np.where([s == signature for s in signatures], scores, -np.inf)
+        best = int(np.argmax(scores))
+        match = keys[best]
+        entry = self._entries.get(match)
+        if scores[best] < self.similarity_threshold or entry is None or self._stale(entry):
+            self.misses += 1
+            return None
+        logger.info(f"{self.name} cache hit ({scores[best]:.3f}): {match[0]!r}")
+        self._entries.move_to_end(match)
+        self.semantic_hits += 1
+        return entry
+
+    def clear(self):
+        self._entries.clear()
+        self._matrices.clear()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.semantic_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.semantic_hits) / lookups if lookups else 0.0,
+        }
+
+    def _store(self, key: Tuple, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self._matrices.pop(self._bucket_key(key), None)
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self._matrices.pop(self._bucket_key(evicted), None)
+            self.evictions += 1
+
+    def _stale(self, entry) -> bool:
+        return time.monotonic() - entry.created_at > self.ttl_seconds
+
+    def _remove(self, key: Tuple):
+        self._entries.pop(key, None)
+        self._matrices.pop(self._bucket_key(key), None)
+
+    def _bucket(self, bucket_key: Hashable):
+        bucket = self._matrices.get(bucket_key)
+        if bucket is None:
+            keys = [
+                k for k, entry in self._entries.items()
+                if self._bucket_key(k) == bucket_key and entry.vector is not None
+            ]
+            if not keys:
+                return None
+            bucket = (
+                keys,
+                np.stack([self._entries[k].vector for k in keys]),
+                [section_signature(k[0]) for k in keys],
+            )
+            self._matrices[bucket_key] = bucket
+        return bucket
+
+    @staticmethod
+    def _unit(vector: Sequence[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm else array
+
+
+class SemanticAnswerCache(SimilarityCache):
+    """LRU + TTL cache of final answers keyed by (normalized query, language, chain).
+
+    Lookups try the exact key first and then the most similar cached query
+    embedding for the same language and chain, if it clears ``similarity_threshold``.
+    """
+
+    name = "Semantic"
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 3600, similarity_threshold: float = 0.95):
+        super().__init__(max_entries, ttl_seconds, similarity_threshold)
+        self.bypasses = 0
+
+    @staticmethod
+    def is_follow_up(query: str) -> bool:
+        return len(query.split()) < MIN_STANDALONE_WORDS or bool(FOLLOW_UP.search(query))
+
+    def key(self, query: str, language: str, chain: str) -> Tuple[str, str, str]:
+        return normalize_query(query), language.strip().lower(), chain
+
+    def put(
+        self,
+        key: Tuple[str, str, str],
+        answer: str,
+        embedding: Optional[Sequence[float]] = None,
+        sources: Optional[List[Dict]] = None,
+    ):
+        vector = self._unit(embedding) if embedding is not None else None
+        self._store(key, CachedAnswer(answer=answer, vector=vector, created_at=time.monotonic(), sources=sources or []))
+
+    def record_bypass(self):
+        self.bypasses += 1
+
+    def stats(self) -> Dict[str, float]:
+        return {**super().stats(), "bypasses": self.bypasses}
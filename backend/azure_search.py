@@ -0,0 +1,166 @@
+import os
+import asyncio
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import aiohttp
+from azure.core.credentials import AzureKeyCredential
+from azure.core.exceptions import HttpResponseError
+from azure.core.pipeline.transport import AioHttpTransport
+from azure.search.documents.aio import SearchClient
+from azure.search.documents.indexes.aio import SearchIndexClient, SearchIndexerClient
+from azure.search.documents.models import VectorizableTextQuery, VectorizedQuery
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncAzureSearch:
+    """Non-blocking Azure Cognitive Search retrieval for the legal corpus.
+
+    One pooled aiohttp session is shared by every request in the worker. It is
+    opened by ``start()`` at app startup and closed by ``close()`` at shutdown.
+
+    Queries are sent as precomputed vectors when the caller passes one (it must
+    come from the same embedding model as the index); otherwise the service
+    vectorizes the text. ``exhaustive`` switches from HNSW to a full scan.
+    ``indexer_name`` names the indexer that feeds the index, if there is one;
+    its last run is part of ``index_version()``.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        index_name: str,
+        api_key: str,
+        max_concurrency: int = 16,
+        timeout: float = 10.0,
+        pool_size: int = 32,
+        exhaustive: bool = False,
+        indexer_name: Optional[str] = None,
+    ):
+        self.endpoint = endpoint
+        self.index_name = index_name
+        self.credential = AzureKeyCredential(api_key)
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.exhaustive = exhaustive
+        self.indexer_name = indexer_name
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._client: Optional[SearchClient] = None
+        self._index_client: Optional[SearchIndexClient] = None
+        self._indexer_client: Optional[SearchIndexerClient] = None
+        self._query_key_warned = False
+
+    async def start(self):
+        if self._client is not None:
+            return
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60)
+        )
+        self._client = SearchClient(
+            endpoint=self.endpoint,
+            index_name=self.index_name,
+            credential=self.credential,
+            transport=AioHttpTransport(session=self._session, session_owner=False),
+        )
+        self._index_client = SearchIndexClient(
+            endpoint=self.endpoint,
+            credential=self.credential,
+            transport=AioHttpTransport(session=self._session, session_owner=False),
+        )
+        if self.indexer_name:
+            self._indexer_client = SearchIndexerClient(
+                endpoint=self.endpoint,
+                credential=self.credential,
+                transport=AioHttpTransport(session=self._session, session_owner=False),
+            )
+        logger.info(f"Azure Search client started (pool size {self.pool_size})")
+
+    async def close(self):
+        for client in (self._client, self._index_client, self._indexer_client):
+            if client is not None:
+                await client.close()
+        self._client = self._index_client = self._indexer_client = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        logger.info("Azure Search client closed")
+
+    async def search(
+        self,
+        query: str,
+        top: int = 10,
+        k_nearest_neighbors: Optional[int] = None,
+        vector: Optional[Sequence[float]] = None,
+    ) -> List[Dict]:
+        if self._client is None:
+            await self.start()
+
+        k = k_nearest_neighbors or top
+        if vector is not None:
+            vector_query = VectorizedQuery(
+                vector=list(vector), k_nearest_neighbors=k, fields="embedding", exhaustive=self.exhaustive
+            )
+        else:
+            vector_query = VectorizableTextQuery(
+                text=query, k_nearest_neighbors=k, fields="embedding", exhaustive=self.exhaustive
+            )
+
+        async def run() -> List[Dict]:
+            results = await self._client.search(
+                search_text=None,
+                vector_queries=[vector_query],
+                select=['id', "content", 'metadata_page'],
+                top=top
+            )
+            return [result async for result in results]
+
+        async with self._semaphore:
+            return await asyncio.wait_for(run(), timeout=self.timeout)
+
+    async def index_version(self) -> Tuple:
+        """A value that changes whenever the index is updated.
+
+        It combines the index definition's ETag, the end of the indexer's last
+        run when an indexer feeds the index, and the document count and storage
+        size. The storage size catches documents that are re-pushed in place
+        without changing the count.
+        """
+        if self._client is None:
+            await self.start()
+
+        async def read() -> Tuple:
+            try:
+                index = await self._index_client.get_index(self.index_name)
+                statistics = await self._index_client.get_index_statistics(self.index_name)
+            except HttpResponseError as e:
+                if e.status_code not in (401, 403):
+                    raise
+                # Query keys cannot read index metadata; the document count is all they get
+                if not self._query_key_warned:
+                    logger.warning("AZURE_SEARCH_KEY cannot read index statistics; watching the document count only")
+                    self._query_key_warned = True
+                return None, None, await self._client.get_document_count(), None
+            last_run = None
+            if self._indexer_client is not None:
+                status = await self._indexer_client.get_indexer_status(self.indexer_name)
+                if status.last_result is not None:
+                    last_run = (status.last_result.status, str(status.last_result.end_time))
+            return index.e_tag, last_run, statistics["document_count"], statistics["storage_size"]
+
+        async with self._semaphore:
+            return await asyncio.wait_for(read(), timeout=self.timeout)
+
+
+def create_azure_search() -> AsyncAzureSearch:
+    return AsyncAzureSearch(
+        endpoint=os.getenv('AZURE_SEARCH_ENDPOINT'),
+        index_name=os.getenv('AZURE_SEARCH_INDEX'),
+        api_key=os.getenv('AZURE_SEARCH_KEY'),
+        max_concurrency=int(os.getenv("AZURE_SEARCH_MAX_CONCURRENCY", "16")),
+        timeout=float(os.getenv("AZURE_SEARCH_TIMEOUT", "10")),
+        pool_size=int(os.getenv("AZURE_SEARCH_POOL_SIZE", "32")),
+        exhaustive=os.getenv("AZURE_SEARCH_EXHAUSTIVE", "false").lower() == "true",
+        indexer_name=os.getenv("AZURE_SEARCH_INDEXER") or None,
+    )
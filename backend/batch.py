@@ -0,0 +1,162 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from answer_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LANGUAGE = "English"
+
+Handler = Callable[[str, str], Awaitable[str]]
+
+
+def parse_item(raw: Union[str, Dict]) -> Dict:
+    """Accept {"message", "language", "id"} objects (or bare strings) from a batch."""
+    if isinstance(raw, str):
+        raw = {"message": raw}
+    message = str(raw.get("message") or raw.get("query") or "").strip()
+    return {
+        "id": raw.get("id"),
+        "message": message,
+        "language": str(raw.get("language") or DEFAULT_LANGUAGE).strip(),
+    }
+
+
+def validate_items(items: Iterable) -> List[Dict]:
+    """Parse every item of a batch up front; ValueError names the first malformed one."""
+    parsed = []
+    for position, raw in enumerate(items):
+        if isinstance(raw, dict):
+            for field in ("message", "query", "language"):
+                if raw.get(field) is not None and not isinstance(raw[field], str):
+                    raise ValueError(f"Item {position}: {field} must be a string")
+        elif not isinstance(raw, str):
+            raise ValueError(f"Item {position}: expected an object or a string")
+        parsed.append(parse_item(raw))
+    return parsed
+
+
+async def _aiter(items: Union[Iterable, AsyncIterable]) -> AsyncIterator:
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+async def run_batch(
+    items: Union[Iterable, AsyncIterable],
+    handler: Handler,
+    concurrency: int = 8,
+    window: Optional[int] = None,
+) -> AsyncIterator[Dict]:
+    """Run ``handler(message, language)`` over ``items``, yielding results in input order.
+
+    At most ``concurrency`` handler calls run at once and at most ``window``
+    items are buffered ahead of the one being yielded, so arbitrarily long
+    JSONL inputs stream through in bounded memory. Identical queries (after
+    normalization) share a single handler call while it is in the window.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    window = window or concurrency * 4
+    in_flight: Dict[Tuple[str, str], asyncio.Task] = {}
+    pending: deque = deque()
+
+    async def call(message: str, language: str) -> Tuple[Optional[str], Optional[str], float]:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                answer = await handler(message, language)
+                return answer, None, (time.perf_counter() - start) * 1000
+            except Exception as e:
+                detail = getattr(e, "detail", None) or str(e)
+                return None, str(detail), (time.perf_counter() - start) * 1000
+
+    def result(index: int, item: Dict, task: Optional[asyncio.Task], duplicate: bool) -> Dict:
+        if task is None:
+            answer, error, latency_ms = None, "Empty message", 0.0
+        else:
+            answer, error, latency_ms = task.result()
+        out = {"index": index, "id": item["id"], "message": item["message"], "language": item["language"]}
+        out.update({"error": error} if error else {"answer": answer})
+        out.update({"latency_ms": round(latency_ms, 1), "deduplicated": duplicate})
+        return out
+
+    async def drain_one() -> Dict:
+        index, item, key, task, duplicate = pending.popleft()
+        if task is not None:
+            await asyncio.shield(task)
+            if not any(entry[2] == key for entry in pending):
+                in_flight.pop(key, None)
+        return result(index, item, task, duplicate)
+
+    try:
+        index = 0
+        async for raw in _aiter(items):
+            item = parse_item(raw)
+            key = (normalize_query(item["message"]), item["language"].lower())
+            task, duplicate = None, False
+            if item["message"]:
+                task = in_flight.get(key)
+                duplicate = task is not None
+                if task is None:
+                    task = asyncio.create_task(call(item["message"], item["language"]))
+                    in_flight[key] = task
+            pending.append((index, item, key, task, duplicate))
+            index += 1
+            while len(pending) >= window or (pending and pending[0][3] is not None and pending[0][3].done()):
+                yield await drain_one()
+        while pending:
+            yield await drain_one()
+    finally:
+        for task in in_flight.values():
+            task.cancel()
+
+
+async def _run_cli(input_path: str, output_path: Optional[str], concurrency: int):
+    import main
+
+    def read_lines():
+        with open(input_path) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    async def handler(message: str, language: str) -> str:
+        return await main.cached_process_query(message, language, "")
+
+    out = open(output_path, "w") if output_path else sys.stdout
+    errors = total = 0
+    started = time.perf_counter()
+    # Runs the app's startup/shutdown so search clients and indexes are live
+    async with main.lifespan(main.app):
+        try:
+            async for item in run_batch(read_lines(), handler, concurrency):
+                total += 1
+                errors += "error" in item
+                out.write(json.dumps(item, ensure_ascii=False) + "\n")
+                out.flush()
+        finally:
+            if output_path:
+                out.close()
+    elapsed = time.perf_counter() - started
+    print(f"{total} queries, {errors} errors in {elapsed:.1f}s ({total / max(elapsed, 1e-9):.2f} q/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    # python batch.py queries.jsonl [results.jsonl]
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(
+        _run_cli(
+            sys.argv[1],
+            sys.argv[2] if len(sys.argv) > 2 else None,
+            int(os.getenv("BATCH_CONCURRENCY", "8")),
+        )
+    )
@@ -0,0 +1,413 @@
+"""Offline benchmarks for the chat and ingestion pipelines.
+
+Azure OpenAI, Azure Search and Pinecone are replaced by deterministic
+in-process fakes with configurable latency, so runs are repeatable and the
+JSON report can be diffed between versions:
+
+    python benchmark.py --out report.json
+    python benchmark.py --out new.json --compare report.json
+"""
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import argparse
+import statistics
+import shutil
+import subprocess
+import tempfile
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+logger = logging.getLogger(__name__)
+
+BENCH_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_data")
+WORD = re.compile(r"\w+")
+
+
+class FakeChatModel(BaseChatModel):
+    """Deterministic chat model: the answer depends only on the prompt."""
+
+    first_token_latency: float = 0.3
+    token_latency: float = 0.01
+    answer_tokens: int = 120
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _reply(self, messages: List[BaseMessage]) -> List[str]:
+        prompt = str(messages[-1].content)
+        if "<< INPUT >>" in prompt:
+            # MULTI_PROMPT_ROUTER_TEMPLATE: answer with the router's JSON block
+            query = prompt.split("<< INPUT >>")[-1].split("<< OUTPUT")[0].strip()
+            destination = "section" if re.search(r"\bsection\b", query, re.IGNORECASE) else "law"
+            payload = json.dumps({"destination": destination, "next_inputs": query})
+            return [f"```json\n{payload}\n```"]
+        words = WORD.findall(prompt) or ["answer"]
+        seed = int(hashlib.sha256(prompt.encode()).hexdigest()[:8], 16)
+        return [words[(seed + i * 7) % len(words)] + " " for i in range(self.answer_tokens)]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        tokens = self._reply(messages)
+        time.sleep(self.first_token_latency + self.token_latency * len(tokens))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        tokens = self._reply(messages)
+        await asyncio.sleep(self.first_token_latency + self.token_latency * len(tokens))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.first_token_latency)
+        for token in self._reply(messages):
+            time.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.first_token_latency)
+        for token in self._reply(messages):
+            await asyncio.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+
+class FakeEmbeddings(Embeddings):
+    """Hashed bag-of-words vectors, so similar texts really are close."""
+
+    def __init__(self, dimension: int = 256, call_latency: float = 0.05, per_text_latency: float = 0.001):
+        self.dimension = dimension
+        self.call_latency = call_latency
+        self.per_text_latency = per_text_latency
+
+    def _vector(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for word in WORD.findall(text.lower()):
+            bucket = int(hashlib.md5(word.encode()).hexdigest()[:8], 16)
+            vector[bucket % self.dimension] += 1.0 if bucket & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(self.call_latency + self.per_text_latency * len(texts))
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        time.sleep(self.call_latency)
+        return self._vector(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        await asyncio.sleep(self.call_latency + self.per_text_latency * len(texts))
+        return [self._vector(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        await asyncio.sleep(self.call_latency)
+        return self._vector(text)
+
+
+class LatencySearch:
+    """Adds Azure Search-like service latency to a LocalSearch."""
+
+    def __init__(self, inner, latency: float):
+        self.inner = inner
+        self.index = inner.index
+        self.latency = latency
+
+    async def start(self):
+        await self.inner.start()
+
+    async def close(self):
+        await self.inner.close()
+
+    async def search(self, query: str, top: int = 10, k_nearest_neighbors: Optional[int] = None, vector=None) -> List[Dict]:
+        await asyncio.sleep(self.latency)
+        return await self.inner.search(query, top=top, k_nearest_neighbors=k_nearest_neighbors, vector=vector)
+
+    async def index_version(self) -> int:
+        return await self.inner.index_version()
+
+
+def install_fakes(args) -> FakeEmbeddings:
+    """Point the Azure client constructors used by main/chatwithpdf at the fakes.
+
+    Must run before ``main`` is imported.
+    """
+    import langchain.chat_models
+    import langchain_openai
+
+    def chat_model(**kwargs):
+        return FakeChatModel(
+            first_token_latency=args.llm_first_token_ms / 1000,
+            token_latency=args.llm_token_ms / 1000,
+            answer_tokens=args.answer_tokens,
+        )
+
+    embeddings = FakeEmbeddings(call_latency=args.embedding_ms / 1000)
+    langchain_openai.AzureChatOpenAI = chat_model
+    langchain.chat_models.AzureChatOpenAI = chat_model
+    langchain_openai.AzureOpenAIEmbeddings = lambda **kwargs: embeddings
+    return embeddings
+
+
+def configure_env(workdir: str, args):
+    os.environ.update({
+        "RETRIEVAL_BACKEND": "local",
+        "LOCAL_INDEX_DIR": os.path.join(workdir, "legal"),
+        "PDF_VECTOR_BACKEND": "local",
+        "PDF_LOCAL_INDEX_DIR": os.path.join(workdir, "pdf"),
+        "NAMESPACE_REGISTRY_PATH": os.path.join(workdir, "namespaces.json"),
+        "UPLOAD_DIR": os.path.join(workdir, "uploads"),
+        "SESSION_BACKEND": "memory",
+        "ANSWER_CACHE_ENABLED": "false",
+        "RETRIEVAL_CACHE_ENABLED": "false",
+        "STARTUP_WARMUP": "false",
+        "LOG_LEVEL": os.getenv("LOG_LEVEL", "WARNING"),
+        "ROUTER_MODE": args.router_mode,
+    })
+    os.environ.pop("EMBEDDING_CACHE_DIR", None)
+
+
+def _escape_pdf(text: str) -> str:
+    text = text.replace("\u2014", " - ").encode("latin-1", "replace").decode("latin-1")
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_sample_pdf(path: str, pages: List[str], line_chars: int = 90):
+    """Write a minimal text PDF (one Helvetica content stream per page)."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        words, lines, line = text.split(), [], ""
+        for word in words:
+            if len(line) + len(word) + 1 > line_chars:
+                lines.append(line)
+                line = word
+            else:
+                line = f"{line} {word}".strip()
+        lines.append(line)
+        body = "BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(f"({_escape_pdf(l)}) Tj T*" for l in lines[:60]) + " ET"
+        objects.append(f"<< /Length {len(body.encode('latin-1'))} >>\nstream\n{body}\nendstream")
+        content_ref = len(objects)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_ref} 0 R >>"
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def sample_pages(corpus: List[Dict], count: int, sections_per_page: int = 3) -> List[str]:
+    pages = []
+    for page in range(count):
+        rows = [corpus[(page * sections_per_page + i) % len(corpus)] for i in range(sections_per_page)]
+        pages.append(f"Case file page {page + 1}. " + " ".join(row["content"] for row in rows))
+    return pages
+
+
+def load_jsonl(path: str) -> List[Dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def latency_summary(latencies_ms: List[float]) -> Dict[str, float]:
+    ordered = sorted(latencies_ms)
+
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(p * (len(ordered) - 1))))]
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered), 2),
+        "p50_ms": round(percentile(0.5), 2),
+        "p95_ms": round(percentile(0.95), 2),
+        "max_ms": round(ordered[-1], 2),
+    }
+
+
+def stage_snapshot() -> Dict[str, tuple]:
+    from metrics import STAGE_SECONDS
+
+    return {key[0]: value for key, value in STAGE_SECONDS.snapshot().items()}
+
+
+def stage_delta(before: Dict[str, tuple], after: Dict[str, tuple]) -> Dict[str, Dict[str, float]]:
+    """Per-stage call count and mean latency between two snapshots."""
+    delta = {}
+    for stage, (count, total) in sorted(after.items()):
+        previous_count, previous_total = before.get(stage, (0, 0.0))
+        if count > previous_count:
+            calls = count - previous_count
+            delta[stage] = {"count": calls, "mean_ms": round((total - previous_total) / calls * 1000, 2)}
+    return delta
+
+
+async def bench_single_query(main, queries: List[Dict], iterations: int) -> Dict[str, Any]:
+    latencies = []
+    for i in range(iterations):
+        query = queries[i % len(queries)]
+        start = time.perf_counter()
+        await main.process_query(query["message"], query.get("language", "English"), "")
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latency_summary(latencies)
+
+
+async def bench_chat_throughput(main, queries: List[Dict], requests: int, concurrency: int) -> Dict[str, Any]:
+    import httpx
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one(client, i: int):
+        nonlocal errors
+        query = queries[i % len(queries)]
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post("/chat", json={
+                "message": query["message"],
+                "language": query.get("language", "English"),
+                "session_id": f"bench-{i}",
+            })
+            latencies.append((time.perf_counter() - start) * 1000)
+            errors += response.status_code != 200
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(one(client, i) for i in range(requests)))
+        elapsed = time.perf_counter() - start
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "requests_per_second": round(requests / elapsed, 2),
+        **latency_summary(latencies),
+    }
+
+
+async def bench_ingestion(main, corpus: List[Dict], workdir: str, pages: int) -> Dict[str, Any]:
+    path = os.path.join(workdir, f"sample_{pages}.pdf")
+    await asyncio.to_thread(write_sample_pdf, path, sample_pages(corpus, pages))
+    job = main.ingestion_queue.submit(path, os.path.basename(path), "bench", f"bench-{pages}")
+    while job.status in ("queued", "running"):
+        await asyncio.sleep(0.05)
+    report = job.to_dict()
+    return {key: report[key] for key in (
+        "status", "pages_done", "chunks_done", "elapsed_seconds", "pages_per_second", "chunks_per_second", "errors"
+    )}
+
+
+async def run(args) -> Dict[str, Any]:
+    workdir = tempfile.mkdtemp(prefix="legal-bench-")
+    configure_env(workdir, args)
+    embeddings = install_fakes(args)
+    corpus_path = os.path.join(BENCH_DATA, "legal_corpus.jsonl")
+
+    from vector_index import build_local_index
+
+    build_local_index(corpus_path, os.environ["LOCAL_INDEX_DIR"], FakeEmbeddings(call_latency=0, per_text_latency=0))
+    import main
+
+    main.search_client = LatencySearch(main.search_client, args.search_ms / 1000)
+    queries = load_jsonl(os.path.join(BENCH_DATA, "queries.jsonl"))
+    corpus = load_jsonl(corpus_path)
+
+    scenarios: Dict[str, Any] = {}
+    async with main.lifespan(main.app):
+        while not (main.readiness["chat"] and main.readiness["pdf"]):
+            await asyncio.sleep(0.01)
+
+        for name, bench in (
+            ("single_query", lambda: bench_single_query(main, queries, args.iterations)),
+            ("chat_throughput", lambda: bench_chat_throughput(main, queries, args.requests, args.concurrency)),
+            ("ingestion", lambda: bench_ingestion(main, corpus, workdir, args.pages)),
+        ):
+            if args.scenario and name not in args.scenario:
+                continue
+            before = stage_snapshot()
+            logger.warning(f"Running {name}...")
+            scenarios[name] = await bench()
+            scenarios[name]["stages"] = stage_delta(before, stage_snapshot())
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": git_commit(),
+        "config": {
+            "llm_first_token_ms": args.llm_first_token_ms,
+            "llm_token_ms": args.llm_token_ms,
+            "answer_tokens": args.answer_tokens,
+            "embedding_ms": args.embedding_ms,
+            "search_ms": args.search_ms,
+            "router_mode": args.router_mode,
+            "embedding_dimension": embeddings.dimension,
+        },
+        "scenarios": scenarios,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return None
+
+
+def compare(old: Dict, new: Dict) -> List[str]:
+    """Percent change of every numeric scenario metric present in both reports."""
+    lines = []
+    for scenario, metrics in new["scenarios"].items():
+        previous = old.get("scenarios", {}).get(scenario, {})
+        for key, value in metrics.items():
+            before = previous.get(key)
+            if isinstance(value, (int, float)) and isinstance(before, (int, float)) and before:
+                lines.append(f"{scenario}.{key}: {before} -> {value} ({(value - before) / before * 100:+.1f}%)")
+    return lines
+
+
+def parse_args(argv: List[str]):
+    parser = argparse.ArgumentParser(description="Offline chat and ingestion benchmarks")
+    parser.add_argument("--out", default="bench_report.json")
+    parser.add_argument("--compare", help="previous report to diff against")
+    parser.add_argument("--scenario", action="append", choices=["single_query", "chat_throughput", "ingestion"])
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--llm-first-token-ms", type=float, default=300)
+    parser.add_argument("--llm-token-ms", type=float, default=10)
+    parser.add_argument("--answer-tokens", type=int, default=120)
+    parser.add_argument("--embedding-ms", type=float, default=50)
+    parser.add_argument("--search-ms", type=float, default=80)
+    parser.add_argument("--router-mode", default="hybrid", choices=["llm", "local", "hybrid"])
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    report = asyncio.run(run(args))
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report["scenarios"], indent=2))
+    if args.compare:
+        with open(args.compare) as f:
+            print("\n".join(compare(json.load(f), report)))
@@ -1,23 +1,57 @@
 import os
-from typing import Dict
+import asyncio
+import hashlib
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 import logging
 
 import pinecone
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.memory import ConversationBufferMemory
-from langchain.chains import ConversationalRetrievalChain
+from langchain.chains.question_answering.stuff_prompt import CHAT_PROMPT
+from langchain_core.output_parsers import StrOutputParser
 from langchain.chat_models import AzureChatOpenAI
 from langchain.document_loaders import PyPDFLoader
 from pinecone import Pinecone, ServerlessSpec
 from langchain_openai import AzureOpenAIEmbeddings 
 from dotenv import load_dotenv
 from langchain_pinecone import PineconeVectorStore
+from langchain_core.documents import Document
+
+from context_budget import BudgetedRetriever, ContextBudgeter, budget_documents
+from embedding_cache import CachedEmbeddings, DiskEmbeddingStore
+from hybrid import canonical_section, extract_section_refs
+from legal_splitter import LegalTextSplitter, SplitState
+from llm_scheduler import LLMScheduler, Overloaded
+from metrics import record_tokens, span
+from namespaces import NamespaceRegistry
+from pdf_extract import iter_pages_parallel
+from vector_index import LocalVectorStore
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Pinecone free tier vector limit
+MAX_VECTORS = 10000
+# Chunks retrieved per question, across all selected documents
+RETRIEVAL_K = 10
+
+# A document namespace, or several to search together
+Namespaces = Union[str, Sequence[str], None]
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
 class LargePDFProcessor:
+    """Chat-with-PDF over Pinecone.
+
+    Construction only builds clients and makes no network calls; call
+    ``initialize_chain()`` (and optionally ``awarm_up()``) before querying.
+    """
+
     def __init__(
         self,
         pinecone_api_key: str,
@@ -25,6 +59,20 @@ class LargePDFProcessor:
         pinecone_index_name: str,
         chunk_size: int = 1000,
         chunk_overlap: int = 200,
+        embedding_batch_size: int = 64,
+        embedding_parallelism: int = 4,
+        embedding_cache_size: int = 10000,
+        embedding_cache_dir: Optional[str] = None,
+        upsert_batch_size: int = 100,
+        namespace_registry_path: Optional[str] = None,
+        namespace_ttl_seconds: Optional[float] = None,
+        extract_workers: int = 0,
+        pages_per_task: int = 8,
+        vector_backend: str = "pinecone",
+        local_index_dir: str = "./local_index",
+        context_budget: int = 4000,
+        splitter: str = "legal",
+        scheduler: Optional[LLMScheduler] = None,
     ):
         # Load environment variables
         load_dotenv()
@@ -35,144 +83,355 @@ class LargePDFProcessor:
         logger.info(f"Embeddings Deployment: {os.getenv('AZURE_EMBEDDINGS_DEPLOYMENT')}")
         logger.info(f"Chat Deployment: {os.getenv('AZURE_CHAT_DEPLOYMENT')}")
 
-        # Initialize Pinecone
-        self.pc = Pinecone(api_key=pinecone_api_key)
-        logger.info("Pinecone client initialized")
+        # "pinecone" (hosted) or "local" (in-process, memory-mapped)
+        self.vector_backend = vector_backend
+        self.local_index_dir = local_index_dir
+        if vector_backend == "pinecone":
+            # Initialize Pinecone
+            self.pc = Pinecone(api_key=pinecone_api_key)
+            logger.info("Pinecone client initialized")
 
         self.index_name = pinecone_index_name
+        self.upsert_batch_size = upsert_batch_size
+        self.extract_workers = extract_workers
+        self.pages_per_task = pages_per_task
+        # Each document lives in its own namespace named after its content hash
+        self.namespaces = NamespaceRegistry(namespace_registry_path, namespace_ttl_seconds)
+        # Retrieved chunks are deduplicated and trimmed to this many tokens
+        self.context_budget = context_budget
+        self.context_budgeter = ContextBudgeter()
         
+        self.ready = False
+
         # Initialize embeddings with explicit error handling
         try:
-            self.embeddings = AzureOpenAIEmbeddings(
+            azure_embeddings = AzureOpenAIEmbeddings(
                 azure_deployment=os.getenv("AZURE_EMBEDDINGS_DEPLOYMENT"),
                 openai_api_version=os.getenv("OPENAI_API_VERSION"),
                 azure_endpoint=os.getenv("AZURE_ENDPOINT"),
                 api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+                chunk_size=embedding_batch_size,
+                max_retries=scheduler.sdk_max_retries if scheduler else 2,
+            )
+            if scheduler is not None:
+                azure_embeddings = scheduler.embeddings(azure_embeddings, os.getenv("AZURE_EMBEDDINGS_DEPLOYMENT"))
+            # Query and ingest paths share one content-hash cache
+            self.embeddings = CachedEmbeddings(
+                azure_embeddings,
+                model_name=os.getenv("AZURE_EMBEDDINGS_DEPLOYMENT") or "",
+                batch_size=embedding_batch_size,
+                max_parallel_batches=embedding_parallelism,
+                max_entries=embedding_cache_size,
+                disk_store=DiskEmbeddingStore(embedding_cache_dir) if embedding_cache_dir else None,
             )
-            # Test embeddings
-            test_embedding = self.embeddings.embed_query("test")
-            logger.info(f"Embeddings test successful. Vector dimension: {len(test_embedding)}")
         except Exception as e:
             logger.error(f"Failed to initialize embeddings: {str(e)}")
             raise
   
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            length_function=len
-        )
+        # "legal" cuts on section/sub-section/paragraph boundaries without overlap;
+        # "recursive" is the generic character splitter
+        if splitter == "legal":
+            self.text_splitter = LegalTextSplitter(chunk_size=chunk_size)
+        else:
+            self.text_splitter = RecursiveCharacterTextSplitter(
+                chunk_size=chunk_size,
+                chunk_overlap=chunk_overlap,
+                length_function=len,
+                add_start_index=True,
+            )
 
-        self.memory = ConversationBufferMemory(
-            memory_key="chat_history",
-            return_messages=True,
-            output_key="answer"
-            
+        # Initialize chat model
+        self.chat_model = AzureChatOpenAI(
+            openai_api_version=os.getenv("OPENAI_API_VERSION"),
+            azure_deployment=os.getenv("AZURE_CHAT_DEPLOYMENT"),
+            azure_endpoint=os.getenv("AZURE_ENDPOINT"),
+            api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+            streaming=False,
+            temperature=0.7,
+            max_tokens=2000,
+            max_retries=scheduler.sdk_max_retries if scheduler else 2,
         )
-
-        self.initialize_chain()
+        if scheduler is not None:
+            self.chat_model = scheduler.chat_model(self.chat_model, os.getenv("AZURE_CHAT_DEPLOYMENT"))
+        # "Stuff" answering step; retrieval runs separately on the standalone question
+        self.answer_chain = CHAT_PROMPT | self.chat_model | StrOutputParser()
 
     def initialize_chain(self):
         try:
-            # Check if index exists
-            if self.index_name not in self.pc.list_indexes().names():
-                logger.info(f"Creating new Pinecone index: {self.index_name}")
-                self.pc.create_index(
-                    name=self.index_name,
-                    dimension=3072,
-                    metric="cosine",
-                    spec=ServerlessSpec(cloud="aws", region="us-east-1"),
-                )
-            # else:
-            index = self.pc.Index(self.index_name)
-
-            stats = index.describe_index_stats()
-            total_vector_count = stats.total_vector_count
-
-            if total_vector_count != 0:
-                index.delete(delete_all=True)
-                logger.info("All vectors deleted from the index.")
+            if self.vector_backend == "local":
+                self.vector_store = LocalVectorStore(self.local_index_dir, self.embeddings)
+            else:
+                # Check if index exists
+                if self.index_name not in self.pc.list_indexes().names():
+                    logger.info(f"Creating new Pinecone index: {self.index_name}")
+                    self.pc.create_index(
+                        name=self.index_name,
+                        dimension=3072,
+                        metric="cosine",
+                        spec=ServerlessSpec(cloud="aws", region="us-east-1"),
+                    )
+                # else:
+                index = self.pc.Index(self.index_name)
 
-            self.vector_store = PineconeVectorStore(
-                index=index,
-                embedding=self.embeddings,
-                text_key="text"
-            )
-            logger.info("Vector store initialized successfully")
-
-            # Initialize chat model
-            chat_model = AzureChatOpenAI(
-                openai_api_version=os.getenv("OPENAI_API_VERSION"),
-                azure_deployment=os.getenv("AZURE_CHAT_DEPLOYMENT"),
-                azure_endpoint=os.getenv("AZURE_ENDPOINT"),
-                api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-                streaming=False,
-                temperature=0.7,
-                max_tokens=2000,
-            )
-            
-            # Test chat model
-            test_response = chat_model.invoke("Test message")
-            logger.info("Chat model test successful")
+                self.vector_store = PineconeVectorStore(
+                    index=index,
+                    embedding=self.embeddings,
+                    text_key="text"
+                )
+            logger.info(f"Vector store initialized successfully ({self.vector_backend})")
 
             # Initialize chain
-            self.chain = ConversationalRetrievalChain.from_llm(
-                llm=chat_model,
-                retriever=self.vector_store.as_retriever(search_kwargs={"k": 10}),
-                memory=self.memory,
-                return_source_documents=True,
-                verbose=True,
-                output_key="answer"
-            )
+            self.retriever = self.budgeted(self.vector_store.as_retriever(search_kwargs={"k": RETRIEVAL_K}))
+            self.ready = True
             logger.info("Chain initialized successfully")
 
         except Exception as e:
             logger.error(f"Chain initialization failed: {str(e)}")
             raise
 
-    def process_pdf(self, pdf_path: str) -> Dict:
-        try:
-            logger.info(f"Starting to process PDF: {pdf_path}")
-            
-            index = self.pc.Index(self.index_name)
-            stats = index.describe_index_stats()
-            total_vector_count = stats.total_vector_count
+    async def awarm_up(self):
+        """Probe the embeddings and chat deployments concurrently."""
+        test_embedding, _ = await asyncio.gather(
+            self.embeddings.aembed_query("test"),
+            self.chat_model.ainvoke("Test message"),
+        )
+        logger.info(f"Warm-up successful. Vector dimension: {len(test_embedding)}")
+
+    def budgeted(self, retriever) -> BudgetedRetriever:
+        return BudgetedRetriever(retriever=retriever, budgeter=self.context_budgeter, budget=self.context_budget)
+
+    def retriever_for(self, namespace: Optional[str] = None, filter: Optional[Dict] = None):
+        if namespace is None and filter is None:
+            return self.retriever
+        search_kwargs = {"k": RETRIEVAL_K}
+        if namespace is not None:
+            self.namespaces.touch(namespace)
+            search_kwargs["namespace"] = namespace
+        if filter is not None:
+            search_kwargs["filter"] = filter
+        return self.budgeted(self.vector_store.as_retriever(search_kwargs=search_kwargs))
+
+    @staticmethod
+    def section_filter(query: str) -> Optional[Dict]:
+        """Metadata filter for the sections a query names, e.g. 376(2) -> 376(2) or 376."""
+        numbers = []
+        for _, number in extract_section_refs(query):
+            numbers += [number, number.split("(")[0]]
+        return {"sections": {"$in": list(dict.fromkeys(numbers))}} if numbers else None
 
-            if total_vector_count != 0:
-                index.delete(delete_all=True)
-                logger.info("All vectors deleted from the index.")
+    @staticmethod
+    def metadata_filter(
+        page_start: Optional[int] = None,
+        page_end: Optional[int] = None,
+        sections: Optional[Sequence[str]] = None,
+    ) -> Optional[Dict]:
+        """Filter on the page a chunk starts on and the sections it covers."""
+        conditions = {}
+        pages = {}
+        if page_start is not None:
+            pages["$gte"] = page_start
+        if page_end is not None:
+            pages["$lte"] = page_end
+        if pages:
+            conditions["page"] = pages
+        if sections:
+            numbers = [canonical_section(section) for section in sections]
+            numbers += [number.split("(")[0] for number in numbers]
+            conditions["sections"] = {"$in": list(dict.fromkeys(numbers))}
+        return conditions or None
 
-            # Verify file exists
-            if not os.path.exists(pdf_path):
-                raise FileNotFoundError(f"PDF file not found: {pdf_path}")
+    @staticmethod
+    def merge_filters(*filters: Optional[Dict]) -> Optional[Dict]:
+        filters = [f for f in filters if f]
+        if len(filters) > 1:
+            return {"$and": filters}
+        return filters[0] if filters else None
 
-            loader = PyPDFLoader(pdf_path)
-            pages = loader.load()
-            total_pages = len(pages)
-            logger.info(f"Loaded PDF with {total_pages} pages")
+    @staticmethod
+    def _namespace_list(namespace: Namespaces) -> List[Optional[str]]:
+        if namespace is None or isinstance(namespace, str):
+            return [namespace]
+        return list(dict.fromkeys(namespace)) or [None]
 
-            texts = self.text_splitter.split_documents(pages)
-            total_chunks = len(texts)
-            logger.info(f"Created {total_chunks} text chunks")
+    def _search_namespace(self, embedding: List[float], namespace: str, filter: Optional[Dict]):
+        self.namespaces.touch(namespace)
+        hits = self.vector_store.similarity_search_by_vector_with_score(
+            embedding, k=RETRIEVAL_K, filter=filter, namespace=namespace
+        )
+        for doc, _ in hits:
+            doc.metadata["document_id"] = namespace
+        return hits
+
+    def _merge(self, results: List[List[Tuple[Document, float]]]) -> List[Document]:
+        hits = sorted((hit for hits in results for hit in hits), key=lambda hit: hit[1], reverse=True)
+        return budget_documents([doc for doc, _ in hits[:RETRIEVAL_K]], self.context_budgeter, self.context_budget)
+
+    def search(self, query: str, namespace: Namespaces = None, filter: Optional[Dict] = None) -> List[Document]:
+        namespaces = self._namespace_list(namespace)
+        if len(namespaces) == 1:
+            docs = self.retriever_for(namespaces[0], filter).invoke(query)
+            for doc in docs:
+                doc.metadata.setdefault("document_id", namespaces[0])
+            return docs
+        embedding = self.embeddings.embed_query(query)
+        return self._merge([self._search_namespace(embedding, ns, filter) for ns in namespaces])
+
+    async def asearch(self, query: str, namespace: Namespaces = None, filter: Optional[Dict] = None) -> List[Document]:
+        """Search one document, or fan out over several in parallel and merge the hits by score.
+
+        The query is embedded once and shared by every namespace.
+        """
+        namespaces = self._namespace_list(namespace)
+        if len(namespaces) == 1:
+            docs = await self.retriever_for(namespaces[0], filter).ainvoke(query)
+            for doc in docs:
+                doc.metadata.setdefault("document_id", namespaces[0])
+            return docs
+        embedding = await self.embeddings.aembed_query(query)
+        results = await asyncio.gather(
+            *(asyncio.to_thread(self._search_namespace, embedding, ns, filter) for ns in namespaces)
+        )
+        return self._merge(list(results))
 
-            # Get current index stats
+    def retrieve(self, query: str, namespace: Namespaces = None, filter: Optional[Dict] = None) -> List[Document]:
+        section_filter = self.section_filter(query)
+        if section_filter is not None:
+            docs = self.search(query, namespace, self.merge_filters(filter, section_filter))
+            if docs:
+                return docs
+        return self.search(query, namespace, filter)
+
+    async def aretrieve(self, query: str, namespace: Namespaces = None, filter: Optional[Dict] = None) -> List[Document]:
+        # Chunks tagged with a named section answer first; untagged documents fall back
+        section_filter = self.section_filter(query)
+        if section_filter is not None:
+            docs = await self.asearch(query, namespace, self.merge_filters(filter, section_filter))
+            if docs:
+                return docs
+        return await self.asearch(query, namespace, filter)
+
+    def namespace_vector_counts(self) -> Dict[str, int]:
+        if self.vector_backend == "local":
+            return self.vector_store.namespace_counts()
+        index = self.pc.Index(self.index_name)
+        stats = index.describe_index_stats()
+        return {
+            namespace: summary.vector_count
+            for namespace, summary in stats.get("namespaces", {}).items()
+        }
+
+    def delete_namespace(self, namespace: str):
+        if self.vector_backend == "local":
+            self.vector_store.delete_namespace(namespace)
+        else:
             index = self.pc.Index(self.index_name)
-            stats = index.describe_index_stats()
-            current_vectors = stats.get("total_vector_count", 0)
-            logger.info(f"Current vectors in index: {current_vectors}")
-
-            if current_vectors + total_chunks > 10000:
-                raise Exception("This upload would exceed the free tier limit of 10,000 vectors")
-
-            # Process chunks and upload
-            logger.info("Starting embeddings generation and upload")
-            self.vector_store = PineconeVectorStore.from_documents(
-                documents=texts,
-                embedding=self.embeddings,
-                index_name=self.index_name,
+            index.delete(delete_all=True, namespace=namespace)
+        self.namespaces.forget(namespace)
+        logger.info(f"Deleted namespace {namespace!r} from the index.")
+
+    def evict_expired(self, keep: Optional[str] = None):
+        counts = self.namespace_vector_counts()
+        for namespace in self.namespaces.expired(list(counts)):
+            if namespace != keep:
+                self.delete_namespace(namespace)
+
+    def make_room(self, needed: int, keep: Optional[str] = None) -> int:
+        """Evict least recently used namespaces until ``needed`` more vectors fit.
+
+        Returns the vector count left in the index.
+        """
+        counts = self.namespace_vector_counts()
+        total = sum(counts.values())
+        candidates = self.namespaces.eviction_order([ns for ns in counts if ns != keep])
+        for namespace in candidates:
+            if total + needed <= MAX_VECTORS:
+                break
+            self.delete_namespace(namespace)
+            total -= counts[namespace]
+
+        if total + needed > MAX_VECTORS:
+            raise Exception("This upload would exceed the free tier limit of 10,000 vectors")
+        return total
+
+    def count_vectors(self) -> int:
+        if self.vector_backend == "local":
+            return sum(self.namespace_vector_counts().values())
+        index = self.pc.Index(self.index_name)
+        stats = index.describe_index_stats()
+        return stats.get("total_vector_count", 0)
+
+    def iter_pages(self, pdf_path: str) -> Iterator[Document]:
+        # Verify file exists
+        if not os.path.exists(pdf_path):
+            raise FileNotFoundError(f"PDF file not found: {pdf_path}")
+        if self.extract_workers > 1:
+            return iter_pages_parallel(pdf_path, self.extract_workers, self.pages_per_task)
+        return PyPDFLoader(pdf_path).lazy_load()
+
+    def split_pages(self, pages: Iterable[Document], state: Optional[SplitState] = None) -> List[Document]:
+        """Split one batch of pages; pass the same ``state`` for every batch of a document."""
+        if isinstance(self.text_splitter, LegalTextSplitter):
+            return self.text_splitter.split_documents(pages, state)
+        return self.text_splitter.split_documents(pages)
+
+    def add_chunks(self, chunks: List[Document], namespace: Optional[str] = None, start_id: int = 0) -> int:
+        if not chunks:
+            return 0
+        # Deterministic ids make re-running an interrupted ingestion idempotent
+        ids = [f"{namespace}-{start_id + i}" for i in range(len(chunks))] if namespace else None
+        # Embed up front so the upsert is timed on its own; its embedding call then hits the cache
+        with span("pdf_embed"):
+            self.embeddings.embed_documents([chunk.page_content for chunk in chunks])
+        with span("pdf_upsert"):
+            self.vector_store.add_documents(
+                chunks,
+                ids=ids,
+                namespace=namespace,
+                batch_size=self.upsert_batch_size,
+                embedding_chunk_size=self.embeddings.batch_size * self.embeddings.max_parallel_batches,
             )
-            logger.info("Successfully uploaded embeddings to Pinecone")
+        return len(chunks)
+
+    def process_pdf(self, pdf_path: str, namespace: Optional[str] = None) -> Dict:
+        try:
+            logger.info(f"Starting to process PDF: {pdf_path}")
+            
+            namespace = namespace or file_sha256(pdf_path)
+            if self.namespaces.is_ready(namespace):
+                logger.info(f"Namespace {namespace} already ingested, skipping")
+                self.namespaces.touch(namespace)
+                entry = self.namespaces.get(namespace)
+                return {
+                    "namespace": namespace,
+                    "total_pages": entry.get("pages", 0),
+                    "total_chunks": entry.get("chunks", 0),
+                    "skipped": True,
+                }
+
+            self.namespaces.start_ingesting(namespace)
+            try:
+                pages = list(self.iter_pages(pdf_path))
+                total_pages = len(pages)
+                logger.info(f"Loaded PDF with {total_pages} pages")
+
+                texts = self.split_pages(pages)
+                total_chunks = len(texts)
+                logger.info(f"Created {total_chunks} text chunks")
+
+                # Make room under the vector cap by evicting stale documents
+                current_vectors = self.make_room(total_chunks, keep=namespace)
+                logger.info(f"Current vectors in index: {current_vectors}")
+
+                # Process chunks and upload
+                logger.info("Starting embeddings generation and upload")
+                self.add_chunks(texts, namespace)
+                self.namespaces.mark_ready(namespace, total_chunks, pages=total_pages)
+                logger.info("Successfully uploaded embeddings to Pinecone")
+            finally:
+                self.namespaces.stop_ingesting(namespace)
 
             return {
+                "namespace": namespace,
                 "total_pages": total_pages,
                 "total_chunks": total_chunks,
                 "vectors_before": current_vectors,
@@ -183,10 +442,9 @@ class LargePDFProcessor:
             logger.error(f"Error processing PDF: {str(e)}")
             raise
 
-    def query_pdf(self, question: str,language: str,chat_history) -> str:
-        try:
-            logger.info(f"Processing query: {question}")
-            question = formatted_question = f"""
+    @staticmethod
+    def format_question(question: str, language: str, chat_history) -> str:
+        return f"""
             Previous conversation:
             {chat_history}
 
@@ -194,50 +452,126 @@ class LargePDFProcessor:
              Language: {language}
              Please provide a well-structured answer based on the context and previous conversation.
              """
-            # Modify the chain invocation to ensure complete responses
-            result = self.chain.invoke({
-                "question": question,
-                "chat_history": [],  # Reset chat history each time
-            }, config={
-                "max_tokens": 2000,  # Explicitly set max tokens for response
-                "temperature": 0.7,  # Slightly increase temperature for more complete responses
-                "stop": None,  # Remove any stop tokens that might cause early cutoff
-            })
-            
+
+    @staticmethod
+    def format_sources(source_documents) -> list:
+        return [
+            {
+                "page": doc.metadata.get("page", "Unknown"),
+                "text": doc.page_content[:200] + "...",
+                "source": doc.metadata.get("source", "Unknown"),
+                "page_end": doc.metadata.get("page_end", doc.metadata.get("page", "Unknown")),
+                "section": doc.metadata.get("section"),
+                "document_id": doc.metadata.get("document_id"),
+            }
+            for doc in source_documents
+        ]
+
+    def query_pdf(
+        self,
+        question: str,
+        language: str,
+        chat_history,
+        namespace: Namespaces = None,
+        retrieval_query: Optional[str] = None,
+        filter: Optional[Dict] = None,
+    ) -> str:
+        try:
+            logger.info(f"Processing query: {question}")
+            # The retriever only sees the standalone question; the history goes to the model
+            with span("pdf_retrieve"):
+                docs = self.retrieve(retrieval_query or question, namespace, filter)
+            chain_input = {
+                "context": "\n\n".join(doc.page_content for doc in docs),
+                "question": self.format_question(question, language, chat_history),
+            }
+            with span("chain_pdf"):
+                answer = self.answer_chain.invoke(chain_input)
+            record_tokens("pdf", chain_input["context"] + chain_input["question"], answer)
+
             logger.info("Query processed successfully")
-            
-            # Validate response completeness
-            answer = result.get("answer", "")
-            # if answer and not answer.endswith((".", "!", "?")):
-            #     # If response seems truncated, try to complete it
-            #     follow_up = self.chain.invoke({
-            #         "question": "Please continue the previous response about the Aarushi case",
-            #         "chat_history": [{"role": "assistant", "content": answer}]
-            #     })
-            #     answer = answer + " " + follow_up.get("answer", "")
-            
             return {
                 "answer": answer,
-                "sources": [
-                    {
-                        "page": doc.metadata.get("page", "Unknown"),
-                        "text": doc.page_content[:200] + "...",
-                        "source": doc.metadata.get("source", "Unknown"),
-                    }
-                    for doc in result.get("source_documents", [])
-                ],
+                "sources": self.format_sources(docs),
             }
                 
+        except Overloaded:
+            raise
+        except Exception as e:
+            logger.error(f"Error processing query: {str(e)}")
+            return {"error": str(e)}
+
+    async def aquery_pdf(
+        self,
+        question: str,
+        language: str,
+        chat_history,
+        namespace: Namespaces = None,
+        retrieval_query: Optional[str] = None,
+        filter: Optional[Dict] = None,
+    ) -> Dict:
+        """Async ``query_pdf``: never blocks the event loop and can be cancelled.
+
+        The embedding and chat calls are native async. Vector store queries
+        without an async client run on the loop's default (bounded) executor.
+        """
+        try:
+            logger.info(f"Processing query: {question}")
+            with span("pdf_retrieve"):
+                docs = await self.aretrieve(retrieval_query or question, namespace, filter)
+            chain_input = {
+                "context": "\n\n".join(doc.page_content for doc in docs),
+                "question": self.format_question(question, language, chat_history),
+            }
+            with span("chain_pdf"):
+                answer = await self.answer_chain.ainvoke(chain_input)
+            record_tokens("pdf", chain_input["context"] + chain_input["question"], answer)
+
+            logger.info("Query processed successfully")
+            return {
+                "answer": answer,
+                "sources": self.format_sources(docs),
+            }
+
+        except Overloaded:
+            raise
         except Exception as e:
             logger.error(f"Error processing query: {str(e)}")
             return {"error": str(e)}
 
-    def clear_memory(self):
-        self.memory.clear()
-        logger.info("Conversation memory cleared")
+    async def astream_pdf(
+        self,
+        question: str,
+        language: str,
+        chat_history,
+        namespace: Namespaces = None,
+        retrieval_query: Optional[str] = None,
+        filter: Optional[Dict] = None,
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """Stream the answer for a PDF question, then its sources."""
+        logger.info(f"Streaming query: {question}")
+        formatted_question = self.format_question(question, language, chat_history)
+
+        with span("pdf_retrieve"):
+            docs = await self.aretrieve(retrieval_query or question, namespace, filter)
+        context = "\n\n".join(doc.page_content for doc in docs)
+
+        tokens = []
+        with span("chain_pdf"):
+            async for token in self.answer_chain.astream({"context": context, "question": formatted_question}):
+                if token:
+                    tokens.append(token)
+                    yield "token", token
+        record_tokens("pdf", context + formatted_question, "".join(tokens))
+
+        logger.info("Streaming query processed successfully")
+        yield "sources", self.format_sources(docs)
 
     def get_index_stats(self) -> Dict:
         try:
+            if self.vector_backend == "local":
+                counts = self.namespace_vector_counts()
+                return {"total_vector_count": sum(counts.values()), "namespaces": counts}
             index = self.pc.Index(self.index_name)
             stats = index.describe_index_stats()
             logger.info(f"Retrieved index stats: {stats}")
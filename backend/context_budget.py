@@ -0,0 +1,194 @@
+import re
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=1)
+def _encoding():
+    """cl100k_base, loaded on first use; None if tiktoken or its BPE file is unavailable."""
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:  # tiktoken missing or its BPE file unavailable offline
+        logger.warning(f"tiktoken unavailable, estimating tokens from length: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    encoding = _encoding()
+    if encoding is None:
+        return text[:max_tokens * 4]
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+
+
+@dataclass
+class ContextChunk:
+    text: str
+    score: float
+    source: str = ""
+    page: int = 0
+    offset: int = 0
+    payload: Optional[object] = None
+
+
+def _shingles(text: str, size: int = 3) -> set:
+    words = re.findall(r"\w+", text.lower())
+    return {" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+
+
+def _overlap(previous: str, current: str, min_chars: int = 20) -> int:
+    """Length of the longest suffix of ``previous`` that starts ``current``."""
+    probe = current[:min_chars]
+    if len(probe) < min_chars:
+        return 0
+    start = previous.find(probe)
+    while start != -1:
+        if current.startswith(previous[start:]):
+            return len(previous) - start
+        start = previous.find(probe, start + 1)
+    return 0
+
+
+class ContextBudgeter:
+    """Assembles retrieved chunks into a prompt context under a token budget.
+
+    Near-duplicates are dropped, text repeated by the splitter's overlap
+    between adjacent chunks of the same page is trimmed, the best-scoring
+    chunks are kept until the budget runs out, and the survivors are put back
+    in document order.
+    """
+
+    def __init__(self, similarity_threshold: float = 0.85):
+        self.similarity_threshold = similarity_threshold
+        self.total_tokens_in = 0
+        self.total_tokens_saved = 0
+
+    def assemble(self, chunks: List[ContextChunk], budget: int) -> Tuple[List[ContextChunk], Dict]:
+        tokens_in = sum(count_tokens(chunk.text) for chunk in chunks)
+
+        ranked = sorted(chunks, key=lambda chunk: chunk.score, reverse=True)
+        unique: List[Tuple[ContextChunk, set]] = []
+        for chunk in ranked:
+            shingles = _shingles(chunk.text)
+            if any(len(shingles & other) / len(shingles | other) >= self.similarity_threshold for _, other in unique):
+                continue
+            unique.append((chunk, shingles))
+        duplicates = len(chunks) - len(unique)
+
+        # Trim overlap against the preceding chunk of the same page
+        by_position = sorted((chunk for chunk, _ in unique), key=lambda c: (c.source, c.page, c.offset))
+        trimmed_chars = 0
+        for previous, current in zip(by_position, by_position[1:]):
+            if (previous.source, previous.page) == (current.source, current.page):
+                overlap = _overlap(previous.text, current.text)
+                if overlap:
+                    current.text = current.text[overlap:].lstrip()
+                    trimmed_chars += overlap
+
+        selected, used = [], 0
+        for chunk, _ in unique:
+            if not chunk.text:
+                continue
+            cost = count_tokens(chunk.text)
+            if used + cost > budget:
+                remaining = budget - used
+                if remaining >= 50:
+                    chunk.text = truncate_tokens(chunk.text, remaining)
+                    selected.append(chunk)
+                    used += remaining
+                break
+            selected.append(chunk)
+            used += cost
+        selected.sort(key=lambda c: (c.source, c.page, c.offset))
+
+        report = {
+            "chunks_in": len(chunks),
+            "chunks_out": len(selected),
+            "duplicates_removed": duplicates,
+            "overlap_chars_trimmed": trimmed_chars,
+            "tokens_in": tokens_in,
+            "tokens_out": used,
+            "tokens_saved": max(0, tokens_in - used),
+            "budget": budget,
+        }
+        self.total_tokens_in += tokens_in
+        self.total_tokens_saved += report["tokens_saved"]
+        return selected, report
+
+    def build_context(self, chunks: List[ContextChunk], budget: int, separator: str = "\n") -> Tuple[str, Dict]:
+        selected, report = self.assemble(chunks, budget)
+        return separator.join(chunk.text for chunk in selected), report
+
+
+def chunks_from_search_results(results: List[Dict]) -> List[ContextChunk]:
+    total = len(results)
+    return [
+        ContextChunk(
+            text=result["content"],
+            score=result.get("@search.score") or float(total - rank),
+            # Azure Search chunks carry no source; keying on the chunk id keeps
+            # overlap trimming from treating every chunk as one document
+            source=str(result.get("act") or result.get("source") or result.get("id") or ""),
+            page=int(result.get("metadata_page") or 0),
+            offset=int(result.get("start_index") or 0),
+            payload=result,
+        )
+        for rank, result in enumerate(results)
+    ]
+
+
+def chunks_from_documents(docs: List[Document]) -> List[ContextChunk]:
+    # Retrievers return documents best first; use the rank as the score
+    total = len(docs)
+    return [
+        ContextChunk(
+            text=doc.page_content,
+            score=float(total - rank),
+            source=str(doc.metadata.get("source") or doc.metadata.get("document_id") or ""),
+            page=int(doc.metadata.get("page", 0) or 0),
+            offset=int(doc.metadata.get("start_index", 0) or 0),
+            payload=doc,
+        )
+        for rank, doc in enumerate(docs)
+    ]
+
+
+def budget_documents(docs: List[Document], budgeter: ContextBudgeter, budget: int) -> List[Document]:
+    """Best-first ``docs`` deduplicated and trimmed to ``budget`` tokens, in document order."""
+    selected, report = budgeter.assemble(chunks_from_documents(docs), budget)
+    logger.info(f"PDF context: {report['tokens_out']} tokens, saved {report['tokens_saved']}")
+    return [Document(page_content=chunk.text, metadata=chunk.payload.metadata) for chunk in selected]
+
+
+class BudgetedRetriever(BaseRetriever):
+    """Wraps a retriever so the PDF chain only ever sees budgeted context."""
+
+    retriever: BaseRetriever
+    budgeter: ContextBudgeter
+    budget: int
+
+    def _apply(self, docs: List[Document]) -> List[Document]:
+        return budget_documents(docs, self.budgeter, self.budget)
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return self._apply(self.retriever.invoke(query, config={"callbacks": run_manager.get_child()}))
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return self._apply(await self.retriever.ainvoke(query, config={"callbacks": run_manager.get_child()}))
@@ -0,0 +1,275 @@
+import os
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from metrics import span
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(text: str, namespace: str = "") -> str:
+    return hashlib.sha256(f"{namespace}\0{text}".encode("utf-8")).hexdigest()
+
+
+class DiskEmbeddingStore:
+    """Fixed-capacity, memory-mapped float32 ring buffer of embeddings.
+
+    ``vectors.f32`` holds the rows, ``keys.bin`` the 32-byte content hash that
+    owns each row and ``head`` the next row to write. Several processes (e.g.
+    uvicorn workers) can share one directory: writers serialize on an
+    ``flock`` of ``lock`` and advance the shared ``head``, and a read only
+    counts if the row is still owned by the key, since another process may
+    have reused it. Without ``fcntl`` (Windows) the directory must not be
+    shared between processes.
+    """
+
+    def __init__(self, directory: str, capacity: int = 100_000):
+        self.directory = directory
+        self.capacity = capacity
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.keys_path = os.path.join(directory, "keys.bin")
+        self.head_path = os.path.join(directory, "head")
+        self.dim_path = os.path.join(directory, "dim")
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._lock_file = open(os.path.join(directory, "lock"), "a+")
+        # Rows this process has seen a key in; verified against keys.bin on read
+        self._rows: Dict[str, int] = {}
+        self._vectors: Optional[np.memmap] = None
+        self._keys: Optional[np.memmap] = None
+        self._head: Optional[np.memmap] = None
+
+        with self._file_lock():
+            if self._exists():
+                self._open()
+                self._load_keys()
+
+    @contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _exists(self) -> bool:
+        return all(os.path.exists(path) for path in (self.dim_path, self.vectors_path, self.keys_path, self.head_path))
+
+    def _create(self, dim: int):
+        self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="w+", shape=(self.capacity, dim))
+        self._keys = np.memmap(self.keys_path, dtype=np.uint8, mode="w+", shape=(self.capacity, 32))
+        self._head = np.memmap(self.head_path, dtype=np.int64, mode="w+", shape=(1,))
+        self.flush()
+        # Written last: the store only counts as existing once every file is in place
+        with open(self.dim_path, "w") as f:
+            f.write(str(dim))
+
+    def _open(self):
+        with open(self.dim_path) as f:
+            dim = int(f.read().strip())
+        self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(self.capacity, dim))
+        self._keys = np.memmap(self.keys_path, dtype=np.uint8, mode="r+", shape=(self.capacity, 32))
+        self._head = np.memmap(self.head_path, dtype=np.int64, mode="r+", shape=(1,))
+
+    def _load_keys(self):
+        for row in np.flatnonzero(self._keys.any(axis=1)):
+            self._rows[self._keys[row].tobytes().hex()] = int(row)
+        logger.info(f"Loaded {len(self._rows)} cached embeddings from {self.directory}")
+
+    def _owned(self, key: str, row: int) -> bool:
+        return self._keys[row].tobytes() == bytes.fromhex(key)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        # Held so a row is never read while put() in this process is overwriting it
+        with self._lock:
+            row = self._rows.get(key)
+            if row is None or self._vectors is None:
+                return None
+            vector = np.array(self._vectors[row])
+            # Checked after the copy: a writer clears the owner before touching the row
+            if not self._owned(key, row):
+                del self._rows[key]
+                return None
+            return vector
+
+    def put(self, key: str, vector: np.ndarray):
+        with self._lock:
+            row = self._rows.get(key)
+            if row is not None and self._vectors is not None and self._owned(key, row):
+                return
+            with self._file_lock():
+                if self._vectors is None:
+                    # Another process may have created the store since this one started
+                    if self._exists():
+                        self._open()
+                    else:
+                        self._create(len(vector))
+                row = int(self._head[0])
+                self._head[0] = (row + 1) % self.capacity
+                self._keys[row] = 0
+                self._vectors[row] = vector
+                self._keys[row] = np.frombuffer(bytes.fromhex(key), dtype=np.uint8)
+            self._rows[key] = row
+
+    def flush(self):
+        for array in (self._vectors, self._keys, self._head):
+            if array is not None:
+                array.flush()
+
+
+class CachedEmbeddings(Embeddings):
+    """Content-hash cache and explicit batching in front of another Embeddings.
+
+    Both the query path (retriever, answer cache) and the ingest path
+    (``embed_documents``) go through the same cache, so identical text is only
+    ever embedded once. Misses are deduplicated, split into ``batch_size``
+    requests and sent with at most ``max_parallel_batches`` in flight.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model_name: str = "",
+        batch_size: int = 64,
+        max_parallel_batches: int = 4,
+        max_entries: int = 10_000,
+        disk_store: Optional[DiskEmbeddingStore] = None,
+    ):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_parallel_batches = max_parallel_batches
+        self.max_entries = max_entries
+        self.disk_store = disk_store
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_parallel_batches, thread_name_prefix="embed")
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                return vector
+        if self.disk_store is not None:
+            vector = self.disk_store.get(key)
+            if vector is not None:
+                self._remember(key, vector)
+            return vector
+        return None
+
+    def _remember(self, key: str, vector: np.ndarray):
+        with self._lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _store(self, key: str, vector: List[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        self._remember(key, array)
+        if self.disk_store is not None:
+            self.disk_store.put(key, array)
+        return array
+
+    def _plan(self, texts: List[str]):
+        """Split ``texts`` into cached vectors and batches of unique misses."""
+        keys = [content_hash(text, self.model_name) for text in texts]
+        found: Dict[str, np.ndarray] = {}
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key in found or key in missing:
+                continue
+            vector = self._lookup(key)
+            if vector is None:
+                missing[key] = text
+            else:
+                found[key] = vector
+        self.hits += len(found)
+        self.misses += len(missing)
+
+        pending = list(missing.items())
+        batches = [pending[i:i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+        return keys, found, batches
+
+    def _assemble(self, keys: List[str], found: Dict[str, np.ndarray], batches, results) -> List[List[float]]:
+        for batch, vectors in zip(batches, results):
+            for (key, _), vector in zip(batch, vectors):
+                found[key] = self._store(key, vector)
+        if batches and self.disk_store is not None:
+            self.disk_store.flush()
+        return [found[key].tolist() for key in keys]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, batches = self._plan(texts)
+        if batches:
+            logger.info(f"Embedding {sum(len(b) for b in batches)} uncached texts in {len(batches)} batches")
+        with span("embedding"):
+            results = list(self._executor.map(
+                lambda batch: self.embeddings.embed_documents([text for _, text in batch]), batches
+            ))
+        return self._assemble(keys, found, batches, results)
+
+    async def _off_loop(self, fn, *args):
+        # Disk store reads, writes and flushes must not block the event loop
+        if self.disk_store is None:
+            return fn(*args)
+        return await asyncio.to_thread(fn, *args)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, batches = await self._off_loop(self._plan, texts)
+        semaphore = asyncio.Semaphore(self.max_parallel_batches)
+
+        async def run(batch):
+            async with semaphore:
+                return await self.embeddings.aembed_documents([text for _, text in batch])
+
+        with span("embedding"):
+            results = await asyncio.gather(*(run(batch) for batch in batches))
+        return await self._off_loop(self._assemble, keys, found, batches, results)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = content_hash(text, self.model_name)
+        vector = self._lookup(key)
+        if vector is not None:
+            self.hits += 1
+            return vector.tolist()
+        self.misses += 1
+        with span("embedding"):
+            result = self.embeddings.embed_query(text)
+        self._store(key, result)
+        return result
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = content_hash(text, self.model_name)
+        vector = await self._off_loop(self._lookup, key)
+        if vector is not None:
+            self.hits += 1
+            return vector.tolist()
+        self.misses += 1
+        with span("embedding"):
+            result = await self.embeddings.aembed_query(text)
+        await self._off_loop(self._store, key, result)
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._memory), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,193 @@
+import re
+import json
+import math
+import logging
+from collections import Counter, defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Canonical act codes for the spellings users and statutes actually use
+ACT_ALIASES = {
+    "ipc": "ipc", "i.p.c": "ipc", "i p c": "ipc", "indian penal code": "ipc",
+    "crpc": "crpc", "cr.p.c": "crpc", "cr p c": "crpc", "cr.pc": "crpc", "code of criminal procedure": "crpc",
+    "bns": "bns", "bharatiya nyaya sanhita": "bns",
+    "bnss": "bnss", "bharatiya nagarik suraksha sanhita": "bnss",
+    "bsa": "bsa", "bharatiya sakshya adhiniyam": "bsa",
+    "evidence act": "iea", "indian evidence act": "iea", "iea": "iea",
+}
+_ACT = "|".join(sorted((re.escape(alias).replace(r"\ ", r"\s+") for alias in ACT_ALIASES), key=len, reverse=True))
+_SECTION = r"(\d+[A-Z]?(?:\s*\(\s*\w{1,4}\s*\))*)"
+
+# "Section 376(2)(a) IPC", "s. 420 of IPC", "CrPC 161", "IPC section 302", "302 IPC"
+SECTION_PATTERNS = [
+    re.compile(rf"\b(?:section|sec\.?|s\.|u/s\.?)\s*{_SECTION}(?:\s*(?:of\s+(?:the\s+)?)?({_ACT})\b)?", re.IGNORECASE),
+    re.compile(rf"\b({_ACT})\s*(?:section|sec\.?|s\.)?\s*{_SECTION}", re.IGNORECASE),
+    re.compile(rf"\b{_SECTION}\s*(?:of\s+(?:the\s+)?)?({_ACT})\b", re.IGNORECASE),
+]
+# Statute text starts a section with its number: "302. Punishment for murder.—"
+SECTION_HEADING = re.compile(r"^\s*(\d+[A-Z]?)\.\s+[A-Z]", re.MULTILINE)
+TOKEN = re.compile(r"\d+[a-z]?(?:\(\w{1,4}\))*|[^\W\d_]+", re.IGNORECASE | re.UNICODE)
+
+
+def canonical_act(act: Optional[str]) -> Optional[str]:
+    if not act:
+        return None
+    return ACT_ALIASES.get(" ".join(act.lower().split()), act.lower())
+
+
+def canonical_section(number: str) -> str:
+    return re.sub(r"\s+", "", number).lower()
+
+
+def extract_section_refs(text: str) -> List[Tuple[Optional[str], str]]:
+    """Return (act or None, section) references such as ("ipc", "376(2)(a)")."""
+    refs = []
+    for pattern_index, pattern in enumerate(SECTION_PATTERNS):
+        for match in pattern.finditer(text):
+            if pattern_index == 1:
+                act, number = match.group(1), match.group(2)
+            else:
+                number, act = match.group(1), match.group(2)
+            ref = (canonical_act(act), canonical_section(number))
+            if ref not in refs:
+                refs.append(ref)
+    # "IPC section 420" also matches as a bare "section 420"; keep the qualified one
+    qualified = {number for act, number in refs if act}
+    return [(act, number) for act, number in refs if act or number not in qualified]
+
+
+def section_keys(act: Optional[str], number: str) -> List[str]:
+    """Index keys for a section: the bare number, its parent, and act-qualified forms."""
+    base = number.split("(")[0]
+    numbers = [number] if base == number else [number, base]
+    keys = list(numbers)
+    if act:
+        keys += [f"{act}:{n}" for n in numbers]
+    return keys
+
+
+def tokenize(text: str) -> List[str]:
+    return [token.lower() for token in TOKEN.findall(text)]
+
+
+class BM25Index:
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self.lengths: List[int] = []
+        self.total_length = 0
+
+    def add(self, text: str) -> int:
+        doc = len(self.lengths)
+        tokens = tokenize(text)
+        for term, count in Counter(tokens).items():
+            self.postings[term][doc] = count
+        self.lengths.append(len(tokens))
+        self.total_length += len(tokens)
+        return doc
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[int, float]]:
+        n = len(self.lengths)
+        if not n:
+            return []
+        average = self.total_length / n
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc, tf in postings.items():
+                norm = tf + self.k1 * (1 - self.b + self.b * self.lengths[doc] / average)
+                scores[doc] += idf * tf * (self.k1 + 1) / norm
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+
+class HybridIndex:
+    """Lexical side of hybrid retrieval over the legal corpus.
+
+    Holds a BM25 inverted index and a section-number -> chunk index. Chunks
+    are dicts shaped like Azure Search results (``id``, ``content``,
+    ``metadata_page`` and optionally ``act``).
+    """
+
+    def __init__(self):
+        self.docs: List[Dict] = []
+        self.bm25 = BM25Index()
+        # key -> [(priority, doc)]; headings rank before mere mentions
+        self.sections: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def add(self, doc: Dict):
+        index = self.bm25.add(doc["content"])
+        self.docs.append(doc)
+        act = canonical_act(doc.get("act"))
+        seen = set()
+        for number in SECTION_HEADING.findall(doc["content"]):
+            for key in section_keys(act, canonical_section(number)):
+                if key not in seen:
+                    seen.add(key)
+                    self.sections[key].append((0, index))
+        for ref_act, number in extract_section_refs(doc["content"]):
+            for key in section_keys(ref_act or act, number):
+                if key not in seen:
+                    seen.add(key)
+                    self.sections[key].append((1, index))
+
+    def lookup_sections(self, query: str, k: int = 10) -> List[Dict]:
+        """Chunks that define or cite the sections named in ``query``."""
+        hits: Dict[int, int] = {}
+        for act, number in extract_section_refs(query):
+            # Fall back from a sub-section like 376(2)(a) to its section 376
+            for candidate in dict.fromkeys([number, number.split("(")[0]]):
+                postings = self.sections.get(f"{act}:{candidate}" if act else candidate, [])
+                for priority, doc in postings:
+                    hits[doc] = min(priority, hits.get(doc, priority))
+                if postings:
+                    break
+        ranked = sorted(hits, key=lambda doc: (hits[doc], doc))
+        return [dict(self.docs[doc], **{"@search.score": 1.0}) for doc in ranked[:k]]
+
+    def search(self, query: str, k: int = 10) -> List[Dict]:
+        return [dict(self.docs[doc], **{"@search.score": score}) for doc, score in self.bm25.search(query, k)]
+
+    @classmethod
+    def from_docs(cls, docs: Iterable[Dict]) -> "HybridIndex":
+        index = cls()
+        for doc in docs:
+            index.add(doc)
+        logger.info(f"Hybrid index built over {len(index)} chunks, {len(index.sections)} section keys")
+        return index
+
+    @classmethod
+    def from_jsonl(cls, path: str) -> "HybridIndex":
+        with open(path) as f:
+            return cls.from_docs(json.loads(line) for line in f if line.strip())
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict]) -> "HybridIndex":
+        """Build from LocalVectorIndex records ({"id", "text", "metadata"})."""
+        return cls.from_docs(
+            {"id": record["id"], "content": record["text"], **record.get("metadata", {})}
+            for record in records
+        )
+
+
+def reciprocal_rank_fusion(
+    result_lists: Sequence[List[Dict]],
+    k: int = 60,
+    key: Callable[[Dict], str] = lambda result: result["id"],
+) -> List[Dict]:
+    scores: Dict[str, float] = defaultdict(float)
+    first_seen: Dict[str, Dict] = {}
+    for results in result_lists:
+        for rank, result in enumerate(results):
+            result_key = key(result)
+            scores[result_key] += 1.0 / (k + rank + 1)
+            first_seen.setdefault(result_key, result)
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    return [dict(first_seen[result_key], **{"@search.score": scores[result_key]}) for result_key in ranked]
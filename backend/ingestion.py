@@ -0,0 +1,203 @@
+import os
+import time
+import uuid
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from chatwithpdf import LargePDFProcessor
+from legal_splitter import SplitState
+from metrics import span
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class IngestionJob:
+    job_id: str
+    file_path: str
+    filename: str
+    session_id: str
+    namespace: str
+    status: str = "queued"
+    skipped: bool = False
+    pages_done: int = 0
+    chunks_done: int = 0
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    errors: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict:
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        return {
+            "job_id": self.job_id,
+            "filename": self.filename,
+            "namespace": self.namespace,
+            "status": self.status,
+            "skipped": self.skipped,
+            "pages_done": self.pages_done,
+            "chunks_done": self.chunks_done,
+            "elapsed_seconds": round(elapsed, 3),
+            "pages_per_second": round(self.pages_done / elapsed, 2) if elapsed else 0.0,
+            "chunks_per_second": round(self.chunks_done / elapsed, 2) if elapsed else 0.0,
+            "errors": self.errors,
+        }
+
+
+class IngestionQueue:
+    """Background PDF ingestion with a fixed pool of worker tasks.
+
+    Each job runs as a two-stage pipeline: a loader reads pages into batches
+    while the previous batch is split, embedded and upserted, so chunks become
+    queryable as they land rather than once the whole document is done.
+    """
+
+    def __init__(
+        self,
+        processor: LargePDFProcessor,
+        workers: int = 2,
+        page_batch_size: int = 16,
+        max_jobs: int = 1000,
+    ):
+        self.processor = processor
+        self.workers = workers
+        self.page_batch_size = page_batch_size
+        self.max_jobs = max_jobs
+        self.jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"Ingestion queue started with {self.workers} workers")
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, file_path: str, filename: str, session_id: str, namespace: str) -> IngestionJob:
+        # The same document uploaded twice while the first copy is ingesting shares one job
+        for job in self.jobs.values():
+            if job.namespace == namespace and job.status in ("queued", "running"):
+                if os.path.exists(file_path) and file_path != job.file_path:
+                    os.remove(file_path)
+                return job
+
+        job = IngestionJob(
+            job_id=uuid.uuid4().hex,
+            file_path=file_path,
+            filename=filename,
+            session_id=session_id,
+            namespace=namespace,
+        )
+        self.jobs[job.job_id] = job
+        self._trim()
+        self._queue.put_nowait(job)
+        logger.info(f"Queued ingestion job {job.job_id} for {filename}")
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        return self.jobs.get(job_id)
+
+    def _trim(self):
+        # Forget the oldest finished jobs once the registry is full
+        for job_id in list(self.jobs):
+            if len(self.jobs) <= self.max_jobs:
+                break
+            if self.jobs[job_id].status in ("completed", "failed"):
+                del self.jobs[job_id]
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ingestion job {job.job_id} failed: {str(e)}")
+                job.status = "failed"
+                job.errors.append(str(e))
+            finally:
+                job.finished_at = time.time()
+                if os.path.exists(job.file_path):
+                    os.remove(job.file_path)
+                self._queue.task_done()
+
+    async def _run(self, job: IngestionJob):
+        job.status = "running"
+        job.started_at = time.time()
+
+        if self.processor.namespaces.is_ready(job.namespace):
+            logger.info(f"Namespace {job.namespace} already ingested, skipping job {job.job_id}")
+            self.processor.namespaces.touch(job.namespace)
+            job.skipped = True
+            job.status = "completed"
+            return
+
+        # Registered before evicting so other workers never evict a half-ingested namespace
+        self.processor.namespaces.start_ingesting(job.namespace)
+        try:
+            await self._ingest(job)
+        finally:
+            self.processor.namespaces.stop_ingesting(job.namespace)
+
+        job.status = "completed"
+        logger.info(f"Ingestion job {job.job_id} completed: {job.pages_done} pages, {job.chunks_done} chunks")
+
+    async def _ingest(self, job: IngestionJob):
+        await asyncio.to_thread(self.processor.evict_expired, job.namespace)
+
+        batches: asyncio.Queue = asyncio.Queue(maxsize=2)
+        loader = asyncio.create_task(self._load_pages(job, batches))
+        # Sections, act and offsets continue across page batches
+        split_state = SplitState()
+        try:
+            while True:
+                pages = await batches.get()
+                if pages is None:
+                    break
+                if isinstance(pages, Exception):
+                    raise pages
+                with span("pdf_split"):
+                    chunks = await asyncio.to_thread(self.processor.split_pages, pages, split_state)
+                with span("pdf_evict"):
+                    await asyncio.to_thread(self.processor.make_room, len(chunks), job.namespace)
+                await asyncio.to_thread(self.processor.add_chunks, chunks, job.namespace, job.chunks_done)
+                job.chunks_done += len(chunks)
+            await loader
+        finally:
+            loader.cancel()
+
+        self.processor.namespaces.mark_ready(
+            job.namespace, job.chunks_done, pages=job.pages_done, filename=job.filename
+        )
+
+    async def _load_pages(self, job: IngestionJob, batches: asyncio.Queue):
+        # Errors are handed to the consumer through the queue so it never waits forever
+        try:
+            pages = self.processor.iter_pages(job.file_path)
+            batch = []
+            while True:
+                with span("pdf_load_page"):
+                    page = await asyncio.to_thread(next, pages, None)
+                if page is None:
+                    break
+                batch.append(page)
+                job.pages_done += 1
+                if len(batch) >= self.page_batch_size:
+                    await batches.put(batch)
+                    batch = []
+            if batch:
+                await batches.put(batch)
+        except Exception as e:
+            await batches.put(e)
+            return
+        await batches.put(None)
@@ -0,0 +1,212 @@
+import re
+import bisect
+import logging
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from hybrid import ACT_ALIASES, canonical_act, canonical_section
+
+logger = logging.getLogger(__name__)
+
+# "302. Punishment for murder.—", "Section 302. ...", "Sec. 498A:"
+# Only the keyword is case-insensitive: the heading text must start with a capital
+SECTION_START = re.compile(
+    r"^[ \t]*(?:(?i:section|sec\.?)\s*)?(\d{1,4}[A-Z]{0,2})\s*[.:—-]\s+(?=[A-Z(—\"'])",
+    re.MULTILINE,
+)
+# "(1) Whoever ...", "(2A) ..." at the start of a line
+SUBSECTION_START = re.compile(r"^[ \t]*\((\d{1,3}[A-Z]?)\)\s+", re.MULTILINE)
+# Clauses, explanations, illustrations, exceptions and provisos
+CLAUSE_START = re.compile(
+    r"^[ \t]*(?:\([a-z]{1,4}\)\s+|(?:Explanation|Illustrations?|Exception|Provided that)\b)",
+    re.MULTILINE,
+)
+PARAGRAPH_BREAK = re.compile(r"\n[ \t]*\n")
+JUDGMENT_MARKERS = re.compile(
+    r"\b(?:JUDGMENT|appellant|respondent|petitioner|versus|vs\.)", re.IGNORECASE
+)
+_ACT_NAME = re.compile(
+    "|".join(sorted((re.escape(alias).replace(r"\ ", r"\s+") for alias in ACT_ALIASES if len(alias) > 4),
+                    key=len, reverse=True)),
+    re.IGNORECASE,
+)
+
+
+def detect_act(text: str) -> Optional[str]:
+    """The most frequently named act in ``text``, as a canonical code like "ipc"."""
+    counts: Dict[str, int] = {}
+    for match in _ACT_NAME.finditer(text):
+        act = canonical_act(match.group(0))
+        counts[act] = counts.get(act, 0) + 1
+    return max(counts, key=counts.get) if counts else None
+
+
+def _cut(text: str, pattern: re.Pattern, start: int, end: int) -> List[Tuple[int, int]]:
+    """Split [start, end) at every match of ``pattern`` inside it."""
+    bounds = [start] + [m.start() for m in pattern.finditer(text, start, end) if m.start() > start] + [end]
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if text[a:b].strip()]
+
+
+@dataclass
+class SplitState:
+    """Carried across the page batches of one document.
+
+    Keeps the section left open at the end of a batch, the document's act and
+    type, and the character offset of the next batch.
+    """
+
+    offset: int = 0
+    section: Optional[str] = None
+    judgment: Optional[bool] = None
+    act: Optional[str] = None
+
+
+class LegalTextSplitter:
+    """Chunks statutes and judgments on their own structure.
+
+    Sections are cut at their headings. A section longer than ``chunk_size``
+    is cut at sub-sections, then clauses/explanations, then paragraphs, and
+    only then by characters. Consecutive short sections are packed together,
+    so no overlap is needed. Every chunk records its ``section`` (and all
+    ``sections`` it covers), ``act``, ``page_start``/``page_end`` and, for
+    judgments, the numbered ``paragraph``. Pass one ``SplitState`` to every
+    call when a document is split in page batches.
+    """
+
+    def __init__(self, chunk_size: int = 1500, min_chunk_size: int = 500, fallback_overlap: int = 100):
+        self.chunk_size = chunk_size
+        self.min_chunk_size = min_chunk_size
+        self.fallback_overlap = fallback_overlap
+        self._fallback = None
+
+    @property
+    def fallback(self):
+        # Imported on first use; only text with no structure left needs it
+        if self._fallback is None:
+            from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+            self._fallback = RecursiveCharacterTextSplitter(
+                chunk_size=self.chunk_size, chunk_overlap=self.fallback_overlap, length_function=len
+            )
+        return self._fallback
+
+    def split_documents(self, pages: Iterable[Document], state: Optional[SplitState] = None) -> List[Document]:
+        pages = list(pages)
+        if not pages:
+            return []
+        state = state if state is not None else SplitState()
+        text_parts, page_starts, page_numbers = [], [], []
+        offset = 0
+        for page in pages:
+            page_starts.append(offset)
+            page_numbers.append(page.metadata.get("page", 0))
+            text_parts.append(page.page_content)
+            offset += len(page.page_content) + 1
+        text = "\n".join(text_parts)
+        source = pages[0].metadata.get("source", "")
+        # Decided on the document's first batch; an act is looked for until one is named
+        if state.judgment is None:
+            state.judgment = len(JUDGMENT_MARKERS.findall(text[:5000])) >= 2
+        if state.act is None and not state.judgment:
+            state.act = detect_act(text)
+        judgment, act = state.judgment, state.act
+
+        def page_at(position: int) -> int:
+            return page_numbers[bisect.bisect_right(page_starts, position) - 1]
+
+        # (start, end, section number or None) for each structural block
+        headings = list(SECTION_START.finditer(text))
+        blocks = []
+        if not headings or headings[0].start() > 0:
+            # Text before the first heading continues the previous batch's open section
+            blocks.append((0, headings[0].start() if headings else len(text), state.section))
+        for i, match in enumerate(headings):
+            end = headings[i + 1].start() if i + 1 < len(headings) else len(text)
+            blocks.append((match.start(), end, canonical_section(match.group(1))))
+
+        pieces: List[Tuple[int, int, Optional[str], Optional[str]]] = []
+        for start, end, number in blocks:
+            for piece_start, piece_end, subsection in self._split_block(text, start, end):
+                pieces.append((piece_start, piece_end, number, subsection))
+
+        chunks = []
+        for group in self._pack(pieces):
+            start, end = group[0][0], group[-1][1]
+            content = text[start:end].strip()
+            if not content:
+                continue
+            numbers = list(dict.fromkeys(number for _, _, number, _ in group if number))
+            metadata = {
+                "source": source,
+                "page": page_at(start),
+                "page_start": page_at(start),
+                "page_end": page_at(max(start, end - 1)),
+                "start_index": state.offset + start,
+                "doc_type": "judgment" if judgment else "statute",
+            }
+            if numbers:
+                metadata["paragraph" if judgment else "section"] = numbers[0]
+                if not judgment:
+                    metadata["sections"] = numbers
+            subsections = {subsection for _, _, _, subsection in group}
+            if len(numbers) == 1 and len(subsections) == 1 and None not in subsections:
+                metadata["subsection"] = subsections.pop()
+            if act:
+                metadata["act"] = act
+            chunks.append(Document(page_content=content, metadata=metadata))
+        state.section = blocks[-1][2]
+        state.offset += offset
+        return chunks
+
+    def _split_block(self, text: str, start: int, end: int) -> List[Tuple[int, int, Optional[str]]]:
+        if end - start <= self.chunk_size:
+            return [(start, end, None)]
+        pieces = []
+        for sub_start, sub_end in _cut(text, SUBSECTION_START, start, end):
+            match = SUBSECTION_START.match(text, sub_start)
+            subsection = match.group(1).lower() if match else None
+            for piece_start, piece_end in self._split_long(text, sub_start, sub_end):
+                pieces.append((piece_start, piece_end, subsection))
+        return pieces
+
+    def _split_long(self, text: str, start: int, end: int) -> List[Tuple[int, int]]:
+        if end - start <= self.chunk_size:
+            return [(start, end)]
+        for pattern in (CLAUSE_START, PARAGRAPH_BREAK):
+            parts = _cut(text, pattern, start, end)
+            if len(parts) > 1:
+                return [piece for a, b in parts for piece in self._split_long(text, a, b)]
+        # No structure left: fall back to characters, mapping pieces back to offsets
+        pieces, cursor = [], start
+        for piece in self.fallback.split_text(text[start:end]):
+            position = text.find(piece, max(start, cursor - self.fallback_overlap), end)
+            if position < 0:
+                position = cursor
+            pieces.append((position, min(end, position + len(piece))))
+            cursor = position + len(piece)
+        return pieces
+
+    def _pack(self, pieces):
+        """Group adjacent pieces into chunks of at most ``chunk_size`` characters.
+
+        Pieces of one long section are never merged with another section, and a
+        short section only joins its neighbours while the chunk is still short.
+        """
+        groups, current = [], []
+        for piece in pieces:
+            if current:
+                size = piece[1] - current[0][0]
+                same_section = piece[2] == current[-1][2]
+                fits = size <= self.chunk_size
+                current_short = current[-1][1] - current[0][0] < self.min_chunk_size
+                overlapping = piece[0] < current[-1][1]
+                if fits and not overlapping and (current_short or same_section):
+                    current.append(piece)
+                    continue
+                groups.append(current)
+            current = [piece]
+        if current:
+            groups.append(current)
+        return groups
@@ -0,0 +1,561 @@
+import os
+import json
+import time
+import heapq
+import random
+import asyncio
+import logging
+import itertools
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.outputs import ChatResult
+
+from context_budget import count_tokens
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Lower runs first
+INTERACTIVE = 0
+BATCH = 5
+BACKGROUND = 10
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = {"APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError"}
+# Exhausting retries on these means the deployment is overloaded, not broken
+OVERLOAD_STATUS = {429, 503}
+
+_priority: ContextVar[int] = ContextVar("llm_priority", default=INTERACTIVE)
+
+LLM_RETRIES = REGISTRY.counter(
+    "legal_engine_llm_retries_total", "Retried LLM and embedding calls.", ["deployment", "status"]
+)
+LLM_SHED = REGISTRY.counter(
+    "legal_engine_llm_shed_total", "LLM and embedding calls rejected because the queue was full.", ["deployment"]
+)
+
+
+class Overloaded(Exception):
+    """The deployment cannot take more work right now; answer 503 with ``retry_after``."""
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@contextmanager
+def llm_priority(level: int):
+    """Run the LLM calls made inside the block (and tasks it starts) at ``level``."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def status_code(error: BaseException) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds from the response's retry-after-ms or Retry-After header, if any."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    tokens: int = field(compare=False)
+    notify: Callable[[], None] = field(compare=False)
+    granted: bool = field(default=False, compare=False)
+    cancelled: bool = field(default=False, compare=False)
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class DeploymentLimiter:
+    """Admission control for one deployment: concurrent calls and tokens per minute.
+
+    Callers wait in a priority queue (then FIFO). The token budget is a bucket
+    refilled continuously at ``tokens_per_minute``. Both event-loop and worker
+    thread callers are supported. A full queue, or a wait beyond
+    ``queue_timeout``, raises ``Overloaded`` instead of queueing.
+    """
+
+    # Waiters re-check the queue at least this often (pauses and refills have no wakeup)
+    poll_seconds = 1.0
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int = 16,
+        tokens_per_minute: int = 0,
+        max_queue: int = 256,
+        queue_timeout: float = 30.0,
+    ):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.tokens_per_minute = tokens_per_minute
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._tokens = float(tokens_per_minute)
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+        self._active = 0
+        self._queue: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.shed = 0
+
+    @property
+    def queued(self) -> int:
+        return sum(not waiter.cancelled for waiter in self._queue)
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    def saturated(self) -> bool:
+        return self.queued >= self.max_queue
+
+    def pause(self, seconds: float):
+        """Hold every queued call for ``seconds`` after the service said to back off."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def release(self, token_adjustment: int = 0):
+        """Free a slot; ``token_adjustment`` corrects the reservation to the tokens actually used."""
+        with self._lock:
+            self._active -= 1
+            if self.tokens_per_minute:
+                self._tokens = min(self.tokens_per_minute, self._tokens - token_adjustment)
+            self._dispatch()
+
+    async def acquire(self, tokens: int, priority: int):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiter, delay = self._enqueue(tokens, priority, lambda: loop.call_soon_threadsafe(_resolve, future))
+        deadline = time.monotonic() + self.queue_timeout
+        try:
+            while not waiter.granted:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise self._timed_out()
+                try:
+                    await asyncio.wait_for(asyncio.shield(future), timeout=min(delay, remaining))
+                except asyncio.TimeoutError:
+                    delay = self._redispatch()
+        except BaseException:
+            self._abandon(waiter)
+            raise
+
+    def acquire_sync(self, tokens: int, priority: int):
+        event = threading.Event()
+        waiter, delay = self._enqueue(tokens, priority, event.set)
+        deadline = time.monotonic() + self.queue_timeout
+        try:
+            while not waiter.granted:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise self._timed_out()
+                if not event.wait(min(delay, remaining)):
+                    delay = self._redispatch()
+        except BaseException:
+            self._abandon(waiter)
+            raise
+
+    def _enqueue(self, tokens: int, priority: int, notify: Callable[[], None]):
+        with self._lock:
+            if self.queued >= self.max_queue:
+                self.shed += 1
+                LLM_SHED.inc(deployment=self.name)
+                raise Overloaded(f"LLM deployment {self.name} is overloaded", retry_after=1.0)
+            waiter = _Waiter(priority, next(self._seq), tokens, notify)
+            heapq.heappush(self._queue, waiter)
+            return waiter, self._dispatch()
+
+    def _redispatch(self) -> float:
+        with self._lock:
+            return self._dispatch()
+
+    def _dispatch(self) -> float:
+        """Admit queued calls in priority order; returns how long the head should wait."""
+        now = time.monotonic()
+        if self.tokens_per_minute:
+            self._tokens = min(
+                self.tokens_per_minute,
+                self._tokens + (now - self._refilled_at) * self.tokens_per_minute / 60,
+            )
+        self._refilled_at = now
+        while self._queue:
+            head = self._queue[0]
+            if head.cancelled:
+                heapq.heappop(self._queue)
+                continue
+            if self._active >= self.max_concurrency:
+                return self.poll_seconds
+            if now < self._paused_until:
+                return min(self.poll_seconds, self._paused_until - now)
+            # A call larger than the whole budget runs once the bucket is full
+            cost = min(head.tokens, self.tokens_per_minute) if self.tokens_per_minute else 0
+            if cost > self._tokens:
+                return min(self.poll_seconds, (cost - self._tokens) * 60 / self.tokens_per_minute)
+            heapq.heappop(self._queue)
+            self._active += 1
+            self._tokens -= cost
+            self.admitted += 1
+            head.granted = True
+            head.notify()
+        return self.poll_seconds
+
+    def _abandon(self, waiter: _Waiter):
+        with self._lock:
+            granted = waiter.granted
+            waiter.cancelled = True
+        if granted:
+            self.release()
+
+    def _timed_out(self) -> Overloaded:
+        self.shed += 1
+        LLM_SHED.inc(deployment=self.name)
+        return Overloaded(f"Timed out waiting for LLM deployment {self.name}", retry_after=self.queue_timeout)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "active": self._active,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "tokens_available": round(self._tokens) if self.tokens_per_minute else None,
+        }
+
+
+class LLMScheduler:
+    """Shared outbound scheduler for chat and embedding deployments.
+
+    Every call waits for its deployment's limiter, and retryable failures
+    (429s, 5xx, connection errors) are retried with full-jitter exponential
+    backoff. A Retry-After from the service is honoured and pauses the whole
+    deployment. Running out of retries on a 429/503 raises ``Overloaded``.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        max_concurrency: int = 16,
+        tokens_per_minute: int = 0,
+        max_queue: int = 256,
+        queue_timeout: float = 30.0,
+        max_retries: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 20.0,
+        deployment_limits: Optional[Dict[str, Dict]] = None,
+    ):
+        self.enabled = enabled
+        self.defaults = {
+            "max_concurrency": max_concurrency,
+            "tokens_per_minute": tokens_per_minute,
+            "max_queue": max_queue,
+            "queue_timeout": queue_timeout,
+        }
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deployment_limits = deployment_limits or {}
+        self._limiters: Dict[str, DeploymentLimiter] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def sdk_max_retries(self) -> int:
+        """Retries to leave to the OpenAI client; none when the scheduler retries."""
+        return 0 if self.enabled else 2
+
+    def limiter(self, deployment: str) -> DeploymentLimiter:
+        with self._lock:
+            if deployment not in self._limiters:
+                limits = {**self.defaults, **self.deployment_limits.get(deployment, {})}
+                self._limiters[deployment] = DeploymentLimiter(deployment, **limits)
+            return self._limiters[deployment]
+
+    def saturated(self, deployment: str) -> bool:
+        return self.enabled and self.limiter(deployment).saturated()
+
+    def _backoff(self, limiter: DeploymentLimiter, error: Exception, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying ``error``, or None if it should propagate."""
+        status = status_code(error)
+        if status not in RETRYABLE_STATUS and type(error).__name__ not in RETRYABLE_ERRORS:
+            return None
+        wait = retry_after(error)
+        if attempt >= self.max_retries:
+            if status in OVERLOAD_STATUS or type(error).__name__ == "RateLimitError":
+                raise Overloaded(
+                    f"LLM deployment {limiter.name} is rate limited", retry_after=wait or self.max_delay
+                ) from error
+            return None
+        if wait is not None:
+            limiter.pause(wait)
+            delay = wait + random.uniform(0, self.base_delay)
+        else:
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        LLM_RETRIES.inc(deployment=limiter.name, status=status or type(error).__name__)
+        logger.warning(
+            f"{limiter.name} call failed ({status or type(error).__name__}), "
+            f"retry {attempt + 1}/{self.max_retries} in {delay:.2f}s"
+        )
+        return delay
+
+    async def run(
+        self,
+        deployment: str,
+        tokens: int,
+        call: Callable[[], Awaitable[Any]],
+        priority: Optional[int] = None,
+        actual: Optional[Callable[[Any], int]] = None,
+    ) -> Any:
+        """Await ``call()`` under the deployment's limits; ``actual(result)`` reconciles the token estimate."""
+        if not self.enabled:
+            return await call()
+        limiter = self.limiter(deployment)
+        priority = _priority.get() if priority is None else priority
+        for attempt in itertools.count():
+            await limiter.acquire(tokens, priority)
+            adjustment = 0
+            try:
+                result = await call()
+                adjustment = actual(result) - tokens if actual else 0
+                return result
+            except Exception as e:
+                delay = self._backoff(limiter, e, attempt)
+                if delay is None:
+                    raise
+            finally:
+                limiter.release(adjustment)
+            await asyncio.sleep(delay)
+
+    def run_sync(
+        self,
+        deployment: str,
+        tokens: int,
+        call: Callable[[], Any],
+        priority: Optional[int] = None,
+        actual: Optional[Callable[[Any], int]] = None,
+    ) -> Any:
+        """``run`` for blocking callers such as ingestion worker threads."""
+        if not self.enabled:
+            return call()
+        limiter = self.limiter(deployment)
+        priority = _priority.get() if priority is None else priority
+        for attempt in itertools.count():
+            limiter.acquire_sync(tokens, priority)
+            adjustment = 0
+            try:
+                result = call()
+                adjustment = actual(result) - tokens if actual else 0
+                return result
+            except Exception as e:
+                delay = self._backoff(limiter, e, attempt)
+                if delay is None:
+                    raise
+            finally:
+                limiter.release(adjustment)
+            time.sleep(delay)
+
+    async def stream(
+        self,
+        deployment: str,
+        tokens: int,
+        open_stream: Callable[[], AsyncIterator[Any]],
+        priority: Optional[int] = None,
+        actual: Optional[Callable[[List[Any]], int]] = None,
+    ) -> AsyncIterator[Any]:
+        """Stream under the deployment's limits, holding the slot until the stream ends.
+
+        Failures are only retried before the first chunk has been yielded.
+        """
+        if not self.enabled:
+            async for chunk in open_stream():
+                yield chunk
+            return
+        limiter = self.limiter(deployment)
+        priority = _priority.get() if priority is None else priority
+        for attempt in itertools.count():
+            await limiter.acquire(tokens, priority)
+            chunks: List[Any] = []
+            completed = False
+            try:
+                async for chunk in open_stream():
+                    chunks.append(chunk)
+                    yield chunk
+                completed = True
+                return
+            except Exception as e:
+                delay = None if chunks else self._backoff(limiter, e, attempt)
+                if delay is None:
+                    raise
+            finally:
+                limiter.release(actual(chunks) - tokens if completed and actual else 0)
+            await asyncio.sleep(delay)
+
+    def chat_model(self, model: BaseChatModel, deployment: Optional[str]) -> BaseChatModel:
+        if not self.enabled:
+            return model
+        return ScheduledChatModel(inner=model, scheduler=self, deployment=deployment or "chat")
+
+    def embeddings(self, embeddings: Embeddings, deployment: Optional[str]) -> Embeddings:
+        if not self.enabled:
+            return embeddings
+        return ScheduledEmbeddings(embeddings, self, deployment or "embeddings")
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {name: limiter.stats() for name, limiter in limiters.items()}
+
+
+def _message_tokens(messages) -> int:
+    return sum(count_tokens(str(message.content)) for message in messages)
+
+
+class ScheduledChatModel(BaseChatModel):
+    """A chat model whose calls go through an ``LLMScheduler``.
+
+    Reserves the prompt plus ``max_tokens`` and settles to the tokens used.
+    """
+
+    inner: Any
+    scheduler: Any
+    deployment: str
+
+    @property
+    def _llm_type(self) -> str:
+        return f"scheduled-{self.inner._llm_type}"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"deployment": self.deployment, **self.inner._identifying_params}
+
+    def _estimate(self, messages) -> int:
+        return _message_tokens(messages) + (getattr(self.inner, "max_tokens", None) or 0)
+
+    def _used(self, messages) -> Callable[[ChatResult], int]:
+        prompt = _message_tokens(messages)
+        return lambda result: prompt + sum(count_tokens(generation.text) for generation in result.generations)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        return self.scheduler.run_sync(
+            self.deployment,
+            self._estimate(messages),
+            lambda: self.inner._generate(messages, stop=stop, run_manager=run_manager, **kwargs),
+            actual=self._used(messages),
+        )
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        return await self.scheduler.run(
+            self.deployment,
+            self._estimate(messages),
+            lambda: self.inner._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs),
+            actual=self._used(messages),
+        )
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        # Sync streaming is only used by tooling; hold a slot for the whole stream
+        chunks = self.scheduler.run_sync(
+            self.deployment,
+            self._estimate(messages),
+            lambda: list(self.inner._stream(messages, stop=stop, run_manager=run_manager, **kwargs)),
+        )
+        yield from chunks
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt = _message_tokens(messages)
+        async for chunk in self.scheduler.stream(
+            self.deployment,
+            self._estimate(messages),
+            # Token callbacks are fired by the inner model, when langchain hands us a run manager
+            lambda: self.inner._astream(messages, stop=stop, run_manager=run_manager, **kwargs),
+            actual=lambda chunks: prompt + count_tokens("".join(chunk.text for chunk in chunks)),
+        ):
+            yield chunk
+
+
+class ScheduledEmbeddings(Embeddings):
+    """Embeddings whose provider calls go through an ``LLMScheduler``.
+
+    Document batches (ingestion) run at background priority, queries at the
+    caller's priority.
+    """
+
+    def __init__(self, embeddings: Embeddings, scheduler: LLMScheduler, deployment: str):
+        self.embeddings = embeddings
+        self.scheduler = scheduler
+        self.deployment = deployment
+
+    @staticmethod
+    def _tokens(texts: List[str]) -> int:
+        return sum(count_tokens(text) for text in texts)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.scheduler.run_sync(
+            self.deployment, self._tokens(texts), lambda: self.embeddings.embed_documents(texts), BACKGROUND
+        )
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.scheduler.run(
+            self.deployment, self._tokens(texts), lambda: self.embeddings.aembed_documents(texts), BACKGROUND
+        )
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.scheduler.run_sync(self.deployment, count_tokens(text), lambda: self.embeddings.embed_query(text))
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self.scheduler.run(
+            self.deployment, count_tokens(text), lambda: self.embeddings.aembed_query(text)
+        )
+
+
+def create_llm_scheduler() -> LLMScheduler:
+    """Build the scheduler described by the LLM_* environment variables.
+
+    LLM_DEPLOYMENT_LIMITS overrides limits per deployment, e.g.
+    '{"gpt-4o": {"max_concurrency": 8, "tokens_per_minute": 80000}}'.
+    """
+    return LLMScheduler(
+        enabled=os.getenv("LLM_SCHEDULER_ENABLED", "true").lower() == "true",
+        max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "16")),
+        tokens_per_minute=int(os.getenv("LLM_TOKENS_PER_MINUTE", "0")),
+        max_queue=int(os.getenv("LLM_MAX_QUEUE", "256")),
+        queue_timeout=float(os.getenv("LLM_QUEUE_TIMEOUT", "30")),
+        max_retries=int(os.getenv("LLM_MAX_RETRIES", "4")),
+        base_delay=float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5")),
+        max_delay=float(os.getenv("LLM_RETRY_MAX_DELAY", "20")),
+        deployment_limits=json.loads(os.getenv("LLM_DEPLOYMENT_LIMITS", "{}")),
+    )
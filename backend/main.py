@@ -1,7 +1,14 @@
 import os
-from fastapi import FastAPI, HTTPException ,File, UploadFile, Form
+import json
+import logging
+import asyncio
+import time
+from fastapi import FastAPI, HTTPException ,File, UploadFile, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Dict ,Optional
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, List, Dict ,Optional, Tuple
 from langchain.chains.router.multi_prompt_prompt import MULTI_PROMPT_ROUTER_TEMPLATE
 from pydantic import BaseModel
 from dotenv import load_dotenv
@@ -12,30 +19,211 @@ from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnableLambda, RunnableMap
 from langchain.chains import LLMChain
-from azure.search.documents import SearchClient
-from azure.core.credentials import AzureKeyCredential
-from azure.search.documents.models import VectorizableTextQuery
 from langchain_community.document_loaders import PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from fastapi import File, UploadFile, Form
 # import LargePDFProcessor 
 from chatwithpdf import LargePDFProcessor
+from sessions import SESSION_HEADER, SessionState, create_session_store, new_session_id, valid_session_id
+from azure_search import create_azure_search
+from vector_index import LocalSearch
+from hybrid import HybridIndex, extract_section_refs, reciprocal_rank_fusion
+from routing import classify_query
+from answer_cache import SemanticAnswerCache
+from retrieval_cache import RetrievalCache
+from statute_index import StatuteEntry, StatuteIndex, is_plain_section_question
+from context_budget import ContextBudgeter, chunks_from_search_results
+from memory import ConversationMemory
+from multilingual import Translator
+from batch import run_batch, validate_items
+from metrics import REGISTRY, REQUEST_SECONDS, record_tokens, span
+from ingestion import IngestionQueue
+from llm_scheduler import BATCH, Overloaded, create_llm_scheduler, llm_priority
+from pdf_extract import shutdown_extract_pool
+from uploads import save_upload
 
 load_dotenv()
 
-app = FastAPI()
+# LOG_LEVEL=DEBUG also turns on verbose LangChain chains and logs full contexts and answers
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger("legal_engine")
+VERBOSE_CHAINS = LOG_LEVEL == "DEBUG"
 
+# Optional live probes of Azure Search, the chat model and embeddings at startup
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "false").lower() == "true"
+# Seconds between chat warm-up attempts while it keeps failing
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "30"))
 
+# Threads for blocking work that has no async client
+BLOCKING_POOL_SIZE = int(os.getenv("BLOCKING_POOL_SIZE", "32"))
+# How often a long /chat request checks whether its client is still connected
+DISCONNECT_POLL_SECONDS = float(os.getenv("DISCONNECT_POLL_SECONDS", "0.5"))
+
+# Component readiness reported by /ready; legal chat does not wait for the PDF subsystem
+readiness: Dict[str, Any] = {"chat": False, "pdf": False, "hybrid": False, "errors": {}}
+
+
+async def warm_up_chat():
+    """Mark chat ready once warm-up succeeds, retrying every WARMUP_RETRY_SECONDS until it does."""
+    while True:
+        try:
+            if STARTUP_WARMUP:
+                await asyncio.gather(
+                    search_client.search("Section 302", top=1, k_nearest_neighbors=1),
+                    llm.ainvoke("Test message"),
+                )
+                logger.info("Chat warm-up successful")
+            readiness["errors"].pop("chat", None)
+            readiness["chat"] = True
+            return
+        except Exception as e:
+            logger.error(f"Chat warm-up failed, retrying in {WARMUP_RETRY_SECONDS:.0f}s: {str(e)}")
+            readiness["errors"]["chat"] = str(e)
+        await asyncio.sleep(WARMUP_RETRY_SECONDS)
+
+
+# "vector" queries only the search backend; "hybrid" adds BM25 and exact
+# section-number lookups over the same corpus
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "vector").lower()
+hybrid_index: Optional[HybridIndex] = None
+
+
+async def init_hybrid_index():
+    global hybrid_index
+    if RETRIEVAL_MODE != "hybrid":
+        return
+    try:
+        corpus_path = os.getenv("LEGAL_CORPUS_PATH")
+        if corpus_path:
+            # Must be the corpus the search backend indexed: results are fused on chunk id
+            hybrid_index = await asyncio.to_thread(HybridIndex.from_jsonl, corpus_path)
+        elif isinstance(search_client, LocalSearch):
+            hybrid_index = await asyncio.to_thread(HybridIndex.from_records, search_client.index.records)
+        else:
+            reason = "the Azure Search backend needs LEGAL_CORPUS_PATH pointing at the indexed corpus"
+            logger.warning(f"RETRIEVAL_MODE=hybrid is disabled, serving vector-only results: {reason}")
+            readiness["errors"]["hybrid"] = f"disabled: {reason}"
+            return
+        readiness["hybrid"] = True
+    except Exception as e:
+        logger.error(f"Error building hybrid index: {str(e)}")
+        readiness["errors"]["hybrid"] = str(e)
+
+
+# Precomputed section index built with `python statute_index.py`; "precomputed"
+# answers from its stored explanations, "context" only uses its exact section text
+STATUTE_INDEX_DIR = os.getenv("STATUTE_INDEX_DIR")
+STATUTE_ANSWER_MODE = os.getenv("STATUTE_ANSWER_MODE", "precomputed").lower()
+statute_index: Optional[StatuteIndex] = None
+
+
+async def init_statute_index():
+    global statute_index
+    if not STATUTE_INDEX_DIR:
+        return
+    try:
+        statute_index = await asyncio.to_thread(
+            StatuteIndex, STATUTE_INDEX_DIR, os.getenv("STATUTE_DEFAULT_ACT", "ipc")
+        )
+        logger.info(f"Statute index loaded with {len(statute_index)} sections")
+    except Exception as e:
+        logger.error(f"Error loading statute index: {str(e)}")
+        readiness["errors"]["statutes"] = str(e)
+
+
+async def init_pdf_subsystem():
+    try:
+        await asyncio.to_thread(processor.initialize_chain)
+        if STARTUP_WARMUP:
+            await processor.awarm_up()
+        readiness["pdf"] = True
+        logger.info("PDF subsystem ready")
+    except Exception as e:
+        logger.error(f"Error initializing PDF processor: {str(e)}")
+        readiness["errors"]["pdf"] = str(e)
+
+
+def require_pdf_ready():
+    if not readiness["pdf"]:
+        raise HTTPException(status_code=503, detail="PDF subsystem is not ready yet")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Sync SDK calls (Pinecone queries, to_thread work) share one bounded pool
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=BLOCKING_POOL_SIZE, thread_name_prefix="blocking")
+    )
+    await search_client.start()
+    await ingestion_queue.start()
+    startup_tasks = [
+        asyncio.create_task(warm_up_chat()),
+        asyncio.create_task(init_pdf_subsystem()),
+        asyncio.create_task(init_hybrid_index()),
+        asyncio.create_task(init_statute_index()),
+        asyncio.create_task(watch_index_version()),
+    ]
+    yield
+    for task in startup_tasks:
+        task.cancel()
+    await ingestion_queue.close()
+    shutdown_extract_pool()
+    await search_client.close()
+    if statute_index is not None:
+        statute_index.close()
+    await conversation_memory.close()
+    await session_store.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Per-session chat history, PDF mode and uploaded documents
+session_store = create_session_store()
+# Documents a session can query together; the oldest drop off past this
+MAX_SESSION_DOCUMENTS = int(os.getenv("MAX_SESSION_DOCUMENTS", "20"))
+
+
+# Admission control, priorities and rate-limit retries for every outbound
+# chat and embedding call, shared by chat, PDF and ingestion paths
+llm_scheduler = create_llm_scheduler()
+CHAT_DEPLOYMENT = os.getenv('AZURE_DEPLOYMENT')
+# Limiter key for the chat model; the /chat/stream saturation check must use the same one
+CHAT_LIMITER = CHAT_DEPLOYMENT or "chat"
+
+# Only builds clients; Pinecone and the chain are set up in init_pdf_subsystem
 try:
     processor = LargePDFProcessor(
         pinecone_api_key=os.getenv("PINECONE_API_KEY"),  # Use env variables
         pinecone_environment=os.getenv("PINECONE_ENVIRONMENT"),  # Use env variables
         pinecone_index_name="pdf-chat-index",
+        embedding_batch_size=int(os.getenv("EMBEDDING_BATCH_SIZE", "64")),
+        embedding_parallelism=int(os.getenv("EMBEDDING_PARALLELISM", "4")),
+        embedding_cache_size=int(os.getenv("EMBEDDING_CACHE_SIZE", "10000")),
+        # May be shared by several workers on one host; writes are serialized with flock
+        embedding_cache_dir=os.getenv("EMBEDDING_CACHE_DIR"),
+        upsert_batch_size=int(os.getenv("PINECONE_UPSERT_BATCH_SIZE", "100")),
+        namespace_registry_path=os.getenv("NAMESPACE_REGISTRY_PATH", "./namespaces.json"),
+        namespace_ttl_seconds=float(os.getenv("NAMESPACE_TTL_SECONDS", "0")) or None,
+        extract_workers=int(os.getenv("PDF_EXTRACT_WORKERS", "0")),
+        pages_per_task=int(os.getenv("PDF_PAGES_PER_TASK", "8")),
+        vector_backend=os.getenv("PDF_VECTOR_BACKEND", "pinecone").lower(),
+        local_index_dir=os.getenv("PDF_LOCAL_INDEX_DIR", "./local_index/pdf"),
+        context_budget=int(os.getenv("CONTEXT_BUDGET_PDF", "4000")),
+        splitter=os.getenv("PDF_SPLITTER", "legal").lower(),
+        scheduler=llm_scheduler,
     )
 except Exception as e:
-    print(f"Error initializing PDF processor: {e}")
+    logger.critical(f"Error initializing PDF processor: {e}")
     exit(1) 
 
+# Background PDF ingestion; /upload only enqueues
+ingestion_queue = IngestionQueue(
+    processor,
+    workers=int(os.getenv("INGEST_WORKERS", "2")),
+    page_batch_size=int(os.getenv("INGEST_PAGE_BATCH_SIZE", "16")),
+)
+
 # Allow CORS for your React app
 app.add_middleware(
     CORSMiddleware,
@@ -43,26 +231,111 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[SESSION_HEADER],
 )
 
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    # Shed load quickly instead of letting clients time out behind a long queue
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(max(1, round(exc.retry_after)))},
+    )
+
+
+@app.middleware("http")
+async def assign_session_id(request: Request, call_next):
+    # A client without a session gets its own id back in X-Session-Id and echoes it afterwards;
+    # endpoints may replace it with an explicit session_id from the body
+    supplied = request.headers.get(SESSION_HEADER)
+    request.state.session_id = supplied if valid_session_id(supplied) else new_session_id()
+    response = await call_next(request)
+    response.headers[SESSION_HEADER] = request.state.session_id
+    return response
+
+
+def resolve_session_id(http_request: Request, supplied: Optional[str]) -> str:
+    """The body's session_id if it is valid, else the header's (or a freshly issued) one."""
+    if valid_session_id(supplied):
+        http_request.state.session_id = supplied
+    elif supplied:
+        raise HTTPException(status_code=400, detail="Invalid session_id")
+    return http_request.state.session_id
+
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    # Streaming responses are timed until their headers go out; /chat/stream reports its own timings
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    REQUEST_SECONDS.observe(
+        time.perf_counter() - start,
+        method=request.method,
+        path=route.path if route else "unmatched",
+        status=response.status_code,
+    )
+    return response
+
 # Azure OpenAI Configuration
-llm = AzureChatOpenAI(
+llm = llm_scheduler.chat_model(AzureChatOpenAI(
     openai_api_version=os.getenv('OPENAI_API_VERSION'),
-    azure_deployment=os.getenv('AZURE_DEPLOYMENT'),
+    azure_deployment=CHAT_DEPLOYMENT,
     azure_endpoint=os.getenv('AZURE_ENDPOINT'),
     api_key=os.getenv('AZURE_OPENAI_API_KEY'),
     streaming=True,
     temperature=0.1,
-    max_tokens=1000
+    max_tokens=1000,
+    max_retries=llm_scheduler.sdk_max_retries,
+), CHAT_LIMITER)
+
+# "translate" runs retrieval and analysis once in CANONICAL_LANGUAGE and renders other
+# languages with a lighter translation call; "direct" has each chain answer in the language
+ANSWER_LANGUAGE_MODE = os.getenv("ANSWER_LANGUAGE_MODE", "direct").lower()
+TRANSLATION_DEPLOYMENT = os.getenv('AZURE_TRANSLATION_DEPLOYMENT') or CHAT_DEPLOYMENT
+translation_llm = llm_scheduler.chat_model(AzureChatOpenAI(
+    openai_api_version=os.getenv('OPENAI_API_VERSION'),
+    azure_deployment=TRANSLATION_DEPLOYMENT,
+    azure_endpoint=os.getenv('AZURE_ENDPOINT'),
+    api_key=os.getenv('AZURE_OPENAI_API_KEY'),
+    streaming=True,
+    temperature=0,
+    max_tokens=2000,
+    max_retries=llm_scheduler.sdk_max_retries,
+), TRANSLATION_DEPLOYMENT)
+translator = Translator(
+    translation_llm,
+    canonical_language=os.getenv("CANONICAL_LANGUAGE", "English"),
+    max_entries=int(os.getenv("TRANSLATION_CACHE_MAX_ENTRIES", "2000")),
+    ttl_seconds=float(os.getenv("TRANSLATION_CACHE_TTL_SECONDS", "3600")),
 )
 
-# Azure Cognitive Search Configuration
-search_client = SearchClient(
-    endpoint=os.getenv('AZURE_SEARCH_ENDPOINT'),
-    index_name=os.getenv('AZURE_SEARCH_INDEX'),
-    credential=AzureKeyCredential(os.getenv('AZURE_SEARCH_KEY'))
+
+def translates(language: str) -> bool:
+    return ANSWER_LANGUAGE_MODE == "translate" and not translator.is_canonical(language)
+
+
+# Running summary + raw tail of each session's conversation, summarized in the background
+conversation_memory = ConversationMemory(
+    llm,
+    session_store,
+    tail_messages=int(os.getenv("CONVERSATION_TAIL_MESSAGES", "4")),
+    max_tokens=int(os.getenv("CONVERSATION_MAX_TOKENS", "1000")),
+    summary_tokens=int(os.getenv("CONVERSATION_SUMMARY_TOKENS", "300")),
 )
-ispdf=False
+
+# Legal corpus retrieval: Azure Cognitive Search (async, pooled; opened in
+# lifespan) or an in-process index built with `python vector_index.py`
+if os.getenv("RETRIEVAL_BACKEND", "azure").lower() == "local":
+    search_client = LocalSearch(
+        os.getenv("LOCAL_INDEX_DIR", "./local_index/legal"),
+        processor.embeddings,
+        ann_threshold=int(os.getenv("LOCAL_INDEX_ANN_THRESHOLD", "50000")),
+    )
+else:
+    search_client = create_azure_search()
 # Prompt Templates (Kept as per your request)
 law_prompt = PromptTemplate( 
     input_variables=["context", "question", "language","chat_history"],
@@ -131,6 +404,12 @@ Your analysis should be factual, professional, and based strictly on the legal c
 law_chain = LLMChain(llm=llm, prompt=law_prompt)
 section_chain = LLMChain(llm=llm, prompt=section_prompt)
 
+# LCEL equivalents of the chains above, used by /chat/stream to yield tokens
+streaming_chains = {
+    "law": law_prompt | llm | StrOutputParser(),
+    "section": section_prompt | llm | StrOutputParser(),
+}
+
 destination_chains={
     "law": law_chain,
     "section": section_chain
@@ -150,7 +429,7 @@ destinations_chains_info = [
 
 destinations = [f"{p['name']}: {p['description']}" for p in destinations_chains_info]
 destinations_str = "\n".join(destinations)
-print(destinations_str)
+logger.debug(f"Router destinations:\n{destinations_str}")
  
 router_prompt= MULTI_PROMPT_ROUTER_TEMPLATE.format(destinations=destinations_str)
 
@@ -166,64 +445,224 @@ multi_prompt_chain = MultiPromptChain(
         router_chain=router_chain,
         destination_chains=destination_chains,
         default_chain=law_chain,
-        verbose=True,
+        verbose=VERBOSE_CHAINS,
     )
-# Chat History
-conversation_history: List[Dict[str, str]] = []
+def build_conversation_context(session: SessionState):
+    """Conversation summary plus the most recent raw messages, within the token cap."""
+    return conversation_memory.context(session)
+
 
-def build_conversation_context():
-    """Build context from the last 6 messages in the conversation."""
-    last_msgs = conversation_history[-6:]
-    context_lines = [f"{msg['sender']}: {msg['text']}" for msg in last_msgs]
-    return "\n".join(context_lines)
 
+# Search results for repeated queries; dropped after RETRIEVAL_CACHE_TTL_SECONDS,
+# when the search backend reports a new index version or on POST /cache/invalidate
+RETRIEVAL_CACHE_ENABLED = os.getenv("RETRIEVAL_CACHE_ENABLED", "true").lower() == "true"
+retrieval_cache = RetrievalCache(
+    max_entries=int(os.getenv("RETRIEVAL_CACHE_MAX_ENTRIES", "2000")),
+    ttl_seconds=float(os.getenv("RETRIEVAL_CACHE_TTL_SECONDS", "900")),
+    similarity_threshold=float(os.getenv("RETRIEVAL_CACHE_SIMILARITY", "0.98")),
+)
+INDEX_POLL_SECONDS = float(os.getenv("INDEX_POLL_SECONDS", "60"))
+# "client" embeds queries with our (cached) embeddings and sends the vector;
+# "service" lets Azure Search vectorize the text with the index's vectorizer
+QUERY_VECTORS = os.getenv("AZURE_SEARCH_QUERY_VECTORS", "client").lower()
 
 
-async def process_query(query: str, language: str, chat_history:str) -> str:
+async def watch_index_version():
+    if not RETRIEVAL_CACHE_ENABLED:
+        return
+    while True:
+        try:
+            retrieval_cache.observe_index_version(await search_client.index_version())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Could not read search index version: {str(e)}")
+        await asyncio.sleep(INDEX_POLL_SECONDS)
+
+
+async def embed_search_query(query: str) -> Optional[List[float]]:
+    """Embed the normalized query once; shared by search, retrieval and answer caches."""
+    if QUERY_VECTORS != "client" and not isinstance(search_client, LocalSearch):
+        return None
+    with span("embedding_query"):
+        return await processor.embeddings.aembed_query(retrieval_cache.key(query)[0])
+
+
+async def retrieve_context(query: str, top: int = 10) -> List[Dict]:
+    if hybrid_index is not None:
+        # Exact section references ("Section 376(2)(a)", "CrPC 161") skip the vector search
+        with span("section_lookup"):
+            section_hits = hybrid_index.lookup_sections(query, top)
+        if section_hits:
+            logger.info(f"Section lookup matched {len(section_hits)} chunks")
+            return section_hits
+
+    key = retrieval_cache.key(query, top=top, mode=RETRIEVAL_MODE)
+    if RETRIEVAL_CACHE_ENABLED:
+        cached = retrieval_cache.get(key)
+        if cached is not None:
+            return cached
+
+    vector = await embed_search_query(query)
+    if RETRIEVAL_CACHE_ENABLED and vector is not None:
+        cached = retrieval_cache.get_similar(key, vector)
+        if cached is not None:
+            return cached
+
     try:
-        print("Starting vector search...")
-        vector_query = VectorizableTextQuery(
-            text=query, 
-            k_nearest_neighbors=5, 
-            fields="embedding", 
-            exhaustive=True
-        )
+        with span("search"):
+            results_list = await search_client.search(query, top=top, k_nearest_neighbors=top, vector=vector)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Legal document search timed out")
+
+    if hybrid_index is not None:
+        with span("bm25"):
+            results_list = reciprocal_rank_fusion([results_list, hybrid_index.search(query, top)])[:top]
+    logger.info(f"Found {len(results_list)} search results")
+    if RETRIEVAL_CACHE_ENABLED and results_list:
+        retrieval_cache.put(key, results_list, vector)
+    return results_list
+
+
+# "llm" always asks the router chain, "local" never does, and "hybrid" asks it
+# only when the local classifier is below ROUTER_CONFIDENCE_THRESHOLD
+ROUTER_MODE = os.getenv("ROUTER_MODE", "hybrid").lower()
+ROUTER_CONFIDENCE_THRESHOLD = float(os.getenv("ROUTER_CONFIDENCE_THRESHOLD", "0.7"))
+
+
+async def select_destination(query: str) -> str:
+    with span("router"):
+        return await route_query(query)
+
+
+async def route_query(query: str) -> str:
+    if ROUTER_MODE != "llm":
+        destination, confidence = classify_query(query)
+        if destination and (ROUTER_MODE == "local" or confidence >= ROUTER_CONFIDENCE_THRESHOLD):
+            logger.info(f"Local router selected {destination} (confidence {confidence:.2f})")
+            return destination
+        if ROUTER_MODE == "local":
+            return "law"
+
+    # Otherwise, use the router to determine which chain to use
+    router_input = {"input": query}
+    
+    try:
+        router_result = await router_chain.ainvoke(router_input)
+        destination = router_result.get("destination")
         
-        print("Executing search...")
-        results = search_client.search(
-            search_text=None,
-            vector_queries=[vector_query],
-            select=['id', "content", 'metadata_page'],
-            top=10
-        )
+        if not destination or destination not in destination_chains:
+            logger.info("Using default 'law' chain")
+            destination = "law"  # default destination
+        
+        logger.info(f"Selected destination: {destination}")
+    except Exception as router_error:
+        logger.error(f"Error in router chain: {str(router_error)}; falling back to default 'law' chain")
+        destination = "law"
+    return destination
+
+
+async def retrieve_and_route(query: str) -> Tuple[List[Dict], Optional[str]]:
+    """Run the vector search and the router concurrently.
+
+    Returns no destination when the search finds nothing, in which case the
+    router call is cancelled.
+    """
+    router_task = asyncio.create_task(select_destination(query))
+    try:
+        results_list = await retrieve_context(query)
+    except BaseException:
+        router_task.cancel()
+        raise
+
+    if not results_list:
+        router_task.cancel()
+        return results_list, None
+    return results_list, await router_task
+
+
+def statute_lookup(query: str) -> List[StatuteEntry]:
+    """Indexed sections for a confidently routed section question, else nothing."""
+    if statute_index is None:
+        return []
+    destination, confidence = classify_query(query)
+    if destination != "section" or confidence < ROUTER_CONFIDENCE_THRESHOLD:
+        return []
+    with span("statute_lookup"):
+        entries = statute_index.lookup(query)
+    if entries:
+        logger.info(f"Statute index matched {', '.join(entry.key for entry in entries)}")
+    return entries
+
 
-        results_list = list(results)
-        print(f"Found {len(results_list)} search results")
+def statute_answer(entries: List[StatuteEntry], query: str, language: str, chat_history: str = "") -> Optional[str]:
+    """The stored answer when the question only asks what one indexed section says.
+
+    Other questions about the section ("is it bailable for a minor?") go to the
+    chain, with the section text as their context.
+    """
+    if STATUTE_ANSWER_MODE != "precomputed" or len(entries) != 1:
+        return None
+    if not is_plain_section_question(query):
+        return None
+    if chat_history and SemanticAnswerCache.is_follow_up(query):
+        # "what about section 304?" carries the earlier question over
+        return None
+    if entries[0].section not in {number for _, number in extract_section_refs(query)}:
+        # A sub-section resolved to its parent section; let the chain read the text
+        return None
+    return entries[0].render(language)
+
+
+async def retrieve_for_query(query: str, entries: List[StatuteEntry]) -> Tuple[List[Dict], Optional[str]]:
+    """Exact section text of indexed sections, or the search and router."""
+    if entries:
+        return [entry.as_search_result() for entry in entries], "section"
+    return await retrieve_and_route(query)
+
+
+def search_sources(results_list: List[Dict]) -> List[Dict]:
+    return [
+        {"id": result.get("id"), "page": result.get("metadata_page")}
+        for result in results_list
+    ]
+
+
+# Token budget for the retrieved context handed to each destination chain
+CONTEXT_BUDGETS = {
+    "law": int(os.getenv("CONTEXT_BUDGET_LAW", "3000")),
+    "section": int(os.getenv("CONTEXT_BUDGET_SECTION", "2000")),
+}
+context_budgeter = ContextBudgeter(similarity_threshold=float(os.getenv("CONTEXT_DEDUP_SIMILARITY", "0.85")))
+
+
+def build_search_context(results_list: List[Dict], destination: str) -> Tuple[str, Dict]:
+    context, report = context_budgeter.build_context(
+        chunks_from_search_results(results_list), CONTEXT_BUDGETS[destination]
+    )
+    logger.info(
+        f"Context: {report['chunks_out']}/{report['chunks_in']} chunks, "
+        f"{report['tokens_out']} tokens, saved {report['tokens_saved']}"
+    )
+    logger.debug(f"Context for {destination} chain:\n{context}")
+    return context, report
+
+
+async def process_query(query: str, language: str, chat_history:str, retrieval_query: Optional[str] = None) -> str:
+    try:
+        entries = statute_lookup(retrieval_query or query)
+        precomputed = statute_answer(entries, query, language, chat_history) if entries else None
+        if precomputed:
+            logger.info("Answered from the statute index")
+            return precomputed
+
+        results_list, destination = await retrieve_for_query(retrieval_query or query, entries)
 
         if not results_list:
             return "No relevant documents found."
 
         # Prepare context from search results
-        context = "\n".join([result['content'] for result in results_list])
-        print(f"Combined context length: {len(context)} characters")
-
-        # First, use the router to determine which chain to use
-        router_input = {"input": query}
-        print("Determining the appropriate chain...")
-        
-        try:
-            router_result = await router_chain.ainvoke(router_input)
-            destination = router_result.get("destination")
-            
-            if not destination or destination not in destination_chains:
-                print("Using default 'law' chain")
-                destination = "law"  # default destination
-            
-            print(f"Selected destination: {destination}")
-        except Exception as router_error:
-            print(f"Error in router chain: {str(router_error)}")
-            print("Falling back to default 'law' chain")
-            destination = "law"
+        context, _ = build_search_context(results_list, destination)
         
         # Prepare input for the selected destination chain
         chain_input = {
@@ -235,9 +674,10 @@ async def process_query(query: str, language: str, chat_history:str) -> str:
         
         # Get the selected chain and call it
         selected_chain = destination_chains[destination]
-        print(f"Calling {destination} chain...")
-        response = await selected_chain.ainvoke(chain_input)
-        print(f"raw message {response}")
+        logger.info(f"Calling {destination} chain...")
+        with span(f"chain_{destination}"):
+            response = await selected_chain.ainvoke(chain_input)
+        logger.debug(f"raw message {response}")
 
         # Handle the response
         if isinstance(response, dict):
@@ -245,105 +685,352 @@ async def process_query(query: str, language: str, chat_history:str) -> str:
         else:
             final_response = str(response)
         
-        print(f"Chain response received: {final_response[:200]}...")  # Print first 200 chars
+        logger.debug(f"Chain response received: {final_response[:200]}...")
+        record_tokens(destination, context + query + chat_history, final_response)
         
         if not final_response:
             return "No response generated from the model."
             
         return final_response
 
+    except (HTTPException, Overloaded):
+        raise
     except Exception as e:
-        print(f"Error in process_query: {str(e)}")
-        print(f"Error type: {type(e)}")
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")
+        logger.exception(f"Error in process_query: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail=f"Error processing query: {str(e)}"
         )
-    
-class PDFProcessingResponse(BaseModel):
-    total_pages: int
-    total_chunks: int
-    message: str = "PDF processed successfully"
-    # summary: str
-
-@app.post("/upload", response_model=PDFProcessingResponse)
-async def upload_pdf(file: UploadFile):
-    global ispdf
+
+
+# Answers to repeated standalone questions, shared by /chat and /chat/stream
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+answer_cache = SemanticAnswerCache(
+    max_entries=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000")),
+    ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600")),
+    similarity_threshold=float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95")),
+)
+NON_ANSWERS = {"No relevant documents found.", "No response generated from the model."}
+
+
+async def lookup_cached_answer(query: str, language: str):
+    """Return (cached entry or None, cache key, query embedding) for ``query``.
+
+    The key is None when the cache is disabled or the question is a follow-up
+    whose meaning depends on the chat history.
+    """
+    if not ANSWER_CACHE_ENABLED:
+        return None, None, None
+    if answer_cache.is_follow_up(query):
+        answer_cache.record_bypass()
+        return None, None, None
+
+    destination, confidence = classify_query(query)
+    chain = destination if destination and confidence >= ROUTER_CONFIDENCE_THRESHOLD else "auto"
+    key = answer_cache.key(query, language, chain)
+
+    cached = answer_cache.get(key)
+    if cached is not None:
+        return cached, key, None
+
     try:
-        if not file:
-            raise HTTPException(status_code=400, detail="No file provided")
-            
-        if not file.filename.endswith('.pdf'):
-            raise HTTPException(status_code=400, detail="Only PDF files are allowed")
-            
-        print(f"Processing PDF file: {file.filename}")
-        ispdf=True
+        embedding = await processor.embeddings.aembed_query(key[0])
+    except Exception as e:
+        logger.warning(f"Skipping semantic cache lookup: {str(e)}")
+        return None, key, None
+    return answer_cache.get_similar(key, embedding), key, embedding
+
+
+def store_cached_answer(key, answer: str, embedding, sources: Optional[List[Dict]] = None):
+    if key is not None and answer and answer not in NON_ANSWERS:
+        answer_cache.put(key, answer, embedding, sources)
+
+
+async def cached_process_query(
+    query: str, language: str, chat_history: str, retrieval_query: Optional[str] = None
+) -> str:
+    if translates(language):
+        canonical = await cached_process_query(query, translator.canonical_language, chat_history, retrieval_query)
+        return await translator.translate(canonical, language)
+
+    cached, key, embedding = await lookup_cached_answer(query, language)
+    if cached is not None:
+        logger.info("Answer served from cache")
+        return cached.answer
+
+    answer = await process_query(query, language, chat_history, retrieval_query)
+    store_cached_answer(key, answer, embedding)
+    return answer
+
+
+async def stream_query(
+    query: str, language: str, chat_history: str, retrieval_query: Optional[str] = None
+) -> AsyncIterator[Tuple[str, Any]]:
+    """Stream the law/section answer token by token, then its sources.
+
+    A "context" event carrying the budgeter report precedes the tokens.
+    """
+    if translates(language):
+        # Analyse in the canonical language, then stream the rendering
+        canonical_tokens, sources = [], []
+        async for kind, payload in stream_query(query, translator.canonical_language, chat_history, retrieval_query):
+            if kind == "token":
+                canonical_tokens.append(payload)
+            elif kind == "sources":
+                sources = payload
+            else:
+                yield kind, payload
+        async for token in translator.astream("".join(canonical_tokens), language):
+            yield "token", token
+        yield "sources", sources
+        return
+
+    cached, key, embedding = await lookup_cached_answer(query, language)
+    if cached is not None:
+        yield "token", cached.answer
+        yield "sources", cached.sources
+        return
+
+    entries = statute_lookup(retrieval_query or query)
+    precomputed = statute_answer(entries, query, language, chat_history) if entries else None
+    if precomputed:
+        logger.info("Answered from the statute index")
+        yield "token", precomputed
+        yield "sources", search_sources([entry.as_search_result() for entry in entries])
+        return
+
+    results_list, destination = await retrieve_for_query(retrieval_query or query, entries)
+
+    if not results_list:
+        yield "token", "No relevant documents found."
+        yield "sources", []
+        return
+
+    context, report = build_search_context(results_list, destination)
+    yield "context", report
+
+    chain_input = {
+        "context": context,
+        "question": query,
+        "language": language,
+        "chat_history": chat_history
+    }
+
+    logger.info(f"Streaming {destination} chain...")
+    tokens = []
+    with span(f"chain_{destination}"):
+        async for token in streaming_chains[destination].astream(chain_input):
+            if token:
+                tokens.append(token)
+                yield "token", token
+    record_tokens(destination, context + query + chat_history, "".join(tokens))
+
+    sources = search_sources(results_list)
+    store_cached_answer(key, "".join(tokens), embedding, sources)
+    yield "sources", sources
+
+
+async def translate_all(answer: str, languages: List[str]) -> Dict[str, str]:
+    languages = list(dict.fromkeys(languages))
+    results = await asyncio.gather(
+        *(translator.translate(answer, language) for language in languages), return_exceptions=True
+    )
+    translations = {}
+    for language, result in zip(languages, results):
+        if isinstance(result, BaseException):
+            logger.error(f"Translation to {language} failed: {str(result)}")
+        else:
+            translations[language] = result
+    return translations
+
+
+async def stream_translations(answer: str, languages: List[str]) -> AsyncIterator[Tuple[str, str]]:
+    """Stream renderings for several languages in parallel as (language, token) pairs."""
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def pump(language: str):
+        try:
+            async for token in translator.astream(answer, language):
+                await queue.put((language, token))
+        except Exception as e:
+            logger.error(f"Translation to {language} failed: {str(e)}")
+        finally:
+            await queue.put((language, None))
+
+    tasks = [asyncio.create_task(pump(language)) for language in dict.fromkeys(languages)]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            language, token = await queue.get()
+            if token is None:
+                remaining -= 1
+            else:
+                yield language, token
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+class UploadJobResponse(BaseModel):
+    job_id: str
+    status: str
+    message: str = "PDF accepted for processing"
+
+# The body is parsed by save_upload as it streams in, so the form is documented by hand
+UPLOAD_FORM_SCHEMA = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {
+                        "file": {"type": "string", "format": "binary"},
+                        "session_id": {"type": "string"},
+                    },
+                }
+            }
+        },
+    }
+}
+
+@app.post("/upload", response_model=UploadJobResponse, openapi_extra=UPLOAD_FORM_SCHEMA)
+async def upload_pdf(request: Request):
+    try:
+        require_pdf_ready()
         
-        # Save the uploaded PDF
-        file_path = f"./uploaded_files/{file.filename}"
-        os.makedirs("./uploaded_files", exist_ok=True)
+        # Stream the upload straight to a unique temp file; the ingestion worker removes it when done
+        with span("pdf_upload"):
+            upload = await save_upload(request)
+        file_path, namespace, filename = upload.path, upload.sha256, upload.filename
+        try:
+            session_id = resolve_session_id(request, upload.fields.get("session_id"))
+        except HTTPException:
+            os.remove(file_path)
+            raise
+        logger.info(f"Saved {upload.size} bytes of {filename} to {file_path}")
         
         try:
-            with open(file_path, "wb") as f:
-                file_content = await file.read()
-                f.write(file_content)
-            
-            # Process the PDF using LargePDFProcessor
-            process_result = processor.process_pdf(file_path)
-            
-            if "error" in process_result:
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Error processing PDF: {process_result['error']}"
-                )
-            
+            # Documents are stored under their content hash so re-uploads skip ingestion
+            session = await session_store.get(session_id)
+            session.ispdf = True
+            session.add_document(namespace, filename, MAX_SESSION_DOCUMENTS)
+            job = ingestion_queue.submit(file_path, filename, session_id, namespace)
             
-            # Store processing results in conversation history
-            conversation_history.append({"sender": "user", "text": f"Uploaded PDF: {file.filename}"})
-            print("file upload is successfull")
-            # Create and return the response
-            return PDFProcessingResponse(
-                total_pages=process_result['total_pages'],
-                total_chunks=process_result['total_chunks'],
-                # summary=summary_response['answer']
-            )
+            # Store the upload in conversation history
+            session.add_message("user", f"Uploaded PDF: {filename}", session_store.max_history)
+            await session_store.save(session)
+            logger.info(f"file upload queued as job {job.job_id}")
+            return UploadJobResponse(job_id=job.job_id, status=job.status)
             
         except Exception as e:
+            if os.path.exists(file_path):
+                os.remove(file_path)
             raise HTTPException(
                 status_code=500,
                 detail=f"Error processing PDF: {str(e)}"
             )
-        finally:
-            # Clean up the saved file after processing
-            if os.path.exists(file_path):
-                os.remove(file_path)
                 
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error in upload_endpoint: {str(e)}")
+        logger.error(f"Error in upload_endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/sessions/{session_id}/documents")
+async def list_documents(session_id: str):
+    session = await session_store.get(session_id)
+    documents = session.documents or [{"id": doc_id} for doc_id in session.document_ids()]
+    return {
+        "documents": [
+            {**doc, **(processor.namespaces.get(doc["id"]) or {}), "ready": processor.namespaces.is_ready(doc["id"])}
+            for doc in documents
+        ]
+    }
+
+
+@app.delete("/sessions/{session_id}/documents/{document_id}")
+async def remove_document(session_id: str, document_id: str):
+    """Drop a document from the session; its vectors stay shared with other sessions."""
+    session = await session_store.get(session_id)
+    if not session.remove_document(document_id):
+        raise HTTPException(status_code=404, detail="Unknown document id for this session")
+    if not session.document_ids():
+        session.ispdf = False
+    await session_store.save(session)
+    return {"documents": session.document_ids()}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = ingestion_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job id")
+    return job.to_dict()
+
+
 # Request and Response Models
 class ChatRequest(BaseModel):
     message: str
     language: str
+    # Defaults to the X-Session-Id header, or a new id returned in that header
+    session_id: Optional[str] = None
+    # Extra languages to render the answer in, translated in parallel
+    languages: List[str] = []
+    # PDF mode scope: document ids from this session (default all), pages and sections
+    documents: List[str] = []
+    page_start: Optional[int] = None
+    page_end: Optional[int] = None
+    sections: List[str] = []
     # file: UploadFile | None = None
 
 class ChatResponse(BaseModel):
     response: str
+    translations: Dict[str, str] = {}
 
 # class ChatResponse(BaseModel):
 #     response: str
 
 
+def pdf_scope(session: SessionState, request: ChatRequest) -> Tuple[List[str], Optional[Dict]]:
+    """Namespaces and metadata filter for a PDF-mode question."""
+    available = session.document_ids()
+    unknown = [doc_id for doc_id in request.documents if doc_id not in available]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown document ids for this session: {unknown}")
+    namespaces = request.documents or available
+    if not namespaces:
+        raise HTTPException(status_code=400, detail="No documents uploaded in this session")
+    return namespaces, processor.metadata_filter(request.page_start, request.page_end, request.sections)
+
+
+async def run_until_disconnect(http_request: Request, coro):
+    """Await ``coro``, cancelling it if the client disconnects first."""
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                logger.info("Client disconnected, cancelling request")
+                task.cancel()
+                raise HTTPException(status_code=499, detail="Client disconnected")
+    finally:
+        task.cancel()
+
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat_endpoint(
-    request: ChatRequest
+    request: ChatRequest,
+    http_request: Request,
     # file: Optional[UploadFile] = None
 ):
-    global ispdf
     try:
         user_message = request.message.strip()
         language = request.language.strip()
@@ -351,21 +1038,32 @@ async def chat_endpoint(
         if not user_message : 
             raise HTTPException(status_code=400, detail="Empty message or no file provided.")
         
-        print(f"Received message: {user_message}")
-        print(f"Language: {language}")
+        logger.debug(f"Received message: {user_message}")
+        logger.debug(f"Language: {language}")
         
+        session = await session_store.get(resolve_session_id(http_request, request.session_id))
         
         if "exit" in user_message.lower():
-            ispdf=False
+            session.ispdf=False
+            await session_store.save(session)
             return ChatResponse(response="You've exited PDF mode. Feel free to ask me any legal questions related to Indian criminal Law.")
         if "return to pdf" in user_message.lower():
-            ispdf=True  
+            session.ispdf=True  
+            await session_store.save(session)
             return ChatResponse(response="You've returned PDF mode. Feel free to ask me any legal questions related to Indian criminal Law.")
 
-        if ispdf:
+        if session.ispdf:
+                require_pdf_ready()
                 try:
-                    context = build_conversation_context()
-                    query_response = processor.query_pdf(user_message,language,context)
+                    namespaces, pdf_filter = pdf_scope(session, request)
+                    context = build_conversation_context(session)
+                    retrieval_query = await conversation_memory.standalone_question(user_message, session)
+                    query_response = await run_until_disconnect(
+                        http_request,
+                        processor.aquery_pdf(
+                            user_message, language, context, namespaces, retrieval_query, pdf_filter
+                        ),
+                    )
                     
                     if "error" in query_response:
                         raise HTTPException(
@@ -375,11 +1073,16 @@ async def chat_endpoint(
                     
                     full_response = query_response["answer"]
                     
-                    conversation_history.append({"sender": "user", "text": user_message})
-                    conversation_history.append({"sender": "bot", "text": full_response})
+                    session.add_message("user", user_message, session_store.max_history)
+                    session.add_message("bot", full_response, session_store.max_history)
+                    await session_store.save(session)
+                    conversation_memory.update(session)
                     
-                    return ChatResponse(response=full_response)
+                    translations = await translate_all(full_response, request.languages)
+                    return ChatResponse(response=full_response, translations=translations)
                     
+                except (HTTPException, Overloaded):
+                    raise
                 except Exception as e:
                     
                     raise HTTPException(
@@ -389,25 +1092,277 @@ async def chat_endpoint(
                 
         
         # Handle regular chat messages
-        conversation_history.append({"sender": "user", "text": user_message})
-        context = build_conversation_context()
+        session.add_message("user", user_message, session_store.max_history)
+        context = build_conversation_context(session)
+        retrieval_query = await conversation_memory.standalone_question(user_message, session)
         
-        print(f"Context built: {context}")
+        logger.debug(f"Context built: {context}")
         
-        full_response = await process_query(user_message, language, context)
+        full_response = await run_until_disconnect(
+            http_request, cached_process_query(user_message, language, context, retrieval_query)
+        )
         
-        print(f"Generated response: {full_response}")
+        logger.debug(f"Generated response: {full_response}")
         
-        conversation_history.append({"sender": "bot", "text": full_response})
-        return ChatResponse(response=full_response)
+        session.add_message("bot", full_response, session_store.max_history)
+        await session_store.save(session)
+        conversation_memory.update(session)
+        translations = await translate_all(full_response, request.languages)
+        return ChatResponse(response=full_response, translations=translations)
     
-    except HTTPException:
+    except (HTTPException, Overloaded):
         raise
     except Exception as e:
-        print(f"Error in chat_endpoint: {str(e)}")
+        logger.error(f"Error in chat_endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest, http_request: Request):
+    user_message = request.message.strip()
+    language = request.language.strip()
+
+    if not user_message:
+        raise HTTPException(status_code=400, detail="Empty message or no file provided.")
+
+    logger.debug(f"Received streaming message: {user_message}")
+    if llm_scheduler.saturated(CHAT_LIMITER):
+        raise Overloaded(f"LLM deployment {CHAT_LIMITER} is overloaded")
+
+    session = await session_store.get(resolve_session_id(http_request, request.session_id))
+
+    async def event_stream():
+        start = time.perf_counter()
+        first_token_at = None
+
+        def timing() -> Dict[str, Optional[float]]:
+            total_ms = (time.perf_counter() - start) * 1000
+            ttft_ms = (first_token_at - start) * 1000 if first_token_at else None
+            return {"ttft_ms": ttft_ms, "total_ms": total_ms}
+
+        if "exit" in user_message.lower():
+            session.ispdf = False
+            await session_store.save(session)
+            text = "You've exited PDF mode. Feel free to ask me any legal questions related to Indian criminal Law."
+            yield sse_event("token", text)
+            yield sse_event("done", {"sources": [], **timing()})
+            return
+        if "return to pdf" in user_message.lower():
+            session.ispdf = True
+            await session_store.save(session)
+            text = "You've returned PDF mode. Feel free to ask me any legal questions related to Indian criminal Law."
+            yield sse_event("token", text)
+            yield sse_event("done", {"sources": [], **timing()})
+            return
+
+        pdf_mode = session.ispdf
+        if pdf_mode and not readiness["pdf"]:
+            yield sse_event("error", {"detail": "PDF subsystem is not ready yet"})
+            return
+        if pdf_mode:
+            try:
+                namespaces, pdf_filter = pdf_scope(session, request)
+            except HTTPException as e:
+                yield sse_event("error", {"detail": e.detail})
+                return
+            context = build_conversation_context(session)
+            retrieval_query = await conversation_memory.standalone_question(user_message, session)
+            events = processor.astream_pdf(
+                user_message, language, context, namespaces, retrieval_query, pdf_filter
+            )
+        else:
+            session.add_message("user", user_message, session_store.max_history)
+            context = build_conversation_context(session)
+            retrieval_query = await conversation_memory.standalone_question(user_message, session)
+            events = stream_query(user_message, language, context, retrieval_query)
+
+        tokens: List[str] = []
+        sources: List[Dict] = []
+        context_report: Dict = {}
+        try:
+            async for kind, payload in events:
+                if kind == "token":
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    tokens.append(payload)
+                    yield sse_event("token", payload)
+                elif kind == "sources":
+                    sources = payload
+                elif kind == "context":
+                    context_report = payload
+        except Overloaded as e:
+            yield sse_event("error", {"detail": str(e), "status": 503, "retry_after": e.retry_after})
+            return
+        except Exception as e:
+            logger.error(f"Error in chat_stream_endpoint: {str(e)}")
+            yield sse_event("error", {"detail": str(e)})
+            return
+
+        full_response = "".join(tokens)
+        if pdf_mode:
+            session.add_message("user", user_message, session_store.max_history)
+        session.add_message("bot", full_response, session_store.max_history)
+        await session_store.save(session)
+        conversation_memory.update(session)
+        async for translation_language, token in stream_translations(full_response, request.languages):
+            yield sse_event("translation", {"language": translation_language, "token": token})
+        yield sse_event(
+            "done", {"sources": sources, "context_tokens_saved": context_report.get("tokens_saved"), **timing()}
+        )
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# Bulk triage: independent queries with no session history
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "5000"))
+
+
+async def read_ndjson(request: Request) -> List[Dict]:
+    """Read the whole NDJSON body, refusing it once it passes BATCH_MAX_ITEMS lines.
+
+    The body is read before the response starts streaming. Reading it from
+    inside the response generator races Starlette's disconnect listener for
+    ``receive()`` and can silently drop chunks.
+    """
+    items: List[Dict] = []
+    buffer = b""
+
+    def add(line: bytes):
+        if not line.strip():
+            return
+        if len(items) >= BATCH_MAX_ITEMS:
+            raise HTTPException(status_code=413, detail=f"Batch exceeds {BATCH_MAX_ITEMS} items")
+        try:
+            items.append(json.loads(line))
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON on line {len(items) + 1}")
+
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            add(line)
+    add(buffer)
+    return items
+
+
+@app.post("/chat/batch")
+async def chat_batch_endpoint(request: Request):
+    """Answer a JSON list (or an NDJSON body) of {"message", "language", "id"} items.
+
+    Results stream back as NDJSON in input order, each with its latency and
+    either an ``answer`` or an ``error``.
+    """
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonl" in content_type:
+        items = await read_ndjson(request)
+    else:
+        try:
+            body = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid JSON body")
+        items = body.get("items") if isinstance(body, dict) else body
+        if not isinstance(items, list):
+            raise HTTPException(status_code=422, detail='Expected a JSON list or an object with an "items" list')
+        if len(items) > BATCH_MAX_ITEMS:
+            raise HTTPException(status_code=413, detail=f"Batch exceeds {BATCH_MAX_ITEMS} items")
+    # Rejected here, before the response starts streaming
+    try:
+        items = validate_items(items)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    async def answer(message: str, language: str) -> str:
+        # Interactive chat is admitted ahead of batch items
+        with llm_priority(BATCH):
+            return await cached_process_query(message, language, "")
+
+    async def results():
+        async for item in run_batch(items, answer, BATCH_CONCURRENCY):
+            yield json.dumps(item, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+@app.get("/ready")
+async def ready():
+    status = {
+        "ready": readiness["chat"],
+        "components": {
+            "chat": readiness["chat"],
+            "pdf": readiness["pdf"],
+            "ingestion": readiness["pdf"],
+            "hybrid": readiness["hybrid"],
+        },
+        "retrieval_mode": "hybrid" if readiness["hybrid"] else "vector",
+        "errors": readiness["errors"],
+    }
+    if not readiness["chat"]:
+        return JSONResponse(status_code=503, content=status)
+    return status
+
+
+def cache_hit_ratios() -> Dict[Tuple[str], float]:
+    embedding = processor.embeddings.stats()
+    lookups = embedding["hits"] + embedding["misses"]
+    return {
+        ("answer",): answer_cache.stats()["hit_rate"],
+        ("translation",): translator.stats()["hit_rate"],
+        ("retrieval",): retrieval_cache.stats()["hit_rate"],
+        ("embedding",): embedding["hits"] / lookups if lookups else 0.0,
+    }
+
+
+REGISTRY.gauge(
+    "legal_engine_llm_queue_depth",
+    "Calls waiting for an LLM or embedding deployment.",
+    ["deployment"],
+    lambda: {(name,): stats["queued"] for name, stats in llm_scheduler.stats().items()},
+)
+REGISTRY.gauge(
+    "legal_engine_llm_active_calls",
+    "Calls in flight per LLM or embedding deployment.",
+    ["deployment"],
+    lambda: {(name,): stats["active"] for name, stats in llm_scheduler.stats().items()},
+)
+REGISTRY.gauge("legal_engine_cache_hit_ratio", "Hit ratio of the in-process caches.", ["cache"], cache_hit_ratios)
+REGISTRY.gauge(
+    "legal_engine_context_tokens_saved",
+    "Retrieved-context tokens removed by the context budgeter.",
+    [],
+    lambda: {(): context_budgeter.total_tokens_saved + processor.context_budgeter.total_tokens_saved},
+)
+
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return {
+        **answer_cache.stats(),
+        "translations": translator.stats(),
+        "retrieval": retrieval_cache.stats(),
+        "context_tokens_in": context_budgeter.total_tokens_in + processor.context_budgeter.total_tokens_in,
+        "context_tokens_saved": context_budgeter.total_tokens_saved + processor.context_budgeter.total_tokens_saved,
+    }
+
+
+@app.post("/cache/invalidate")
+async def cache_invalidate():
+    """Drop cached retrievals and answers after the legal index was updated."""
+    retrieval_cache.invalidate()
+    answer_cache.clear()
+    return {"status": "invalidated", "retrieval_version": retrieval_cache.version}
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=5000, reload=True)
\ No newline at end of file
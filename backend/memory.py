@@ -0,0 +1,133 @@
+import asyncio
+import logging
+from typing import Dict, List
+
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import PromptTemplate
+
+from answer_cache import SemanticAnswerCache
+from context_budget import count_tokens, truncate_tokens
+from llm_scheduler import BACKGROUND, llm_priority
+from sessions import SessionState, SessionStore
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = PromptTemplate.from_template(
+    """Progressively summarize a conversation between a user and an Indian criminal law assistant.
+Keep the legal issues, facts of the user's situation, sections and acts discussed, and any conclusions.
+Write at most {max_words} words.
+
+Current summary:
+{summary}
+
+New lines of conversation:
+{messages}
+
+New summary:"""
+)
+
+STANDALONE_PROMPT = PromptTemplate.from_template(
+    """Given the conversation below and a follow-up question, rewrite the follow-up as a standalone
+question that can be understood without the conversation. Return only the question.
+
+Conversation:
+{conversation}
+
+Follow-up question: {question}
+Standalone question:"""
+)
+
+
+def format_messages(messages: List[Dict[str, str]]) -> str:
+    return "\n".join(f"{msg['sender']}: {msg['text']}" for msg in messages)
+
+
+class ConversationMemory:
+    """Rolling conversation memory: a running summary plus a raw tail.
+
+    Messages older than the last ``tail_messages`` are folded into
+    ``session.summary`` by a background task after each turn, so prompts carry
+    a bounded amount of history no matter how long the conversation runs.
+    """
+
+    def __init__(
+        self,
+        llm,
+        session_store: SessionStore,
+        tail_messages: int = 4,
+        max_tokens: int = 1000,
+        summary_tokens: int = 300,
+    ):
+        self.session_store = session_store
+        self.tail_messages = tail_messages
+        self.max_tokens = max_tokens
+        self.summary_tokens = summary_tokens
+        self.summary_chain = SUMMARY_PROMPT | llm | StrOutputParser()
+        self.standalone_chain = STANDALONE_PROMPT | llm | StrOutputParser()
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def context(self, session: SessionState) -> str:
+        """Summary plus the newest raw messages, capped at ``max_tokens``."""
+        summary = truncate_tokens(session.summary, self.summary_tokens) if session.summary else ""
+        used = count_tokens(summary)
+        tail: List[str] = []
+        # Messages still waiting to be summarized count as tail so nothing is dropped
+        for msg in reversed(session.history):
+            line = f"{msg['sender']}: {msg['text']}"
+            cost = count_tokens(line)
+            if used + cost > self.max_tokens:
+                break
+            tail.append(line)
+            used += cost
+        parts = [f"Summary of earlier conversation: {summary}"] if summary else []
+        return "\n".join(parts + tail[::-1])
+
+    def update(self, session: SessionState):
+        """Fold messages beyond the raw tail into the summary in the background."""
+        if len(session.history) <= self.tail_messages or session.session_id in self._tasks:
+            return
+        folded = list(session.history[:-self.tail_messages])
+        task = asyncio.create_task(self._summarize(session.session_id, session.summary, folded))
+        self._tasks[session.session_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(session.session_id, None))
+
+    async def _summarize(self, session_id: str, previous: str, folded: List[Dict[str, str]]):
+        try:
+            # Summaries can wait; live chat calls go first
+            with llm_priority(BACKGROUND):
+                summary = await self.summary_chain.ainvoke({
+                    "summary": previous or "(none)",
+                    "messages": format_messages(folded),
+                    "max_words": int(self.summary_tokens * 0.75),
+                })
+        except Exception as e:
+            logger.error(f"Conversation summary failed for {session_id}: {str(e)}")
+            return
+        # Later turns may have saved a newer copy; apply only if it still starts with what was folded
+        session = await self.session_store.get(session_id)
+        if session.summary != previous or session.history[:len(folded)] != folded:
+            logger.info(f"Session {session_id} changed while summarizing; discarding the summary")
+            return
+        session.summary = truncate_tokens(summary.strip(), self.summary_tokens)
+        del session.history[:len(folded)]
+        await self.session_store.save(session)
+        logger.info(f"Summarized {len(folded)} messages for session {session_id}")
+
+    async def standalone_question(self, question: str, session: SessionState) -> str:
+        """Question to send to retrieval: rewritten only when it leans on the history."""
+        if not (session.history or session.summary) or not SemanticAnswerCache.is_follow_up(question):
+            return question
+        try:
+            rewritten = await self.standalone_chain.ainvoke(
+                {"conversation": self.context(session), "question": question}
+            )
+        except Exception as e:
+            logger.error(f"Standalone question rewrite failed: {str(e)}")
+            return question
+        return rewritten.strip() or question
+
+    async def close(self):
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
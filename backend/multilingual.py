@@ -0,0 +1,140 @@
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import PromptTemplate
+
+logger = logging.getLogger(__name__)
+
+TRANSLATION_PROMPT = PromptTemplate.from_template(
+    """Translate the following answer about Indian criminal law into {language}.
+Keep section numbers, act names and case names exactly as written, keep the formatting,
+and do not add or remove any legal content. Return only the translation.
+
+{answer}"""
+)
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class Translator:
+    """Renders canonical-language answers into other languages.
+
+    Translations are cached per (canonical answer, language), so every
+    language shares one retrieval and analysis run and each rendering is
+    produced once. Translating a translation goes back to its canonical text.
+    """
+
+    def __init__(self, llm, canonical_language: str = "English", max_entries: int = 2000, ttl_seconds: float = 3600):
+        self.canonical_language = canonical_language
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.chain = TRANSLATION_PROMPT | llm | StrOutputParser()
+        # (canonical hash, language) -> (translation, canonical text, created_at)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[str, str, float]]" = OrderedDict()
+        # translation hash -> canonical text
+        self._canonical: Dict[str, str] = {}
+        self._in_flight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def is_canonical(self, language: str) -> bool:
+        return language.strip().lower() == self.canonical_language.lower()
+
+    def canonical_text(self, answer: str) -> str:
+        return self._canonical.get(text_hash(answer), answer)
+
+    def _key(self, canonical: str, language: str) -> Tuple[str, str]:
+        return text_hash(canonical), language.strip().lower()
+
+    def _get(self, key: Tuple[str, str]) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[2] > self.ttl_seconds:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def _put(self, key: Tuple[str, str], translation: str, canonical: str):
+        self._entries[key] = (translation, canonical, time.monotonic())
+        self._entries.move_to_end(key)
+        self._canonical[text_hash(translation)] = canonical
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: Tuple[str, str]):
+        translation, _, _ = self._entries.pop(key)
+        self._canonical.pop(text_hash(translation), None)
+
+    async def translate(self, answer: str, language: str) -> str:
+        canonical = self.canonical_text(answer)
+        if self.is_canonical(language) or not canonical:
+            return canonical
+        key = self._key(canonical, language)
+        cached = self._get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        # Concurrent requests for the same rendering share one LLM call
+        shared = self._in_flight.get(key)
+        if shared is not None:
+            try:
+                translation = await asyncio.shield(shared)
+            except asyncio.CancelledError:
+                if not shared.cancelled():
+                    raise
+                # The request that made the call was cancelled; make it again for this one
+                return await self.translate(answer, language)
+            self.hits += 1
+            return translation
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            translation = (await self.chain.ainvoke({"answer": canonical, "language": language})).strip()
+            self._put(key, translation, canonical)
+            future.set_result(translation)
+            return translation
+        except asyncio.CancelledError:
+            # Waiters retry rather than inherit this caller's cancellation
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Nobody else may be awaiting it; don't log "exception never retrieved"
+            future.exception()
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+
+    async def astream(self, answer: str, language: str) -> AsyncIterator[str]:
+        """Stream a rendering, or yield it whole when it is cached or already in flight."""
+        canonical = self.canonical_text(answer)
+        key = self._key(canonical, language)
+        if self.is_canonical(language) or key in self._in_flight or self._get(key) is not None:
+            yield await self.translate(canonical, language)
+            return
+        self.misses += 1
+        tokens = []
+        async for token in self.chain.astream({"answer": canonical, "language": language}):
+            if token:
+                tokens.append(token)
+                yield token
+        self._put(key, "".join(tokens).strip(), canonical)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,98 @@
+import os
+import json
+import time
+import logging
+import threading
+from typing import Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class NamespaceRegistry:
+    """Bookkeeping for per-document Pinecone namespaces.
+
+    Pinecone is the source of truth for which namespaces exist and how many
+    vectors they hold; this registry only records which ones finished
+    ingesting and when each was last used, persisted to a small JSON file so
+    eviction order survives restarts. Namespaces with an ingestion running in
+    this process are never expired or evicted.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl_seconds: Optional[float] = None):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}
+        # In memory only: ingestion jobs do not survive a restart
+        self._ingesting: Set[str] = set()
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self._entries = json.load(f)
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self.path)
+
+    def is_ready(self, namespace: str) -> bool:
+        entry = self._entries.get(namespace)
+        return bool(entry and entry.get("ready"))
+
+    def is_ingesting(self, namespace: str) -> bool:
+        return namespace in self._ingesting
+
+    def start_ingesting(self, namespace: str):
+        with self._lock:
+            self._ingesting.add(namespace)
+            entry = self._entries.setdefault(namespace, {"ready": False})
+            entry["last_used"] = time.time()
+            self._save()
+
+    def stop_ingesting(self, namespace: str):
+        with self._lock:
+            self._ingesting.discard(namespace)
+
+    def mark_ready(self, namespace: str, chunks: int, **metadata):
+        with self._lock:
+            self._ingesting.discard(namespace)
+            entry = self._entries.setdefault(namespace, {})
+            entry.update(metadata, ready=True, chunks=chunks, last_used=time.time())
+            self._save()
+
+    def touch(self, namespace: str):
+        with self._lock:
+            entry = self._entries.setdefault(namespace, {"ready": False})
+            entry["last_used"] = time.time()
+            self._save()
+
+    def forget(self, namespace: str):
+        with self._lock:
+            self._entries.pop(namespace, None)
+            self._save()
+
+    def get(self, namespace: str) -> Optional[Dict]:
+        return self._entries.get(namespace)
+
+    def last_used(self, namespace: str) -> Optional[float]:
+        """None for namespaces this registry has never seen (e.g. written by another process)."""
+        return self._entries.get(namespace, {}).get("last_used")
+
+    def expired(self, namespaces: List[str]) -> List[str]:
+        if not self.ttl_seconds:
+            return []
+        cutoff = time.time() - self.ttl_seconds
+        return [
+            ns for ns in namespaces
+            if not self.is_ingesting(ns) and self.last_used(ns) is not None and self.last_used(ns) < cutoff
+        ]
+
+    def eviction_order(self, namespaces: List[str]) -> List[str]:
+        """Least recently used first; unknown namespaces count as newest, ingesting ones are left out."""
+        def recency(namespace: str) -> float:
+            last_used = self.last_used(namespace)
+            return float("inf") if last_used is None else last_used
+
+        return sorted((ns for ns in namespaces if not self.is_ingesting(ns)), key=recency)
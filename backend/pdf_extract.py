@@ -0,0 +1,68 @@
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from pypdf import PdfReader
+
+logger = logging.getLogger(__name__)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+
+
+def get_extract_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers != workers:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        # spawn, not fork: the parent runs event-loop and thread-pool threads
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        _pool_workers = workers
+        logger.info(f"PDF extraction pool started with {workers} processes")
+    return _pool
+
+
+def shutdown_extract_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+
+
+def count_pages(pdf_path: str) -> int:
+    return len(PdfReader(pdf_path).pages)
+
+
+def extract_page_range(pdf_path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    """Extract text for pages [start, end). Runs inside a pool process."""
+    reader = PdfReader(pdf_path)
+    return [(number, reader.pages[number].extract_text()) for number in range(start, end)]
+
+
+def iter_pages_parallel(pdf_path: str, workers: int, pages_per_task: int = 8) -> Iterator[Document]:
+    """Yield the pages of ``pdf_path`` in order while later ranges are still being extracted.
+
+    At most ``2 * workers`` page ranges are in flight, so memory stays bounded
+    regardless of document length. Documents carry the same ``source``/``page``
+    metadata as ``PyPDFLoader``.
+    """
+    total_pages = count_pages(pdf_path)
+    pool = get_extract_pool(workers)
+    ranges = deque((start, min(start + pages_per_task, total_pages)) for start in range(0, total_pages, pages_per_task))
+    in_flight = deque()
+    max_in_flight = 2 * workers
+
+    try:
+        while ranges or in_flight:
+            while ranges and len(in_flight) < max_in_flight:
+                start, end = ranges.popleft()
+                in_flight.append(pool.submit(extract_page_range, pdf_path, start, end))
+
+            for number, text in in_flight.popleft().result():
+                yield Document(page_content=text, metadata={"source": pdf_path, "page": number})
+    finally:
+        for future in in_flight:
+            future.cancel()
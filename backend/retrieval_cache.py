@@ -0,0 +1,78 @@
+import time
+import logging
+from dataclasses import dataclass
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from answer_cache import SimilarityCache, normalize_query
+
+logger = logging.getLogger(__name__)
+
+# (normalized query, sorted search parameters)
+RetrievalKey = Tuple[str, Tuple[Tuple[str, object], ...]]
+
+
+@dataclass
+class CachedResults:
+    results: List[Dict]
+    vector: Optional[np.ndarray]
+    created_at: float
+    version: int
+
+
+class RetrievalCache(SimilarityCache):
+    """LRU + TTL cache of search results keyed by normalized query and search parameters.
+
+    Lookups try the exact key first and then the closest cached query vector
+    searched with the same parameters, if it clears ``similarity_threshold``.
+    Entries from before the last ``invalidate()`` (an index update) are dropped.
+    """
+
+    name = "Retrieval"
+
+    def __init__(self, max_entries: int = 2000, ttl_seconds: float = 900, similarity_threshold: float = 0.98):
+        super().__init__(max_entries, ttl_seconds, similarity_threshold)
+        self.version = 0
+        self.index_version = None
+        self.invalidations = 0
+
+    @staticmethod
+    def key(query: str, **params) -> RetrievalKey:
+        return normalize_query(query), tuple(sorted(params.items()))
+
+    @staticmethod
+    def _bucket_key(key: RetrievalKey) -> Hashable:
+        return key[1]
+
+    def get(self, key: RetrievalKey) -> Optional[List[Dict]]:
+        entry = super().get(key)
+        return list(entry.results) if entry is not None else None
+
+    def get_similar(self, key: RetrievalKey, vector: Sequence[float]) -> Optional[List[Dict]]:
+        entry = super().get_similar(key, vector)
+        return list(entry.results) if entry is not None else None
+
+    def put(self, key: RetrievalKey, results: List[Dict], vector: Optional[Sequence[float]] = None):
+        unit = self._unit(vector) if vector is not None else None
+        self._store(key, CachedResults(list(results), unit, time.monotonic(), self.version))
+
+    def invalidate(self):
+        self.version += 1
+        self.invalidations += 1
+        self.clear()
+
+    def observe_index_version(self, index_version) -> bool:
+        """Invalidate when the backend reports a different index version; True if it did."""
+        changed = self.index_version is not None and index_version != self.index_version
+        self.index_version = index_version
+        if changed:
+            logger.info(f"Search index changed ({index_version}); dropping cached retrievals")
+            self.invalidate()
+        return changed
+
+    def stats(self) -> Dict[str, float]:
+        return {**super().stats(), "invalidations": self.invalidations}
+
+    def _stale(self, entry: CachedResults) -> bool:
+        return entry.version != self.version or super()._stale(entry)
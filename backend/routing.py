@@ -0,0 +1,53 @@
+import re
+from typing import Optional, Tuple
+
+# Local, LLM-free routing between the "law" (classify a situation) and
+# "section" (explain a provision) chains.
+
+ACTS = r"(?:ipc|bns|bnss|bsa|crpc|cr\.?\s?p\.?\s?c|i\.?\s?p\.?\s?c|evidence\s+act|indian\s+penal\s+code|bharatiya\s+nyaya\s+sanhita)"
+
+# "Section 302", "Sec. 376(2)(a)", "s. 420", "IPC 420", "302 IPC", "BNS 103"
+SECTION_REFERENCE = re.compile(
+    r"\b(?:section|sec\.?|s\.|u/s\.?|article)\s*\d+[a-z]?(?:\s*\(\s*\w+\s*\))*"
+    rf"|\b{ACTS}\s*(?:section|sec\.?|s\.)?\s*\d+[a-z]?\b"
+    rf"|\b\d+[a-z]?\s*(?:of\s+(?:the\s+)?)?{ACTS}\b",
+    re.IGNORECASE,
+)
+ACT_MENTION = re.compile(rf"\b{ACTS}\b", re.IGNORECASE)
+EXPLAIN_CUE = re.compile(
+    r"\b(?:what\s+is|what\s+does|explain|meaning\s+of|define|definition|punishment\s+(?:for|under)|penalty\s+under)\b",
+    re.IGNORECASE,
+)
+# First-person narratives and incident verbs point to a situation to classify
+SITUATION_CUE = re.compile(
+    r"\b(?:i|me|my|we|our|he|she|they|someone|somebody|neighbou?r|husband|wife|boss|friend)\b.*"
+    r"\b(?:hit|beat|attack\w*|stole|stolen|steal\w*|threat\w*|cheat\w*|kill\w*|murder\w*|harass\w*|"
+    r"abus\w*|kidnap\w*|rob\w*|fraud\w*|assault\w*|injur\w*|forg\w*|bribe\w*|blackmail\w*|"
+    r"arrest\w*|happened|did|took|broke)\b",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+def classify_query(query: str) -> Tuple[Optional[str], float]:
+    """Return (destination, confidence) for ``query`` without calling the LLM.
+
+    ``destination`` is None when no rule fires; callers should then fall back
+    to the LLM router.
+    """
+    text = query.strip()
+    words = len(text.split())
+    has_reference = bool(SECTION_REFERENCE.search(text))
+    is_situation = bool(SITUATION_CUE.search(text))
+
+    if has_reference and not is_situation:
+        return "section", 0.95
+    if has_reference and EXPLAIN_CUE.search(text):
+        return "section", 0.8
+    if ACT_MENTION.search(text) and EXPLAIN_CUE.search(text) and not is_situation:
+        return "section", 0.75
+    if is_situation and not has_reference:
+        return "law", 0.85 if words >= 6 else 0.6
+    if is_situation:
+        # A narrative that also cites a section ("he hit me, is it 323 IPC?")
+        return "law", 0.55
+    return None, 0.0
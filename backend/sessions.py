@@ -0,0 +1,251 @@
+import os
+import re
+import json
+import time
+import uuid
+import asyncio
+import sqlite3
+import logging
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Issued by the server on a client's first request and echoed back on every later one
+SESSION_HEADER = "X-Session-Id"
+_SESSION_ID = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+
+def new_session_id() -> str:
+    return uuid.uuid4().hex
+
+
+def valid_session_id(session_id: Optional[str]) -> bool:
+    return bool(session_id and _SESSION_ID.match(session_id))
+
+
+@dataclass
+class SessionState:
+    session_id: str
+    history: List[Dict[str, str]] = field(default_factory=list)
+    ispdf: bool = False
+    # Most recently uploaded document
+    namespace: Optional[str] = None
+    # Rolling summary of messages that have left ``history``
+    summary: str = ""
+    # Documents uploaded in this session: {"id": namespace, "filename", "added_at"}
+    documents: List[Dict[str, Any]] = field(default_factory=list)
+
+    def add_message(self, sender: str, text: str, max_history: int):
+        self.history.append({"sender": sender, "text": text})
+        if len(self.history) > max_history:
+            del self.history[:-max_history]
+
+    def add_document(self, document_id: str, filename: str, max_documents: int):
+        """Add (or move to the end) a document; the oldest ones drop off past ``max_documents``."""
+        if not self.documents and self.namespace:
+            self.documents = [{"id": self.namespace}]
+        self.documents = [doc for doc in self.documents if doc["id"] != document_id]
+        self.documents.append({"id": document_id, "filename": filename, "added_at": time.time()})
+        if len(self.documents) > max_documents:
+            del self.documents[:-max_documents]
+        self.namespace = document_id
+
+    def remove_document(self, document_id: str) -> bool:
+        if document_id not in self.document_ids():
+            return False
+        remaining = [doc for doc in self.documents if doc["id"] != document_id]
+        self.documents = remaining
+        if self.namespace == document_id:
+            self.namespace = remaining[-1]["id"] if remaining else None
+        return True
+
+    def document_ids(self) -> List[str]:
+        # Sessions saved before multi-document support only have ``namespace``
+        if not self.documents and self.namespace:
+            return [self.namespace]
+        return [doc["id"] for doc in self.documents]
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, raw: str) -> "SessionState":
+        return cls(**json.loads(raw))
+
+
+class SessionBackend(ABC):
+    """Durable storage behind the in-memory LRU. Subclasses store JSON blobs."""
+
+    @abstractmethod
+    async def load(self, session_id: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    async def save(self, session_id: str, raw: str):
+        ...
+
+    @abstractmethod
+    async def delete(self, session_id: str):
+        ...
+
+    async def close(self):
+        pass
+
+
+class SQLiteSessionBackend(SessionBackend):
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, state TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self._lock = asyncio.Lock()
+
+    async def _run(self, fn, *args):
+        # sqlite3 connections are not safe for concurrent use across threads
+        async with self._lock:
+            return await asyncio.to_thread(fn, *args)
+
+    def _load(self, session_id: str) -> Optional[str]:
+        row = self._conn.execute(
+            "SELECT state FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _save(self, session_id: str, raw: str):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO sessions (session_id, state, updated_at) VALUES (?, ?, ?)",
+            (session_id, raw, time.time()),
+        )
+        self._conn.commit()
+
+    def _delete(self, session_id: str):
+        self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+        self._conn.commit()
+
+    async def load(self, session_id: str) -> Optional[str]:
+        return await self._run(self._load, session_id)
+
+    async def save(self, session_id: str, raw: str):
+        await self._run(self._save, session_id, raw)
+
+    async def delete(self, session_id: str):
+        await self._run(self._delete, session_id)
+
+    async def close(self):
+        self._conn.close()
+
+
+class RedisSessionBackend(SessionBackend):
+    """Works with any Redis-compatible server (Redis, Azure Cache, Valkey)."""
+
+    def __init__(self, url: str, ttl_seconds: int = 86400, prefix: str = "session:"):
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(url, decode_responses=True)
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    async def load(self, session_id: str) -> Optional[str]:
+        return await self._client.get(self.prefix + session_id)
+
+    async def save(self, session_id: str, raw: str):
+        await self._client.set(self.prefix + session_id, raw, ex=self.ttl_seconds)
+
+    async def delete(self, session_id: str):
+        await self._client.delete(self.prefix + session_id)
+
+    async def close(self):
+        await self._client.aclose()
+
+
+class SessionStore:
+    """Bounded LRU of live sessions with optional write-through to a backend.
+
+    With a shared backend several workers can serve the same session; cached
+    entries older than ``cache_ttl`` seconds are re-read from the backend.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[SessionBackend] = None,
+        max_sessions: int = 1000,
+        max_history: int = 50,
+        cache_ttl: float = 5.0,
+    ):
+        self.backend = backend
+        self.max_sessions = max_sessions
+        self.max_history = max_history
+        self.cache_ttl = cache_ttl
+        self._cache: "OrderedDict[str, Tuple[float, SessionState]]" = OrderedDict()
+
+    async def get(self, session_id: str) -> SessionState:
+        cached = self._cache.get(session_id)
+        if cached is not None:
+            loaded_at, state = cached
+            if self.backend is None or time.monotonic() - loaded_at < self.cache_ttl:
+                self._cache.move_to_end(session_id)
+                return state
+
+        state = None
+        if self.backend is not None:
+            raw = await self.backend.load(session_id)
+            if raw:
+                state = SessionState.from_json(raw)
+        if state is None:
+            state = cached[1] if cached is not None else SessionState(session_id=session_id)
+
+        self._remember(state)
+        return state
+
+    async def save(self, state: SessionState):
+        if len(state.history) > self.max_history:
+            del state.history[:-self.max_history]
+        self._remember(state)
+        if self.backend is not None:
+            await self.backend.save(state.session_id, state.to_json())
+
+    async def delete(self, session_id: str):
+        self._cache.pop(session_id, None)
+        if self.backend is not None:
+            await self.backend.delete(session_id)
+
+    async def close(self):
+        if self.backend is not None:
+            await self.backend.close()
+
+    def _remember(self, state: SessionState):
+        self._cache[state.session_id] = (time.monotonic(), state)
+        self._cache.move_to_end(state.session_id)
+        while len(self._cache) > self.max_sessions:
+            evicted, _ = self._cache.popitem(last=False)
+            logger.debug(f"Evicted session from memory: {evicted}")
+
+
+def create_session_store() -> SessionStore:
+    """Build the session store described by the SESSION_* environment variables."""
+    kind = os.getenv("SESSION_BACKEND", "memory").lower()
+    if kind == "sqlite":
+        backend = SQLiteSessionBackend(os.getenv("SESSION_SQLITE_PATH", "./sessions.db"))
+    elif kind == "redis":
+        backend = RedisSessionBackend(
+            os.getenv("SESSION_REDIS_URL", "redis://localhost:6379/0"),
+            ttl_seconds=int(os.getenv("SESSION_TTL_SECONDS", "86400")),
+        )
+    elif kind == "memory":
+        backend = None
+    else:
+        raise ValueError(f"Unknown SESSION_BACKEND: {kind}")
+
+    logger.info(f"Session store backend: {kind}")
+    return SessionStore(
+        backend=backend,
+        max_sessions=int(os.getenv("SESSION_MAX_ENTRIES", "1000")),
+        max_history=int(os.getenv("SESSION_MAX_HISTORY", "50")),
+        cache_ttl=float(os.getenv("SESSION_CACHE_TTL", "5")),
+    )
@@ -0,0 +1,278 @@
+import os
+import re
+import sys
+import json
+import mmap
+import asyncio
+import logging
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import PromptTemplate
+
+from hybrid import ACT_ALIASES, SECTION_HEADING, SECTION_PATTERNS, canonical_act, canonical_section, extract_section_refs
+
+logger = logging.getLogger(__name__)
+
+ACT_NAMES = {
+    "ipc": "IPC", "crpc": "CrPC", "bns": "BNS", "bnss": "BNSS", "bsa": "BSA", "iea": "Indian Evidence Act",
+}
+# "302. Punishment for murder.—Whoever ..." -> "Punishment for murder"
+TITLE = re.compile(r"^\s*\d+[A-Z]{0,2}\.\s*(.{1,200}?)\.?\s*[—:]")
+PENALTY = re.compile(r"[^.—]*\bpunish(?:ed|able)\b[^.]*\.", re.IGNORECASE)
+# Words a bare "what is / explain section X" question may use besides the reference itself
+PLAIN_QUESTION_WORDS = {
+    "what", "whats", "is", "was", "does", "do", "explain", "meaning", "mean", "means", "of", "the", "a",
+    "define", "definition", "describe", "tell", "me", "about", "say", "says", "under", "in", "please",
+    "section", "sec", "provision", "act", "law", "indian", "kindly", "can", "you",
+} | {word for alias in ACT_ALIASES for word in re.findall(r"[a-z]+", alias)}
+
+EXPLAIN_PROMPT = PromptTemplate.from_template(
+    """You are an expert in Indian criminal law. Explain the following provision for a normal person.
+
+{act} Section {section}:
+{text}
+
+Reply with only a JSON object with two string fields, both written in {language}:
+"explanation": the meaning of the section in plain language with one short real-life example,
+"penalties": one short paragraph on the punishment it carries, or that it defines no punishment.
+Keep section numbers and act names exactly as written."""
+)
+
+
+@dataclass
+class StatuteEntry:
+    act: str
+    section: str
+    title: str
+    text: str
+    page: Optional[int] = None
+    penalties: List[str] = field(default_factory=list)
+    # language -> {"explanation", "penalties"}
+    explanations: Dict[str, Dict[str, str]] = field(default_factory=dict)
+
+    @property
+    def key(self) -> str:
+        return f"{self.act}:{self.section}"
+
+    @property
+    def label(self) -> str:
+        return f"{ACT_NAMES.get(self.act, self.act.upper())} Section {self.section.upper()}"
+
+    def render(self, language: str) -> Optional[str]:
+        """The precomputed answer in ``language``, if the build produced one."""
+        explained = self.explanations.get(language.strip().lower())
+        if not explained:
+            return None
+        heading = f"**{self.label} — {self.title}**" if self.title else f"**{self.label}**"
+        return f"{heading}\n\n{explained['explanation']}\n\n{explained['penalties']}".strip()
+
+    def as_search_result(self) -> Dict:
+        """Shaped like an Azure Search hit, so it can stand in for retrieved context."""
+        return {
+            "id": self.key,
+            "content": f"{self.label}. {self.text}",
+            "metadata_page": self.page,
+            "act": self.act,
+            "@search.score": 1.0,
+        }
+
+
+def is_plain_section_question(query: str) -> bool:
+    """True for "what is section 302 IPC?"-style questions that only ask what a section says.
+
+    Anything more specific ("is s.302 bailable for a minor?") needs the LLM.
+    """
+    remainder = query
+    for pattern in SECTION_PATTERNS:
+        remainder = pattern.sub(" ", remainder)
+    words = re.findall(r"[^\W\d_]+", remainder.lower())
+    return all(word in PLAIN_QUESTION_WORDS for word in words)
+
+
+def extract_penalties(text: str) -> List[str]:
+    return [sentence.strip(" —") for sentence in PENALTY.findall(text)]
+
+
+def parse_sections(rows: Iterable[Dict]) -> List[StatuteEntry]:
+    """Cut corpus rows ({"content", "act", "metadata_page"}) into one entry per section.
+
+    Text before a row's first heading continues the previous section of the same act.
+    """
+    entries: Dict[Tuple[str, str], StatuteEntry] = {}
+    current: Optional[StatuteEntry] = None
+    for row in rows:
+        content, act = row["content"], canonical_act(row.get("act"))
+        if not act:
+            continue
+        headings = list(SECTION_HEADING.finditer(content))
+        if current is not None and current.act == act:
+            lead = content[:headings[0].start() if headings else len(content)].strip()
+            if lead:
+                current.text = f"{current.text}\n{lead}"
+        for i, match in enumerate(headings):
+            end = headings[i + 1].start() if i + 1 < len(headings) else len(content)
+            text = content[match.start():end].strip()
+            title = TITLE.match(text)
+            key = (act, canonical_section(match.group(1)))
+            if key in entries:
+                # Later amendments or duplicate rows extend the same section
+                entries[key].text = f"{entries[key].text}\n{text}"
+                current = entries[key]
+                continue
+            current = entries[key] = StatuteEntry(
+                act=act,
+                section=key[1],
+                title=title.group(1).strip() if title else "",
+                text=text,
+                page=row.get("metadata_page"),
+            )
+    for entry in entries.values():
+        entry.penalties = extract_penalties(entry.text)
+    return list(entries.values())
+
+
+def _parse_json_object(text: str) -> Dict[str, str]:
+    start, end = text.find("{"), text.rfind("}")
+    data = json.loads(text[start:end + 1])
+    return {"explanation": str(data["explanation"]).strip(), "penalties": str(data["penalties"]).strip()}
+
+
+async def explain_sections(entries: List[StatuteEntry], llm, languages: List[str], concurrency: int = 8):
+    """Fill ``explanations`` for every entry and language with one LLM call each."""
+    chain = EXPLAIN_PROMPT | llm | StrOutputParser()
+    semaphore = asyncio.Semaphore(concurrency)
+    done = 0
+
+    async def explain(entry: StatuteEntry, language: str):
+        nonlocal done
+        async with semaphore:
+            try:
+                reply = await chain.ainvoke({
+                    "act": ACT_NAMES.get(entry.act, entry.act.upper()),
+                    "section": entry.section.upper(),
+                    "text": entry.text,
+                    "language": language,
+                })
+                entry.explanations[language.lower()] = _parse_json_object(reply)
+            except Exception as e:
+                logger.warning(f"Could not explain {entry.key} in {language}: {str(e)}")
+            done += 1
+            if done % 100 == 0:
+                logger.info(f"Explained {done}/{len(entries) * len(languages)}")
+
+    await asyncio.gather(*(explain(entry, language) for entry in entries for language in languages))
+
+
+def write_index(entries: List[StatuteEntry], directory: str):
+    """Write ``statutes.dat`` (concatenated UTF-8 JSON records) and its offset table."""
+    os.makedirs(directory, exist_ok=True)
+    offsets: Dict[str, Tuple[int, int]] = {}
+    sections: Dict[str, List[str]] = {}
+    tmp_data = os.path.join(directory, "statutes.dat.tmp")
+    with open(tmp_data, "wb") as f:
+        for entry in entries:
+            blob = json.dumps(asdict(entry), ensure_ascii=False).encode("utf-8")
+            offsets[entry.key] = (f.tell(), len(blob))
+            f.write(blob)
+            sections.setdefault(entry.section, []).append(entry.key)
+    tmp_meta = os.path.join(directory, "statutes.json.tmp")
+    with open(tmp_meta, "w") as f:
+        json.dump({"offsets": offsets, "sections": sections}, f)
+    os.replace(tmp_data, os.path.join(directory, "statutes.dat"))
+    os.replace(tmp_meta, os.path.join(directory, "statutes.json"))
+
+
+class StatuteIndex:
+    """Read-only, memory-mapped section lookup built by ``python statute_index.py``.
+
+    Keys are "act:section" ("ipc:302"); a bare section number resolves to
+    ``default_act`` when several acts share it.
+    """
+
+    def __init__(self, directory: str, default_act: str = "ipc"):
+        self.directory = directory
+        self.default_act = canonical_act(default_act)
+        with open(os.path.join(directory, "statutes.json")) as f:
+            meta = json.load(f)
+        self._offsets: Dict[str, List[int]] = meta["offsets"]
+        self._sections: Dict[str, List[str]] = meta["sections"]
+        self._file = open(os.path.join(directory, "statutes.dat"), "rb")
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self._offsets else b""
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+    def _read(self, key: str) -> StatuteEntry:
+        offset, length = self._offsets[key]
+        return StatuteEntry(**json.loads(self._data[offset:offset + length].decode("utf-8")))
+
+    def get(self, act: Optional[str], section: str) -> Optional[StatuteEntry]:
+        """Look up "376(2)" as itself, then as its parent section "376"."""
+        for number in dict.fromkeys([section, section.split("(")[0]]):
+            if act:
+                key = f"{act}:{number}"
+                if key in self._offsets:
+                    return self._read(key)
+                continue
+            keys = self._sections.get(number, [])
+            if len(keys) == 1:
+                return self._read(keys[0])
+            if f"{self.default_act}:{number}" in keys:
+                return self._read(f"{self.default_act}:{number}")
+        return None
+
+    def lookup(self, query: str) -> List[StatuteEntry]:
+        """Entries for every section ``query`` names; empty if any of them is unknown."""
+        entries = []
+        for act, number in extract_section_refs(query):
+            entry = self.get(act, number)
+            if entry is None:
+                return []
+            if all(entry.key != found.key for found in entries):
+                entries.append(entry)
+        return entries
+
+
+def load_rows(path: str) -> List[Dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+if __name__ == "__main__":
+    # python statute_index.py corpus.jsonl ./statute_index [--explain --languages English Hindi]
+    import argparse
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Build the precomputed statute section index")
+    parser.add_argument("corpus", help="JSONL rows with content, act and metadata_page")
+    parser.add_argument("out_dir")
+    parser.add_argument("--explain", action="store_true", help="generate explanations and penalties with the LLM")
+    parser.add_argument("--languages", nargs="+", default=["English"])
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    sections = parse_sections(load_rows(args.corpus))
+    if args.explain:
+        from langchain_openai import AzureChatOpenAI
+
+        llm = AzureChatOpenAI(
+            openai_api_version=os.getenv("OPENAI_API_VERSION"),
+            azure_deployment=os.getenv("AZURE_DEPLOYMENT"),
+            azure_endpoint=os.getenv("AZURE_ENDPOINT"),
+            api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+            temperature=0,
+            max_tokens=1000,
+        )
+        asyncio.run(explain_sections(sections, llm, args.languages, args.concurrency))
+    write_index(sections, args.out_dir)
+    print(f"Wrote {len(sections)} sections to {args.out_dir}", file=sys.stderr)
@@ -0,0 +1,64 @@
+import answer_cache
+from answer_cache import SemanticAnswerCache, normalize_query
+
+
+def vec(*values):
+    return list(values)
+
+
+def test_exact_hit_and_normalization():
+    cache = SemanticAnswerCache()
+    cache.put(cache.key("What is Section 302 IPC?", "English", "section"), "murder", vec(1, 0, 0))
+    entry = cache.get(cache.key("what is section 302 ipc", " english ", "section"))
+    assert entry.answer == "murder"
+    assert normalize_query("  What's   S. 302?! ") == "what s s 302"
+
+
+def test_semantic_hit_within_language_and_chain():
+    cache = SemanticAnswerCache(similarity_threshold=0.95)
+    cache.put(cache.key("punishment for murder in india", "English", "law"), "death or life", vec(1, 0.05, 0))
+    query = cache.key("what is the punishment for murder", "English", "law")
+    assert cache.get_similar(query, vec(1, 0, 0)).answer == "death or life"
+    assert cache.get_similar(cache.key("what is the punishment for murder", "Hindi", "law"), vec(1, 0, 0)) is None
+    assert cache.get_similar(query, vec(0, 1, 0)) is None
+
+
+def test_semantic_hit_requires_the_same_sections():
+    cache = SemanticAnswerCache(similarity_threshold=0.9)
+    cache.put(cache.key("explain section 302 IPC", "English", "section"), "murder", vec(1, 0, 0))
+    cache.put(cache.key("explain section 304 IPC", "English", "section"), "culpable homicide", vec(0.99, 0.1, 0))
+    assert cache.get_similar(cache.key("explain section 304 of IPC", "English", "section"), vec(1, 0, 0)).answer == (
+        "culpable homicide"
+    )
+    assert cache.get_similar(cache.key("explain section 307 IPC", "English", "section"), vec(1, 0, 0)) is None
+
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache.time, "monotonic", lambda: now[0])
+    cache = SemanticAnswerCache(ttl_seconds=60)
+    key = cache.key("what is bail in criminal law", "English", "law")
+    cache.put(key, "answer", vec(1, 0))
+    now[0] += 59
+    assert cache.get(key) is not None
+    now[0] += 2
+    assert cache.get(key) is None
+    assert cache.get_similar(key, vec(1, 0)) is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = SemanticAnswerCache(max_entries=2)
+    keys = [cache.key(f"question number {i} about bail", "English", "law") for i in range(3)]
+    cache.put(keys[0], "a0")
+    cache.put(keys[1], "a1")
+    cache.get(keys[0])
+    cache.put(keys[2], "a2")
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]).answer == "a0"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_follow_ups_are_not_cacheable():
+    assert SemanticAnswerCache.is_follow_up("what about bail for it?")
+    assert SemanticAnswerCache.is_follow_up("why?")
+    assert not SemanticAnswerCache.is_follow_up("what is anticipatory bail under CrPC")
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from batch import run_batch, validate_items
+
+
+def collect(items, handler, **kwargs):
+    async def run():
+        return [item async for item in run_batch(items, handler, **kwargs)]
+
+    return asyncio.run(run())
+
+
+def test_results_come_back_in_input_order():
+    async def handler(message, language):
+        # Later items finish first
+        await asyncio.sleep(0.01 * (5 - int(message[-1])))
+        return f"{language}:{message}"
+
+    items = [{"message": f"q{i}", "id": i} for i in range(5)]
+    results = collect(items, handler, concurrency=5)
+    assert [result["index"] for result in results] == [0, 1, 2, 3, 4]
+    assert [result["id"] for result in results] == [0, 1, 2, 3, 4]
+    assert results[3]["answer"] == "English:q3"
+
+
+def test_identical_queries_share_one_call():
+    calls = []
+
+    async def handler(message, language):
+        calls.append((message, language))
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    items = ["What is bail?", "what is bail", {"message": "What is bail?", "language": "Hindi"}]
+    results = collect(items, handler)
+    assert len(calls) == 2
+    assert [result["deduplicated"] for result in results] == [False, True, False]
+    assert all(result["answer"] == "answer" for result in results)
+
+
+def test_failures_and_empty_messages_are_reported_per_item():
+    async def handler(message, language):
+        raise RuntimeError("deployment unavailable")
+
+    results = collect(["", "what is an FIR"], handler)
+    assert results[0]["error"] == "Empty message"
+    assert results[1]["error"] == "deployment unavailable"
+
+
+def test_validate_items():
+    assert validate_items(["bail", {"query": "fir", "language": "Hindi"}])[1] == {
+        "id": None, "message": "fir", "language": "Hindi"
+    }
+    with pytest.raises(ValueError, match="Item 1: expected an object"):
+        validate_items(["bail", 42])
+    with pytest.raises(ValueError, match="Item 0: message must be a string"):
+        validate_items([{"message": ["bail"]}])
@@ -0,0 +1,58 @@
+from context_budget import ContextBudgeter, ContextChunk, chunks_from_search_results, count_tokens
+
+SHARED = "the accused shall be punished with imprisonment for life"
+
+
+def test_near_duplicates_are_dropped_keeping_the_best():
+    chunks = [
+        ContextChunk("whoever commits murder shall be punished with death or imprisonment for life", 1.0, "ipc", 1),
+        ContextChunk("whoever commits murder shall be punished with death or imprisonment for life.", 2.0, "ipc", 2),
+    ]
+    selected, report = ContextBudgeter().assemble(chunks, budget=1000)
+    assert [chunk.page for chunk in selected] == [2]
+    assert report["duplicates_removed"] == 1
+
+
+def test_overlap_is_trimmed_only_within_a_document():
+    chunks = [
+        ContextChunk(f"Section 302 says that {SHARED}", 2.0, "ipc", 1, offset=0),
+        ContextChunk(f"{SHARED} and shall also be liable to fine", 1.0, "ipc", 1, offset=40),
+    ]
+    selected, report = ContextBudgeter().assemble(chunks, budget=1000)
+    assert selected[1].text == "and shall also be liable to fine"
+    assert report["overlap_chars_trimmed"] == len(SHARED)
+
+
+def test_search_results_without_a_source_are_separate_documents():
+    results = [
+        {"id": "a", "content": f"Section 302 says that {SHARED}", "metadata_page": 1},
+        {"id": "b", "content": f"{SHARED} and shall also be liable to fine", "metadata_page": 1},
+    ]
+    selected, report = ContextBudgeter().assemble(chunks_from_search_results(results), budget=1000)
+    assert report["overlap_chars_trimmed"] == 0
+    assert selected[1].text.startswith(SHARED)
+
+
+def test_budget_keeps_the_best_chunks_in_document_order():
+    chunks = [
+        ContextChunk("first page " + "alpha " * 100, 1.0, "doc", 1),
+        ContextChunk("second page " + "beta " * 100, 3.0, "doc", 2),
+        ContextChunk("third page " + "gamma " * 100, 2.0, "doc", 3),
+    ]
+    budget = count_tokens(chunks[1].text) + count_tokens(chunks[2].text)
+    selected, report = ContextBudgeter().assemble(chunks, budget=budget)
+    assert [chunk.page for chunk in selected] == [2, 3]
+    assert report["tokens_out"] <= budget
+    assert report["tokens_saved"] == report["tokens_in"] - report["tokens_out"]
+
+
+def test_last_chunk_is_truncated_to_fit():
+    chunks = [
+        ContextChunk("first " * 200, 2.0, "doc", 1),
+        ContextChunk("second " * 400, 1.0, "doc", 2),
+    ]
+    budget = count_tokens(chunks[0].text) + 100
+    selected, report = ContextBudgeter().assemble(chunks, budget=budget)
+    assert len(selected) == 2
+    assert count_tokens(selected[1].text) <= 100
+    assert report["tokens_out"] == budget
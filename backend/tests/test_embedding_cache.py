@@ -0,0 +1,65 @@
+import asyncio
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from embedding_cache import CachedEmbeddings, DiskEmbeddingStore, content_hash
+
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def test_misses_are_deduplicated_and_batched():
+    inner = CountingEmbeddings()
+    cached = CachedEmbeddings(inner, batch_size=2)
+    vectors = cached.embed_documents(["a", "bb", "a", "ccc", "dddd"])
+    assert vectors == [[1.0, 1.0], [2.0, 1.0], [1.0, 1.0], [3.0, 1.0], [4.0, 1.0]]
+    assert sorted(map(sorted, inner.calls)) == [["a", "bb"], ["ccc", "dddd"]]
+    assert cached.embed_query("bb") == [2.0, 1.0]
+    assert len(inner.calls) == 2
+    assert cached.stats() == {"entries": 4, "hits": 1, "misses": 4}
+
+
+def test_async_path_goes_through_the_disk_store(tmp_path):
+    inner = CountingEmbeddings()
+    cached = CachedEmbeddings(inner, disk_store=DiskEmbeddingStore(str(tmp_path)))
+    assert asyncio.run(cached.aembed_query("bail")) == [4.0, 1.0]
+    assert asyncio.run(cached.aembed_documents(["bail", "fir"])) == [[4.0, 1.0], [3.0, 1.0]]
+
+    reloaded = CachedEmbeddings(CountingEmbeddings(), disk_store=DiskEmbeddingStore(str(tmp_path)))
+    assert asyncio.run(reloaded.aembed_documents(["fir", "bail"])) == [[3.0, 1.0], [4.0, 1.0]]
+    assert reloaded.embeddings.calls == []
+
+
+def test_ring_reuses_the_oldest_row(tmp_path):
+    store = DiskEmbeddingStore(str(tmp_path), capacity=2)
+    keys = [content_hash(str(i)) for i in range(3)]
+    for i, key in enumerate(keys):
+        store.put(key, np.array([i, i], dtype=np.float32))
+    store.flush()
+    assert store.get(keys[0]) is None
+    reloaded = DiskEmbeddingStore(str(tmp_path), capacity=2)
+    assert reloaded.get(keys[0]) is None
+    assert reloaded.get(keys[2]).tolist() == [2.0, 2.0]
+
+
+def test_stores_sharing_a_directory_never_return_another_keys_row(tmp_path):
+    first = DiskEmbeddingStore(str(tmp_path), capacity=2)
+    second = DiskEmbeddingStore(str(tmp_path), capacity=2)
+    a, b, c = (content_hash(text) for text in "abc")
+    first.put(a, np.array([1, 1], dtype=np.float32))
+    # The second store continues from the shared head instead of its own row 0
+    second.put(b, np.array([2, 2], dtype=np.float32))
+    assert first.get(a).tolist() == [1.0, 1.0]
+    second.put(c, np.array([3, 3], dtype=np.float32))
+    assert first.get(a) is None
+    assert DiskEmbeddingStore(str(tmp_path), capacity=2).get(b).tolist() == [2.0, 2.0]
@@ -0,0 +1,38 @@
+from hybrid import HybridIndex, extract_section_refs, reciprocal_rank_fusion
+
+DOCS = [
+    {"id": "302", "act": "IPC", "metadata_page": 1,
+     "content": "302. Punishment for murder.—Whoever commits murder shall be punished with death."},
+    {"id": "304", "act": "IPC", "metadata_page": 1,
+     "content": "304. Punishment for culpable homicide not amounting to murder.—Whoever commits it."},
+    {"id": "bail", "metadata_page": 9,
+     "content": "Bail may be refused where the offence is punishable under section 302 of the IPC."},
+]
+
+
+def test_section_references():
+    assert extract_section_refs("What does Section 376(2)(a) IPC say?") == [("ipc", "376(2)(a)")]
+    assert extract_section_refs("IPC section 420 and 161 CrPC") == [("ipc", "420"), ("crpc", "161")]
+    assert extract_section_refs("u/s 302") == [(None, "302")]
+    assert extract_section_refs("what is bail") == []
+
+
+def test_section_lookup_ranks_headings_before_mentions():
+    index = HybridIndex.from_docs(DOCS)
+    assert [doc["id"] for doc in index.lookup_sections("explain section 302 of IPC")] == ["302", "bail"]
+    # A sub-section falls back to its section
+    assert [doc["id"] for doc in index.lookup_sections("IPC 304(1)")] == ["304"]
+    assert index.lookup_sections("section 999") == []
+
+
+def test_bm25_prefers_matching_terms():
+    index = HybridIndex.from_docs(DOCS)
+    assert index.search("culpable homicide", k=1)[0]["id"] == "304"
+    assert index.search("bail refused", k=1)[0]["id"] == "bail"
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    vector = [{"id": "a"}, {"id": "b"}, {"id": "c"}]
+    lexical = [{"id": "b"}, {"id": "c"}]
+    fused = reciprocal_rank_fusion([vector, lexical])
+    assert [result["id"] for result in fused] == ["b", "c", "a"]
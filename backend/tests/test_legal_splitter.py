@@ -0,0 +1,67 @@
+import pytest
+
+from langchain_core.documents import Document
+
+from legal_splitter import SECTION_START, LegalTextSplitter, SplitState
+
+
+def page(text, number):
+    return Document(page_content=text, metadata={"source": "ipc.pdf", "page": number})
+
+
+@pytest.mark.parametrize("line", [
+    "302. Punishment for murder.—Whoever commits murder",
+    "Section 498A. Husband or relative of husband",
+    "SECTION 34: Acts done by several persons",
+    "sec. 120B - Punishment of criminal conspiracy",
+])
+def test_section_headings(line):
+    assert SECTION_START.match(line)
+
+
+@pytest.mark.parametrize("line", [
+    "2. the accused shall be liable",
+    "10 - years of imprisonment and fine",
+    "1860. it was enacted",
+    "376ab. whoever",
+])
+def test_lowercase_and_wrapped_lines_are_not_headings(line):
+    assert SECTION_START.match(line) is None
+
+
+def test_wrapped_text_keeps_its_section():
+    text = (
+        "Indian Penal Code\n"
+        "302. Punishment for murder.—Whoever commits murder shall be punished with death or\n"
+        "10 - years of imprisonment and fine, and\n"
+        "2. the accused shall also be liable to fine.\n"
+    )
+    chunks = LegalTextSplitter(chunk_size=1500).split_documents([page(text, 1)])
+    assert [chunk.metadata["sections"] for chunk in chunks] == [["302"]]
+
+
+def test_section_continues_across_batches():
+    splitter = LegalTextSplitter(chunk_size=200, min_chunk_size=10)
+    state = SplitState()
+    first = splitter.split_documents(
+        [page("Indian Penal Code, 1860\n302. Punishment for murder.—Whoever commits murder shall", 1)], state
+    )
+    second = splitter.split_documents(
+        [page("be punished with death.\n303. Punishment for murder by life-convict.—Whoever", 2)], state
+    )
+
+    assert second[0].metadata["section"] == "302"
+    assert second[-1].metadata["section"] == "303"
+    assert {chunk.metadata["act"] for chunk in first + second} == {"ipc"}
+    assert {chunk.metadata["doc_type"] for chunk in first + second} == {"statute"}
+    assert second[0].metadata["start_index"] > first[-1].metadata["start_index"]
+
+
+def test_long_sections_split_at_clauses():
+    clauses = "".join(f"({letter}) whoever does the act described in this clause number {letter}\n" for letter in "abcdef")
+    text = f"Indian Penal Code\n300. Murder.—Except in the cases hereinafter excepted—\n{clauses}"
+    chunks = LegalTextSplitter(chunk_size=160, min_chunk_size=10).split_documents([page(text, 1)])[1:]
+    assert len(chunks) > 1
+    assert all(len(chunk.page_content) <= 160 for chunk in chunks)
+    assert all(chunk.page_content.startswith("(") for chunk in chunks[1:])
+    assert {chunk.metadata["section"] for chunk in chunks} == {"300"}
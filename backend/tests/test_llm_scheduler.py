@@ -0,0 +1,135 @@
+import asyncio
+
+import pytest
+
+import llm_scheduler
+from llm_scheduler import BACKGROUND, INTERACTIVE, DeploymentLimiter, LLMScheduler, Overloaded, retry_after
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+    def __init__(self, headers):
+        super().__init__("rate limited")
+        self.response = type("Response", (), {"headers": headers})()
+
+
+def test_waiters_are_admitted_in_priority_order():
+    limiter = DeploymentLimiter("chat", max_concurrency=1)
+    order = []
+
+    async def call(name, priority):
+        await limiter.acquire(1, priority)
+        order.append(name)
+        await asyncio.sleep(0)
+        limiter.release()
+
+    async def run():
+        await limiter.acquire(1, INTERACTIVE)
+        tasks = [
+            asyncio.create_task(call("background", BACKGROUND)),
+            asyncio.create_task(call("interactive-1", INTERACTIVE)),
+            asyncio.create_task(call("interactive-2", INTERACTIVE)),
+        ]
+        await asyncio.sleep(0.01)
+        assert limiter.stats()["queued"] == 3
+        limiter.release()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert order == ["interactive-1", "interactive-2", "background"]
+
+
+def test_token_bucket_refills_over_time(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(llm_scheduler.time, "monotonic", clock)
+    limiter = DeploymentLimiter("chat", tokens_per_minute=600)
+    limiter.acquire_sync(600, INTERACTIVE)
+    limiter.release()
+    assert limiter.stats()["tokens_available"] == 0
+
+    waiter, delay = limiter._enqueue(300, INTERACTIVE, lambda: None)
+    assert not waiter.granted
+    # 30s of refill needed; waiters re-check every poll_seconds
+    assert delay == limiter.poll_seconds
+
+    clock.now += 30
+    limiter._redispatch()
+    assert waiter.granted
+    assert limiter.stats()["tokens_available"] == 0
+
+
+def test_release_reconciles_the_token_estimate(monkeypatch):
+    monkeypatch.setattr(llm_scheduler.time, "monotonic", FakeClock())
+    limiter = DeploymentLimiter("chat", tokens_per_minute=1000)
+    limiter.acquire_sync(500, INTERACTIVE)
+    limiter.release(token_adjustment=-400)
+    assert limiter.stats()["tokens_available"] == 900
+
+
+def test_full_queue_sheds_load():
+    limiter = DeploymentLimiter("chat", max_concurrency=1, max_queue=1)
+
+    async def run():
+        await limiter.acquire(1, INTERACTIVE)
+        waiting = asyncio.create_task(limiter.acquire(1, INTERACTIVE))
+        await asyncio.sleep(0.01)
+        assert limiter.saturated()
+        with pytest.raises(Overloaded):
+            await limiter.acquire(1, INTERACTIVE)
+        limiter.release()
+        await waiting
+
+    asyncio.run(run())
+    assert limiter.stats()["shed"] == 1
+
+
+def test_retry_after_headers():
+    assert retry_after(RateLimited({"retry-after-ms": "1500"})) == 1.5
+    assert retry_after(RateLimited({"retry-after": "7"})) == 7.0
+    assert retry_after(RateLimited({})) is None
+
+
+def test_scheduler_honours_retry_after(monkeypatch):
+    sleeps = []
+
+    async def fake_sleep(delay):
+        sleeps.append(delay)
+
+    monkeypatch.setattr(llm_scheduler.asyncio, "sleep", fake_sleep)
+    scheduler = LLMScheduler(max_retries=2, base_delay=0.01)
+    attempts = []
+
+    async def call():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RateLimited({"retry-after-ms": "20"})
+        return "ok"
+
+    assert asyncio.run(scheduler.run("chat", 10, call)) == "ok"
+    assert len(sleeps) == 2 and all(0.02 <= delay <= 0.03 for delay in sleeps)
+    assert scheduler.limiter("chat")._paused_until > 0
+
+
+def test_scheduler_gives_up_as_overloaded(monkeypatch):
+    async def fake_sleep(delay):
+        pass
+
+    monkeypatch.setattr(llm_scheduler.asyncio, "sleep", fake_sleep)
+    scheduler = LLMScheduler(max_retries=1)
+
+    async def call():
+        raise RateLimited({"retry-after-ms": "20"})
+
+    with pytest.raises(Overloaded) as error:
+        asyncio.run(scheduler.run("chat", 10, call))
+    assert error.value.retry_after == 0.02
+    assert scheduler.limiter("chat").stats()["active"] == 0
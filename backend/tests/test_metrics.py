@@ -0,0 +1,28 @@
+from metrics import Registry
+
+
+def test_label_values_are_escaped():
+    registry = Registry()
+    counter = registry.counter("errors_total", "Errors.", ["detail"])
+    counter.inc(detail='bad "quote"\nC:\\path')
+    assert 'errors_total{detail="bad \\"quote\\"\\nC:\\\\path"} 1' in registry.render().splitlines()
+
+
+def test_histogram_exposition():
+    registry = Registry()
+    histogram = registry.histogram("stage_seconds", "Stages.", ["stage"], buckets=(0.1, 1.0))
+    histogram.observe(0.05, stage="search")
+    histogram.observe(0.5, stage="search")
+    lines = registry.render().splitlines()
+    assert 'stage_seconds_bucket{stage="search",le="0.1"} 1' in lines
+    assert 'stage_seconds_bucket{stage="search",le="+Inf"} 2' in lines
+    assert 'stage_seconds_count{stage="search"} 2' in lines
+    assert histogram.snapshot()[("search",)] == (2, 0.55)
+
+
+def test_gauges_are_collected_at_scrape_time():
+    registry = Registry()
+    depth = {"chat": 3}
+    registry.gauge("queue_depth", "Queued calls.", ["deployment"], lambda: {(k,): v for k, v in depth.items()})
+    depth["chat"] = 5
+    assert 'queue_depth{deployment="chat"} 5' in registry.render().splitlines()
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+from multilingual import Translator
+
+
+class FakeLLM:
+    def __init__(self, delay=0.02, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    async def __call__(self, prompt):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("translation failed")
+        return f"[{self.calls}] " + prompt.to_string().split("\n\n")[-1]
+
+    def translator(self):
+        return Translator(RunnableLambda(lambda prompt: None, afunc=self))
+
+
+def test_translations_are_cached_and_map_back_to_canonical():
+    llm = FakeLLM(delay=0)
+    translator = llm.translator()
+
+    async def run():
+        hindi = await translator.translate("Bail is a right.", "Hindi")
+        assert await translator.translate("Bail is a right.", " hindi ") == hindi
+        assert translator.canonical_text(hindi) == "Bail is a right."
+        assert await translator.translate(hindi, "English") == "Bail is a right."
+
+    asyncio.run(run())
+    assert llm.calls == 1
+
+
+def test_concurrent_requests_share_one_call():
+    llm = FakeLLM()
+    translator = llm.translator()
+
+    async def run():
+        return await asyncio.gather(*(translator.translate("Bail is a right.", "Hindi") for _ in range(3)))
+
+    assert len(set(asyncio.run(run()))) == 1
+    assert llm.calls == 1
+
+
+def test_waiters_retry_when_the_caller_is_cancelled():
+    llm = FakeLLM()
+    translator = llm.translator()
+
+    async def run():
+        owner = asyncio.create_task(translator.translate("Bail is a right.", "Hindi"))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(translator.translate("Bail is a right.", "Hindi"))
+        await asyncio.sleep(0.005)
+        owner.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await owner
+        return await waiter
+
+    assert asyncio.run(run()) == "[2] Bail is a right."
+    assert llm.calls == 2
+
+
+def test_failures_reach_every_waiter():
+    translator = FakeLLM(fail=True).translator()
+
+    async def run():
+        return await asyncio.gather(
+            *(translator.translate("Bail is a right.", "Hindi") for _ in range(2)), return_exceptions=True
+        )
+
+    assert all(isinstance(result, RuntimeError) for result in asyncio.run(run()))
@@ -0,0 +1,51 @@
+import namespaces
+from namespaces import NamespaceRegistry
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_readiness_persists(tmp_path):
+    path = str(tmp_path / "namespaces.json")
+    registry = NamespaceRegistry(path)
+    registry.start_ingesting("doc-a")
+    assert registry.is_ingesting("doc-a") and not registry.is_ready("doc-a")
+    registry.mark_ready("doc-a", chunks=12, filename="ipc.pdf")
+    assert not registry.is_ingesting("doc-a")
+
+    reloaded = NamespaceRegistry(path)
+    assert reloaded.is_ready("doc-a")
+    assert reloaded.get("doc-a")["chunks"] == 12
+    assert reloaded.get("doc-a")["filename"] == "ipc.pdf"
+    reloaded.forget("doc-a")
+    assert NamespaceRegistry(path).get("doc-a") is None
+
+
+def test_eviction_order_is_least_recently_used_first(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(namespaces.time, "time", clock)
+    registry = NamespaceRegistry()
+    for name in ("old", "new", "middle"):
+        registry.mark_ready(name, chunks=1)
+        clock.now += 10
+    registry.touch("old")
+    assert registry.eviction_order(["old", "new", "middle", "unknown"]) == ["new", "middle", "old", "unknown"]
+
+
+def test_ingesting_namespaces_are_never_evicted_or_expired(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(namespaces.time, "time", clock)
+    registry = NamespaceRegistry(ttl_seconds=60)
+    registry.mark_ready("done", chunks=1)
+    registry.start_ingesting("busy")
+    clock.now += 120
+    assert registry.eviction_order(["busy", "done"]) == ["done"]
+    assert registry.expired(["busy", "done", "unknown"]) == ["done"]
+
+    registry.stop_ingesting("busy")
+    assert registry.expired(["busy", "done"]) == ["busy", "done"]
@@ -0,0 +1,38 @@
+from retrieval_cache import RetrievalCache
+
+
+def test_exact_and_similar_hits_are_scoped_to_search_parameters():
+    cache = RetrievalCache(similarity_threshold=0.95)
+    key = cache.key("Punishment for theft", top=5, mode="vector")
+    cache.put(key, [{"id": "a"}], [1, 0, 0])
+    assert cache.get(cache.key("punishment for theft?", top=5, mode="vector")) == [{"id": "a"}]
+    assert cache.get_similar(cache.key("theft punishment", top=5, mode="vector"), [1, 0.01, 0]) == [{"id": "a"}]
+    assert cache.get_similar(cache.key("theft punishment", top=10, mode="vector"), [1, 0, 0]) is None
+
+
+def test_similar_hit_requires_the_same_sections():
+    cache = RetrievalCache(similarity_threshold=0.9)
+    cache.put(cache.key("what does section 420 IPC say", top=5), [{"id": "420"}], [1, 0])
+    assert cache.get_similar(cache.key("what does section 420 of IPC say", top=5), [1, 0]) == [{"id": "420"}]
+    assert cache.get_similar(cache.key("what does section 406 IPC say", top=5), [1, 0]) is None
+    assert cache.get_similar(cache.key("what does CrPC section 420 say", top=5), [1, 0]) is None
+
+
+def test_index_version_change_invalidates():
+    cache = RetrievalCache()
+    key = cache.key("dowry death", top=5)
+    cache.put(key, [{"id": "304b"}], [0, 1])
+    assert not cache.observe_index_version(("etag-1", 10))
+    assert not cache.observe_index_version(("etag-1", 10))
+    assert cache.get(key) == [{"id": "304b"}]
+    assert cache.observe_index_version(("etag-2", 10))
+    assert cache.get(key) is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_results_are_copied():
+    cache = RetrievalCache()
+    key = cache.key("bail", top=5)
+    cache.put(key, [{"id": "a"}])
+    cache.get(key).append({"id": "b"})
+    assert cache.get(key) == [{"id": "a"}]
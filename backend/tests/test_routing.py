@@ -0,0 +1,40 @@
+import pytest
+
+from routing import classify_query
+
+
+@pytest.mark.parametrize("query", [
+    "Section 302",
+    "what is section 376(2)(a) of IPC",
+    "IPC 420",
+    "explain 498A IPC",
+    "BNS 103",
+])
+def test_section_references_route_to_section(query):
+    destination, confidence = classify_query(query)
+    assert destination == "section" and confidence >= 0.9
+
+
+def test_act_with_an_explain_cue_routes_to_section():
+    assert classify_query("what is the punishment for murder under the Indian Penal Code") == ("section", 0.75)
+
+
+@pytest.mark.parametrize("query", [
+    "My neighbour beat me with a stick last night",
+    "Someone stole my phone from the bus and threatened my friend",
+])
+def test_situations_route_to_law(query):
+    assert classify_query(query) == ("law", 0.85)
+
+
+def test_short_situations_are_less_certain():
+    assert classify_query("he hit me") == ("law", 0.6)
+
+
+def test_situations_citing_a_section():
+    assert classify_query("my husband beat me, does section 498A apply") == ("law", 0.55)
+    assert classify_query("he hit me, explain section 323") == ("section", 0.8)
+
+
+def test_unclassified_queries_fall_back_to_the_llm():
+    assert classify_query("how does bail work") == (None, 0.0)
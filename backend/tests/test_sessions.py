@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from sessions import (
+    SessionBackend,
+    SessionState,
+    SessionStore,
+    SQLiteSessionBackend,
+    new_session_id,
+    valid_session_id,
+)
+
+
+class DictBackend(SessionBackend):
+    def __init__(self):
+        self.data = {}
+
+    async def load(self, session_id):
+        return self.data.get(session_id)
+
+    async def save(self, session_id, raw):
+        self.data[session_id] = raw
+
+    async def delete(self, session_id):
+        self.data.pop(session_id, None)
+
+
+def test_backend_must_implement_storage():
+    class Partial(SessionBackend):
+        async def load(self, session_id):
+            return None
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_session_ids():
+    assert valid_session_id(new_session_id())
+    assert new_session_id() != new_session_id()
+    for bad in (None, "", "default", "../../etc/passwd", "x" * 65):
+        assert not valid_session_id(bad)
+
+
+def test_lru_evicts_least_recently_used():
+    async def run():
+        store = SessionStore(max_sessions=2)
+        a = await store.get("a")
+        a.add_message("user", "hi", 10)
+        await store.get("b")
+        await store.get("a")
+        await store.get("c")
+        assert list(store._cache) == ["a", "c"]
+        assert (await store.get("a")).history == [{"sender": "user", "text": "hi"}]
+        assert (await store.get("b")).history == []
+
+    asyncio.run(run())
+
+
+def test_save_trims_history():
+    async def run():
+        store = SessionStore(max_history=3)
+        state = await store.get("s")
+        for i in range(5):
+            state.history.append({"sender": "user", "text": str(i)})
+        await store.save(state)
+        assert [msg["text"] for msg in state.history] == ["2", "3", "4"]
+
+    asyncio.run(run())
+
+
+def test_write_through_and_reload_after_ttl():
+    async def run():
+        backend = DictBackend()
+        store = SessionStore(backend=backend, cache_ttl=0)
+        state = await store.get("s")
+        state.add_message("user", "hello", 10)
+        await store.save(state)
+        assert SessionState.from_json(backend.data["s"]).history[0]["text"] == "hello"
+
+        # Another worker saved a newer copy; a stale cache entry is re-read
+        newer = SessionState(session_id="s", history=[{"sender": "bot", "text": "newer"}])
+        await backend.save("s", newer.to_json())
+        assert (await store.get("s")).history[0]["text"] == "newer"
+
+        await store.delete("s")
+        assert "s" not in backend.data
+        assert (await store.get("s")).history == []
+
+    asyncio.run(run())
+
+
+def test_sqlite_backend_round_trip(tmp_path):
+    async def run():
+        backend = SQLiteSessionBackend(str(tmp_path / "sessions.db"))
+        state = SessionState(session_id="s", ispdf=True, history=[{"sender": "user", "text": "q"}])
+        await backend.save("s", state.to_json())
+        assert SessionState.from_json(await backend.load("s")) == state
+        await backend.delete("s")
+        assert await backend.load("s") is None
+        await backend.close()
+
+    asyncio.run(run())
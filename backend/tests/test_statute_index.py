@@ -0,0 +1,63 @@
+import pytest
+
+from statute_index import StatuteIndex, extract_penalties, is_plain_section_question, parse_sections, write_index
+
+ROWS = [
+    {"act": "IPC", "metadata_page": 10, "content": (
+        "302. Punishment for murder.—Whoever commits murder shall be punished with death, "
+        "or imprisonment for life, and shall also be liable to fine.\n"
+        "303. Punishment for murder by life-convict.—Whoever, being under sentence"
+    )},
+    {"act": "IPC", "metadata_page": 11, "content": "of imprisonment for life, commits murder, shall be punished with death."},
+    {"act": "CrPC", "metadata_page": 3, "content": "302. Permission to conduct prosecution.—Any Magistrate may permit"},
+]
+
+
+def test_parse_sections_joins_text_across_rows():
+    entries = {entry.key: entry for entry in parse_sections(ROWS)}
+    assert set(entries) == {"ipc:302", "ipc:303", "crpc:302"}
+    assert entries["ipc:302"].title == "Punishment for murder"
+    assert entries["ipc:303"].text.endswith("shall be punished with death.")
+    assert entries["ipc:303"].page == 10
+
+
+def test_extract_penalties():
+    assert extract_penalties("Whoever steals shall be punished with imprisonment. It is cognizable.") == [
+        "Whoever steals shall be punished with imprisonment."
+    ]
+
+
+@pytest.fixture
+def index(tmp_path):
+    write_index(parse_sections(ROWS), str(tmp_path))
+    index = StatuteIndex(str(tmp_path), default_act="ipc")
+    yield index
+    index.close()
+
+
+def test_lookup_resolves_acts_and_sub_sections(index):
+    assert len(index) == 3
+    assert index.get("crpc", "302").title == "Permission to conduct prosecution"
+    assert index.get(None, "302").act == "ipc"
+    assert index.get("ipc", "302(1)").key == "ipc:302"
+    assert [entry.key for entry in index.lookup("what is section 303 IPC")] == ["ipc:303"]
+    assert index.lookup("compare section 302 and section 999 IPC") == []
+
+
+@pytest.mark.parametrize("query", [
+    "What is section 302 IPC?",
+    "explain s. 420 of IPC",
+    "Tell me about IPC section 498A",
+    "What is the meaning of Section 34?",
+])
+def test_plain_section_questions(query):
+    assert is_plain_section_question(query)
+
+
+@pytest.mark.parametrize("query", [
+    "is s.302 bailable for a minor?",
+    "what is the punishment under section 302 for attempt",
+    "my neighbour hit me, is it section 323 IPC?",
+])
+def test_specific_questions_are_not_plain(query):
+    assert not is_plain_section_question(query)
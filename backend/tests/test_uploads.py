@@ -0,0 +1,85 @@
+import asyncio
+import hashlib
+import os
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+import uploads
+from uploads import save_upload
+
+BOUNDARY = "testboundary"
+
+
+def multipart(filename="ipc.pdf", content=b"%PDF-1.7 statute text", fields=None):
+    parts = [
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        for name, value in (fields or {}).items()
+    ]
+    parts.append(
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f"Content-Type: application/pdf\r\n\r\n".encode() + content + b"\r\n"
+    )
+    return b"".join(parts) + f"--{BOUNDARY}--\r\n".encode()
+
+
+def request(body: bytes, chunk_size: int = 7, content_length: bool = True) -> Request:
+    headers = [(b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode())]
+    if content_length:
+        headers.append((b"content-length", str(len(body)).encode()))
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)] or [b""]
+
+    async def receive():
+        chunk = chunks.pop(0)
+        return {"type": "http.request", "body": chunk, "more_body": bool(chunks)}
+
+    return Request({"type": "http", "method": "POST", "headers": headers}, receive)
+
+
+@pytest.fixture(autouse=True)
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(uploads, "UPLOAD_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_file_is_streamed_to_disk_with_its_hash_and_fields():
+    content = b"%PDF-1.7 " + os.urandom(5000)
+    saved = asyncio.run(save_upload(request(multipart(content=content, fields={"session_id": "abc123def"}))))
+    with open(saved.path, "rb") as f:
+        assert f.read() == content
+    assert saved.sha256 == hashlib.sha256(content).hexdigest()
+    assert (saved.size, saved.filename, saved.fields) == (len(content), "ipc.pdf", {"session_id": "abc123def"})
+
+
+def test_declared_oversize_body_is_refused_before_reading(upload_dir):
+    body = multipart(content=b"x" * (1000 + uploads.MULTIPART_OVERHEAD_BYTES))
+    oversized = request(body)
+    oversized._receive = None  # any read would fail
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(save_upload(oversized, max_bytes=1000))
+    assert error.value.status_code == 413
+    assert os.listdir(upload_dir) == []
+
+
+def test_file_growing_past_the_limit_is_refused_and_removed(upload_dir):
+    body = multipart(content=b"x" * 2000)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(save_upload(request(body, content_length=False), max_bytes=1000))
+    assert error.value.status_code == 413
+    assert os.listdir(upload_dir) == []
+
+
+@pytest.mark.parametrize("filename, detail", [("notes.txt", "Only PDF files are allowed"), ("", "No file provided")])
+def test_bad_files_are_rejected(upload_dir, filename, detail):
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(save_upload(request(multipart(filename=filename))))
+    assert (error.value.status_code, error.value.detail) == (400, detail)
+    assert os.listdir(upload_dir) == []
+
+
+def test_non_multipart_requests_are_rejected():
+    bad = Request({"type": "http", "method": "POST", "headers": [(b"content-type", b"application/json")]})
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(save_upload(bad))
+    assert error.value.status_code == 400
@@ -0,0 +1,55 @@
+import numpy as np
+
+from vector_index import LocalVectorIndex
+
+
+def unit_vectors(count, dim=16, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_search_returns_the_nearest_rows_and_persists(tmp_path):
+    index = LocalVectorIndex(str(tmp_path))
+    vectors = unit_vectors(20)
+    ids = index.add(vectors, [f"text {i}" for i in range(20)], ids=[f"id{i}" for i in range(20)])
+    assert len(ids) == 20
+    # Re-adding known ids is a no-op
+    assert index.add(vectors[:2], ["again", "again"], ids=["id0", "id1"]) == []
+
+    results = index.search(vectors[7], k=3)
+    assert results[0][0]["id"] == "id7"
+    assert abs(results[0][1] - 1.0) < 1e-5
+    assert [score for _, score in results] == sorted((score for _, score in results), reverse=True)
+
+    reloaded = LocalVectorIndex(str(tmp_path))
+    assert len(reloaded) == 20
+    assert reloaded.search(vectors[7], k=1)[0][0]["text"] == "text 7"
+
+
+def test_metadata_filters(tmp_path):
+    index = LocalVectorIndex(str(tmp_path))
+    vectors = unit_vectors(6)
+    metadatas = [{"act": "ipc" if i % 2 else "crpc", "page": i, "sections": [str(300 + i)]} for i in range(6)]
+    index.add(vectors, [f"text {i}" for i in range(6)], metadatas, ids=[str(i) for i in range(6)])
+
+    def found(filter):
+        return sorted(record["id"] for record, _ in index.search(vectors[0], k=6, filter=filter))
+
+    assert found({"act": "ipc"}) == ["1", "3", "5"]
+    assert found({"act": {"$in": ["crpc"]}, "page": {"$gte": 2}}) == ["2", "4"]
+    assert found({"$and": [{"act": "ipc"}, {"page": {"$lt": 3}}]}) == ["1"]
+    assert found({"sections": "304"}) == ["4"]
+    assert found({"act": "bns"}) == []
+
+
+def test_rows_added_after_the_ivf_build_are_searched(tmp_path):
+    index = LocalVectorIndex(str(tmp_path), ann_threshold=200, n_probe=2)
+    vectors = unit_vectors(260)
+    index.add(vectors[:200], [f"text {i}" for i in range(200)], ids=[str(i) for i in range(200)])
+    assert index.ensure_ivf()
+    index.add(vectors[200:], [f"text {i}" for i in range(200, 260)], ids=[str(i) for i in range(200, 260)])
+
+    assert index.search(vectors[250], k=1)[0][0]["id"] == "250"
+    assert index.search(vectors[10], k=1)[0][0]["id"] == "10"
+    # The IVF lists are reloaded with the index
+    assert LocalVectorIndex(str(tmp_path), ann_threshold=200).search(vectors[255], k=1)[0][0]["id"] == "255"
@@ -0,0 +1,153 @@
+import os
+import asyncio
+import hashlib
+import tempfile
+from dataclasses import dataclass, field
+from typing import BinaryIO, Dict, List, Optional
+
+from fastapi import HTTPException, Request
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "./uploaded_files")
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_MB", "100")) * 1024 * 1024
+# Boundaries, part headers and small form fields on top of the file itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+@dataclass
+class SavedUpload:
+    path: str
+    sha256: str
+    size: int
+    filename: str
+    fields: Dict[str, str] = field(default_factory=dict)
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"PDF exceeds the {max_bytes // (1024 * 1024)} MB upload limit")
+
+
+class _MultipartWriter:
+    """python-multipart callbacks that write the ``file_field`` part straight to ``out``.
+
+    Every other part is kept in memory as a small text field.
+    """
+
+    def __init__(self, out: BinaryIO, file_field: str, suffix: str, max_bytes: int):
+        self.out = out
+        self.file_field = file_field
+        self.suffix = suffix
+        self.max_bytes = max_bytes
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.filename: Optional[str] = None
+        self.fields: Dict[str, str] = {}
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._name: Optional[str] = None
+        self._is_file = False
+        self._value: List[bytes] = []
+
+    def callbacks(self) -> Dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def on_part_begin(self):
+        self._headers = {}
+        self._name = None
+        self._is_file = False
+        self._value = []
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        self._name = options.get(b"name", b"").decode("latin-1")
+        if self._name != self.file_field or self.filename is not None:
+            return
+        filename = options.get(b"filename", b"").decode("utf-8", errors="replace")
+        # Checked before any of the file is written
+        if not filename:
+            raise HTTPException(status_code=400, detail="No file provided")
+        if not filename.lower().endswith(self.suffix):
+            raise HTTPException(status_code=400, detail="Only PDF files are allowed")
+        self.filename = filename
+        self._is_file = True
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        chunk = data[start:end]
+        if not self._is_file:
+            self._value.append(chunk)
+            return
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise _too_large(self.max_bytes)
+        self.digest.update(chunk)
+        self.out.write(chunk)
+
+    def on_part_end(self):
+        if not self._is_file and self._name:
+            self.fields[self._name] = b"".join(self._value).decode("utf-8", errors="replace")
+
+
+async def save_upload(
+    request: Request,
+    file_field: str = "file",
+    suffix: str = ".pdf",
+    max_bytes: int = MAX_UPLOAD_BYTES,
+) -> SavedUpload:
+    """Parse the multipart body of ``request`` as it arrives and write ``file_field`` to disk once.
+
+    The file goes to a uniquely named temp file and is hashed on the way. A
+    Content-Length over the limit is refused with a 413 before any of the body
+    is read. A body that grows past the limit while streaming is refused as
+    soon as it does.
+    """
+    limit = max_bytes + MULTIPART_OVERHEAD_BYTES
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > limit:
+        raise _too_large(max_bytes)
+
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    boundary = options.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload")
+
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=UPLOAD_DIR, suffix=suffix)
+    out = os.fdopen(fd, "wb")
+    writer = _MultipartWriter(out, file_field, suffix, max_bytes)
+    parser = MultipartParser(boundary, writer.callbacks())
+    received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > limit:
+                raise _too_large(max_bytes)
+            # Parsing and the disk write happen off the event loop
+            await asyncio.to_thread(parser.write, chunk)
+        parser.finalize()
+        out.close()
+        if writer.filename is None:
+            raise HTTPException(status_code=400, detail="No file provided")
+    except BaseException:
+        out.close()
+        os.remove(path)
+        raise
+    return SavedUpload(path, writer.digest.hexdigest(), writer.size, writer.filename, writer.fields)
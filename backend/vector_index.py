@@ -0,0 +1,388 @@
+import os
+import sys
+import json
+import uuid
+import shutil
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+logger = logging.getLogger(__name__)
+
+
+def _compare(value: Any, op: str, operand: Any) -> bool:
+    if op == "$eq":
+        return value == operand
+    if op == "$in":
+        return value in operand
+    if value is None:
+        return False
+    if op == "$gte":
+        return value >= operand
+    if op == "$lte":
+        return value <= operand
+    if op == "$gt":
+        return value > operand
+    if op == "$lt":
+        return value < operand
+    raise ValueError(f"Unsupported filter operator: {op}")
+
+
+class LocalVectorIndex:
+    """Append-only, memory-mapped float32 vector index stored in one directory.
+
+    ``vectors.f32`` holds unit-normalized rows, ``records.jsonl`` the matching
+    id/text/metadata. Search is an exact vectorized cosine top-k. Once the
+    index holds ``ann_threshold`` rows, ``ensure_ivf()`` builds an IVF (k-means)
+    index and search then scans only the ``n_probe`` closest lists plus the
+    rows added since. The build runs at build or load time, never inside a query.
+    """
+
+    def __init__(self, directory: str, ann_threshold: int = 50_000, n_probe: int = 8):
+        self.directory = directory
+        self.ann_threshold = ann_threshold
+        self.n_probe = n_probe
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.records_path = os.path.join(directory, "records.jsonl")
+        self.meta_path = os.path.join(directory, "index.json")
+        self.centroids_path = os.path.join(directory, "ivf_centroids.npy")
+        self.assignments_path = os.path.join(directory, "ivf_assignments.npy")
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.dim: Optional[int] = None
+        self.records: List[Dict[str, Any]] = []
+        self._ids: Dict[str, int] = {}
+        self._matrix: Optional[np.ndarray] = None
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments: Optional[np.ndarray] = None
+        # Bumped on every write so caches can tell the index changed
+        self.generation = 0
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _load(self):
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path) as f:
+                self.dim = json.load(f)["dim"]
+        if os.path.exists(self.records_path):
+            with open(self.records_path) as f:
+                self.records = [json.loads(line) for line in f if line.strip()]
+            self._ids = {record["id"]: row for row, record in enumerate(self.records)}
+        if os.path.exists(self.centroids_path) and os.path.exists(self.assignments_path):
+            self._centroids = np.load(self.centroids_path)
+            self._assignments = np.load(self.assignments_path, mmap_mode="r")
+
+    def _map(self) -> np.ndarray:
+        rows = len(self.records)
+        if self._matrix is None or self._matrix.shape[0] != rows:
+            if rows == 0:
+                return np.zeros((0, self.dim or 0), dtype=np.float32)
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+        return self._matrix
+
+    def add(
+        self,
+        vectors: Iterable[Iterable[float]],
+        texts: List[str],
+        metadatas: Optional[List[Dict]] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        matrix = np.asarray(list(vectors), dtype=np.float32)
+        if matrix.size == 0:
+            return []
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.where(norms == 0, 1, norms)
+        metadatas = metadatas or [{} for _ in texts]
+
+        with self._lock:
+            ids = ids or [uuid.uuid4().hex for _ in texts]
+            if self.dim is None:
+                self.dim = matrix.shape[1]
+                with open(self.meta_path, "w") as f:
+                    json.dump({"dim": self.dim}, f)
+
+            # Re-adding a known id is a no-op so ingestion can be retried safely
+            keep = [i for i, id_ in enumerate(ids) if id_ not in self._ids]
+            if not keep:
+                return []
+            with open(self.vectors_path, "ab") as f:
+                f.write(matrix[keep].tobytes())
+            with open(self.records_path, "a") as f:
+                for i in keep:
+                    record = {"id": ids[i], "text": texts[i], "metadata": metadatas[i]}
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    self._ids[ids[i]] = len(self.records)
+                    self.records.append(record)
+            self._matrix = None
+            self.generation += 1
+        return [ids[i] for i in keep]
+
+    def ensure_ivf(self) -> bool:
+        """Build the IVF index if the index has reached ``ann_threshold`` rows; True if one exists."""
+        with self._lock:
+            matrix = self._map()
+            if self._centroids is None and len(matrix) >= self.ann_threshold:
+                self._build_ivf(matrix)
+            return self._centroids is not None
+
+    def search(
+        self,
+        query_vector: Iterable[float],
+        k: int = 10,
+        filter: Optional[Dict[str, Any]] = None,
+    ) -> List[Tuple[Dict[str, Any], float]]:
+        with self._lock:
+            matrix = self._map()
+        if len(matrix) == 0:
+            return []
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        query = query / norm if norm else query
+
+        rows = self._candidate_rows(query, len(matrix))
+        scores = (matrix if rows is None else matrix[rows]) @ query
+
+        if filter:
+            candidates = range(len(matrix)) if rows is None else rows
+            mask = np.array([self._matches(self.records[row], filter) for row in candidates], dtype=bool)
+            scores = np.where(mask, scores, -np.inf)
+
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        results = []
+        for position in top:
+            if not np.isfinite(scores[position]):
+                continue
+            row = int(position if rows is None else rows[position])
+            results.append((self.records[row], float(scores[position])))
+        return results
+
+    @staticmethod
+    def _matches(record: Dict[str, Any], filter: Dict[str, Any]) -> bool:
+        """Evaluate the subset of Pinecone's filter language the app uses."""
+        metadata = record.get("metadata", {})
+        for key, expected in filter.items():
+            if key == "$and":
+                if not all(LocalVectorIndex._matches(record, part) for part in expected):
+                    return False
+                continue
+            # List-valued metadata matches when any element does, as in Pinecone
+            value = metadata.get(key)
+            values = value if isinstance(value, list) else [value]
+            conditions = expected if isinstance(expected, dict) else {"$eq": expected}
+            if not all(any(_compare(v, op, operand) for v in values) for op, operand in conditions.items()):
+                return False
+        return True
+
+    def _candidate_rows(self, query: np.ndarray, total: int) -> Optional[np.ndarray]:
+        if self._centroids is None:
+            return None
+        lists = np.argsort(-(self._centroids @ query))[:self.n_probe]
+        indexed = len(self._assignments)
+        rows = np.flatnonzero(np.isin(self._assignments, lists))
+        # Rows added after the IVF build are always scanned exactly
+        return np.concatenate([rows, np.arange(indexed, total)])
+
+    def _build_ivf(self, matrix: np.ndarray, iterations: int = 10):
+        n_lists = max(1, int(np.sqrt(len(matrix))))
+        rng = np.random.default_rng(0)
+        sample = matrix[rng.choice(len(matrix), size=min(len(matrix), n_lists * 64), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(n_lists):
+                members = sample[assignments == c]
+                if len(members):
+                    centroid = members.mean(axis=0)
+                    centroids[c] = centroid / (np.linalg.norm(centroid) or 1)
+
+        assignments = np.concatenate([
+            np.argmax(matrix[start:start + 65536] @ centroids.T, axis=1)
+            for start in range(0, len(matrix), 65536)
+        ]).astype(np.int32)
+        np.save(self.centroids_path, centroids)
+        np.save(self.assignments_path, assignments)
+        self._centroids, self._assignments = centroids, assignments
+        logger.info(f"Built IVF index with {n_lists} lists over {len(matrix)} vectors")
+
+
+class LocalVectorStore(VectorStore):
+    """LangChain VectorStore over one LocalVectorIndex per namespace."""
+
+    def __init__(self, directory: str, embedding: Embeddings, ann_threshold: int = 50_000):
+        self.directory = directory
+        self.embedding = embedding
+        self.ann_threshold = ann_threshold
+        self._indexes: Dict[str, LocalVectorIndex] = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    def index(self, namespace: Optional[str] = None) -> LocalVectorIndex:
+        name = namespace or "default"
+        with self._lock:
+            if name not in self._indexes:
+                self._indexes[name] = LocalVectorIndex(os.path.join(self.directory, name), self.ann_threshold)
+            return self._indexes[name]
+
+    def namespace_counts(self) -> Dict[str, int]:
+        counts = {}
+        for name in os.listdir(self.directory):
+            if os.path.isdir(os.path.join(self.directory, name)):
+                counts[name] = len(self.index(name))
+        return counts
+
+    def delete_namespace(self, namespace: str):
+        with self._lock:
+            self._indexes.pop(namespace, None)
+        shutil.rmtree(os.path.join(self.directory, namespace), ignore_errors=True)
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[Dict]] = None,
+        ids: Optional[List[str]] = None,
+        namespace: Optional[str] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        vectors = self.embedding.embed_documents(texts)
+        index = self.index(namespace)
+        added = index.add(vectors, texts, metadatas, ids)
+        # Ingestion runs off the event loop, so large namespaces get their IVF here
+        index.ensure_ivf()
+        return added
+
+    def similarity_search_by_vector_with_score(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        namespace: Optional[str] = None,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        return [
+            (Document(page_content=record["text"], metadata=record["metadata"]), score)
+            for record, score in self.index(namespace).search(embedding, k, filter)
+        ]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self.embedding.embed_query(query), k, **kwargs)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, **kwargs)]
+
+    async def asimilarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        vector = await self.embedding.aembed_query(query)
+        return await asyncio.to_thread(self.similarity_search_by_vector, vector, k, **kwargs)
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[Dict]] = None,
+        directory: str = "./local_index",
+        **kwargs: Any,
+    ) -> "LocalVectorStore":
+        store = cls(directory, embedding)
+        store.add_texts(texts, metadatas, **kwargs)
+        return store
+
+
+class LocalSearch:
+    """In-process stand-in for AsyncAzureSearch over the legal corpus.
+
+    Returns the same ``id``/``content``/``metadata_page`` dicts, so
+    ``process_query`` works unchanged with either backend.
+    """
+
+    def __init__(self, directory: str, embeddings: Embeddings, ann_threshold: int = 50_000):
+        self.index = LocalVectorIndex(directory, ann_threshold)
+        self.embeddings = embeddings
+
+    async def start(self):
+        # An index built before it crossed ann_threshold gets its IVF now, not on the first query
+        if await asyncio.to_thread(self.index.ensure_ivf):
+            logger.info("Local search index is using its IVF lists")
+        logger.info(f"Local search index loaded with {len(self.index)} vectors")
+
+    async def close(self):
+        pass
+
+    async def index_version(self) -> int:
+        return self.index.generation
+
+    async def search(
+        self,
+        query: str,
+        top: int = 10,
+        k_nearest_neighbors: Optional[int] = None,
+        vector: Optional[Sequence[float]] = None,
+    ) -> List[Dict]:
+        if vector is None:
+            vector = await self.embeddings.aembed_query(query)
+        # Scoring and metadata filtering are CPU-bound; keep them off the event loop
+        hits = await asyncio.to_thread(self.index.search, vector, top)
+        return [
+            {
+                "id": record["id"],
+                "content": record["text"],
+                "metadata_page": record["metadata"].get("metadata_page", record["metadata"].get("page")),
+                "@search.score": score,
+            }
+            for record, score in hits
+        ]
+
+
+def build_local_index(corpus_path: str, directory: str, embeddings: Embeddings, batch_size: int = 256) -> int:
+    """Embed a JSONL corpus of {"id", "content", "metadata_page"} rows into ``directory``."""
+    index = LocalVectorIndex(directory)
+    added = 0
+    with open(corpus_path) as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        texts = [row["content"] for row in batch]
+        metadatas = [{k: v for k, v in row.items() if k not in ("id", "content")} for row in batch]
+        vectors = embeddings.embed_documents(texts)
+        added += len(index.add(vectors, texts, metadatas, [str(row["id"]) for row in batch]))
+        logger.info(f"Indexed {start + len(batch)}/{len(rows)} rows")
+    index.ensure_ivf()
+    return added
+
+
+if __name__ == "__main__":
+    # python vector_index.py corpus.jsonl ./local_index
+    from dotenv import load_dotenv
+    from langchain_openai import AzureOpenAIEmbeddings
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+    corpus, out_dir = sys.argv[1], sys.argv[2]
+    azure_embeddings = AzureOpenAIEmbeddings(
+        azure_deployment=os.getenv("AZURE_EMBEDDINGS_DEPLOYMENT"),
+        openai_api_version=os.getenv("OPENAI_API_VERSION"),
+        azure_endpoint=os.getenv("AZURE_ENDPOINT"),
+        api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+    )
+    print(f"Indexed {build_local_index(corpus, out_dir, azure_embeddings)} rows into {out_dir}")
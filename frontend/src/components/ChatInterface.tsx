@@ -3,6 +3,7 @@ import React, { useEffect, useRef, useState } from "react";
 import { useNavigate } from "react-router-dom";
 import { useChatContext } from "../context/ChatContext";
 import { useSpeechRecognition } from "../hooks/useSpeechRecognition";
+import { clearSession, rememberSession, sessionHeaders } from "../services/session";
 import { ttsService } from "../services/tts";
 import { ChatHistory } from "./ChatHistory";
 
@@ -27,6 +28,7 @@ export const ChatInterface: React.FC = () => {
 
   const handleLogout = () => {
     localStorage.removeItem('user');
+    clearSession();
     dispatch({ type: 'SET_USER', payload: null });
     navigate('/');
   };
@@ -61,8 +63,10 @@ export const ChatInterface: React.FC = () => {
     try {
       const response = await fetch('http://127.0.0.1:8000/upload', {
         method: 'POST',
+        headers: sessionHeaders(),
         body: formData,
       });
+      rememberSession(response);
 
       if (!response.ok) {
         throw new Error(`Upload failed with status: ${response.status}`);
@@ -111,12 +115,14 @@ export const ChatInterface: React.FC = () => {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          ...sessionHeaders(),
         },
         body: JSON.stringify({
           message: messageText,
           language: language,
         }),
       });
+      rememberSession(response);
 
       if (!response.ok) {
         throw new Error(`Request failed with status: ${response.status}`);
@@ -0,0 +1,20 @@
+// The backend issues each browser its own session id in X-Session-Id;
+// sending it back keeps this user's history, PDF mode and documents separate.
+const SESSION_KEY = 'sessionId';
+export const SESSION_HEADER = 'X-Session-Id';
+
+export const sessionHeaders = (): Record<string, string> => {
+  const sessionId = localStorage.getItem(SESSION_KEY);
+  return sessionId ? { [SESSION_HEADER]: sessionId } : {};
+};
+
+export const rememberSession = (response: Response): void => {
+  const sessionId = response.headers.get(SESSION_HEADER);
+  if (sessionId) {
+    localStorage.setItem(SESSION_KEY, sessionId);
+  }
+};
+
+export const clearSession = (): void => {
+  localStorage.removeItem(SESSION_KEY);
+};